@@ -10,6 +10,8 @@ class Road:
         availability (bool): The availability of the road.
     """
 
+    __slots__ = ("cost", "conditions", "geography", "infrastructure", "availability")
+
     def __init__(self, cost=0, conditions=None, geography=None, infrastructure=None, availability=True):
         self.cost = cost
         self.conditions = conditions
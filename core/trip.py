@@ -0,0 +1,112 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Ways a trip can end
+TRIP_COMPLETED = "completed"
+OUT_OF_AUTONOMY = "out of autonomy"
+OUT_OF_SUPPLIES = "out of supplies"
+
+
+class TripLeg:
+    """
+    Class representing one leg of a simulated trip, from a zone of the path to the next one.
+
+    Attributes:
+        origin (Zone): The zone the leg starts at, where supplies are left.
+        destination (Zone): The zone the leg ends at.
+        distance (float): The length of the leg in kilometers.
+        autonomy (float): The autonomy of the vehicle when the leg starts.
+        autonomy_loss (float): The autonomy the leg takes, given the load.
+        load (float): The load of the vehicle when the leg starts.
+        supplies_left (float): The supplies left at the origin.
+    """
+
+    def __init__(self, origin, destination, distance, autonomy, autonomy_loss, load, supplies_left):
+        self.origin = origin
+        self.destination = destination
+        self.distance = distance
+        self.autonomy = autonomy
+        self.autonomy_loss = autonomy_loss
+        self.load = load
+        self.supplies_left = supplies_left
+
+
+class TripSimulation:
+    """
+    Class representing a vehicle driving a path and leaving supplies at every zone until it runs
+    out of autonomy or load.
+
+    Attributes:
+        path (list): The zones the vehicle reached, the last one being where it stopped.
+        legs (list): The TripLeg records of the legs driven, the one it stopped on included.
+        cost (float): The distance of the legs driven.
+        outcome (str): TRIP_COMPLETED, OUT_OF_AUTONOMY or OUT_OF_SUPPLIES.
+    """
+
+    def __init__(self):
+        self.path = []
+        self.legs = []
+        self.cost = 0
+        self.outcome = TRIP_COMPLETED
+
+    @property
+    def completed(self):
+        return self.outcome == TRIP_COMPLETED
+
+
+def simulate_trip(path, distances, vehicle):
+    """
+    Drive a vehicle along a path, leaving supplies at every zone.
+
+    The vehicle and the zones are updated as in the real trip. A leg the vehicle cannot finish,
+    for lack of autonomy or of supplies for its origin, ends the trip at its origin with the rest
+    of the load left there. Every leg is logged at the DEBUG level and the end of an unfinished
+    trip at the INFO level.
+
+    Args:
+        path (list): The zones of the path, from start to goal.
+        distances (list): The length of every leg of the path.
+        vehicle (Vehicle): The vehicle driving the path.
+
+    Returns:
+        TripSimulation: The legs driven and where and why the trip ended.
+    """
+    trip = TripSimulation()
+    trip.path = path
+    debug = logger.isEnabledFor(logging.DEBUG)
+
+    for i, distance in enumerate(distances):
+        trip.cost += distance
+        origin = path[i]
+        autonomy_loss = vehicle.calculate_autonomy_loss(distance)
+        leg = TripLeg(origin, path[i + 1], distance, vehicle.autonomy, autonomy_loss, vehicle.load, 0)
+        trip.legs.append(leg)
+        if debug:
+            logger.debug("Vehicle autonomy: %s", vehicle.autonomy)
+
+        if vehicle.autonomy - autonomy_loss < 0:
+            trip.outcome = OUT_OF_AUTONOMY
+        else:
+            vehicle.autonomy -= autonomy_loss
+
+            supplies_to_leave = origin.calculate_supplies_to_leave()
+            if debug:
+                logger.debug("Vehicle load: %s, supplies to leave: %s", vehicle.load, supplies_to_leave)
+            if vehicle.load - supplies_to_leave < 0:
+                trip.outcome = OUT_OF_SUPPLIES
+            else:
+                origin.supplies += supplies_to_leave
+                vehicle.load -= supplies_to_leave
+                leg.supplies_left = supplies_to_leave
+                continue
+
+        # the trip ends at the origin of the leg, where the rest of the load is left
+        leg.supplies_left = vehicle.load
+        origin.supplies += vehicle.load
+        vehicle.load = 0
+        trip.path = path[:i + 1]
+        logger.info("Vehicle ran out of %s at %s!", "autonomy" if trip.outcome == OUT_OF_AUTONOMY else "supplies", origin.name)
+        break
+
+    return trip
@@ -9,13 +9,17 @@ class Vehicle:
         autonomy (float): The autonomy of the vehicle in kilometers.
         capacity (float): The load capacity of the vehicle in kilograms.
         load (float): The current load of the vehicle in kilograms.
+        trip (TripSimulation): The last trip driven by the vehicle, None before the first one.
     """
 
+    __slots__ = ("type", "autonomy", "capacity", "load", "trip")
+
     def __init__(self, vehicle_type: VehicleType, autonomy: float, capacity: float):
         self.type = vehicle_type
         self.autonomy = autonomy
         self.capacity = capacity
         self.load = capacity
+        self.trip = None
 
     def calculate_autonomy_loss(self, distance):
         """
@@ -24,4 +28,18 @@ class Vehicle:
         Args:
             distance (float): The distance traveled in kilometers
         """
-        return (distance * (1 + (self.load / self.capacity) * 0.5))
+        return self.autonomy_loss(distance, self.load)
+
+    def autonomy_loss(self, distance, load):
+        """
+        Calculate the autonomy reduction of a distance traveled with a given load, without
+        looking at the current load of the vehicle.
+
+        Args:
+            distance (float): The distance traveled in kilometers.
+            load (float): The load carried in kilograms.
+
+        Returns:
+            float: The autonomy lost.
+        """
+        return (distance * (1 + (load / self.capacity) * 0.5))
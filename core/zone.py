@@ -1,4 +1,4 @@
-from utils.coordinate import Coordinate
+from utils.coordinate import Coordinate, ORIGIN
 from enums.severity import Severity
 import string
 
@@ -16,7 +16,10 @@ class Zone:
         supplies (int): The amount of supplies available in the zone.
     """
 
-    def __init__(self, name: string="", coordinate: Coordinate=Coordinate(), severity: Severity=3, population: int=0):
+    # no per-instance __dict__, which matters on graphs of millions of zones
+    __slots__ = ("name", "coordinate", "severity", "population", "distanceToGoal", "heuristic", "supplies")
+
+    def __init__(self, name: string="", coordinate: Coordinate=ORIGIN, severity: Severity=3, population: int=0):
         self.name = name
         self.coordinate = coordinate
         self.severity = severity
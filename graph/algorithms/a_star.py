@@ -1,7 +1,21 @@
+import heapq
 from graph.algorithms.heuristic import edge_heuristic
-from utils.graph_generator import apply_randomness_to_graph
+from graph.csr_graph import CSRGraph, CONDITIONS_BY_CODE
+from utils.haversine import haversine
+from utils.graph_generator import apply_sampled_randomness_to_graph, apply_sampled_randomness_to_csr
+from graph.spatial_index import snap_to_zone
+from core.trip import simulate_trip
+
+def a_star(graph, start, end, use_simple_heuristic=True, vehicle=None, stats=None):
+        start = snap_to_zone(graph, start)
+        end = snap_to_zone(graph, end)
+        if isinstance(graph, CSRGraph):
+            return a_star_csr(graph, start, end, use_simple_heuristic, vehicle, stats)
+
+        # stats (SearchStats) optionally collects the counters and phase times of the search
+        if stats is not None:
+            clock = stats.start()
 
-def a_star(graph, start, end, use_simple_heuristic=True, vehicle=None):
         # open_list is a list of nodes which have been visited, but who's neighbors
         # haven't all been inspected, starts off with the start node
         # closed_list is a list of nodes which have been visited
@@ -18,28 +32,39 @@ def a_star(graph, start, end, use_simple_heuristic=True, vehicle=None):
         # parents contains an adjacency map of all nodes
         parents = {}
         parents[start] = start
-        
-        n = None
-        iterations_count = 1
-        while len(open_list) > 0:
-            if not use_simple_heuristic and iterations_count % 3 == 0:
-                apply_randomness_to_graph(graph)
 
+        # h caches the heuristic of every zone pushed so far, it only depends on the zone and the goal
+        h = {}
+        distances_to_goal = graph.distances_to_goal(end)
+        if stats is not None:
+            clock = stats.lap("heuristic", clock)
+
+        # the weighted mode reads the road conditions and availability from a pinned snapshot,
+        # so updates published by other searches never change the map halfway through a relaxation
+        if not use_simple_heuristic:
+            snapshot = graph.snapshot()
+            road_ids = graph.road_ids
+
+        # heap holds (f, tie-breaker, g, zone) entries ordered by the evaluation function f();
+        # instead of decreasing keys in place a new entry is pushed, and entries whose g is no
+        # longer the best known one (or whose zone was already closed) are skipped when popped
+        heap = [(0, 0, 0, start)]
+        counter = 1
+
+        iterations_count = 1
+        while heap:
             # find a node with the lowest value of f() - evaluation function
-            calc_heurist = {}
-            flag = False
-            for v in open_list:
-                if n == None:
-                    n = v
-                else:
-                    v.determine_self_heuristic()
-                    flag = True
-                    h = v.calculate_distance_between_zones(end) + (0.0 if use_simple_heuristic else v.heuristic)    
-                    calc_heurist[v] = g[v] + h
-            if flag == True:
-                n = get_min_heuristic(calc_heurist)  
-            if n == None:
-                return None, None, None
+            _, _, g_n, n = heapq.heappop(heap)
+            if n not in open_list or g_n > g[n]:
+                continue
+
+            # the map changes while the search runs, only the sampled roads are touched
+            # and their new weights are picked up when they are relaxed
+            if not use_simple_heuristic and iterations_count % 3 == 0:
+                apply_sampled_randomness_to_graph(graph)
+                snapshot = graph.snapshot()
+                if stats is not None:
+                    stats.dynamic_updates += 1
 
             # if the current node is the end
             # then we begin reconstructing the path from it to the start
@@ -54,37 +79,24 @@ def a_star(graph, start, end, use_simple_heuristic=True, vehicle=None):
 
                 reconst_path.reverse()
 
-                total_path_cost = 0
-                for i in range(len(reconst_path) - 1):
-                    distance = reconst_path[i].calculate_distance_between_zones(reconst_path[i + 1])
-                    total_path_cost += distance
-                    if not use_simple_heuristic and vehicle:
-                        autonomy_loss = vehicle.calculate_autonomy_loss(distance)
-                        print(f'Vehicle autonomy: {vehicle.autonomy}')
-                        if vehicle.autonomy - autonomy_loss < 0:
-                            reconst_path[i].supplies += vehicle.load
-                            vehicle.load = 0
-                            print('Vehicle ran out of autonomy!')
-                            return reconst_path[:i+1], closed_list, total_path_cost
-                        
-                        vehicle.autonomy -= autonomy_loss
-                        
-                        supplies_to_leave = reconst_path[i].calculate_supplies_to_leave()
-                        print(f'Vehicle load: {vehicle.load}, supplies to leave: {supplies_to_leave}')
-                        if vehicle.load - supplies_to_leave < 0:
-                            reconst_path[i].supplies += vehicle.load
-                            vehicle.load = 0
-                            print('Vehicle ran out of supplies!')
-                            return reconst_path[:i+1], closed_list, total_path_cost
-                        
-                        reconst_path[i].supplies += supplies_to_leave
-                        vehicle.load -= supplies_to_leave
-
-                return (reconst_path, closed_list, total_path_cost)
+                if stats is None:
+                    return travel_path(reconst_path, closed_list, use_simple_heuristic, vehicle)
+                stats.record_heap(iterations_count - 1, counter, len(heap), len(h))
+                clock = stats.lap("search", clock)
+                result = travel_path(reconst_path, closed_list, use_simple_heuristic, vehicle)
+                stats.lap("path", clock)
+                return result
 
             # for all neighbors of the current node do
-            for (m, road) in graph.get_connections(n):
-                weight = road.cost if use_simple_heuristic else edge_heuristic(road.cost, road.conditions, road.geography, road.infrastructure, road.availability, vehicle.type)
+            connections = graph.get_connections(n)
+            if stats is not None:
+                stats.relaxations += len(connections)
+            for (m, road) in connections:
+                if use_simple_heuristic:
+                    weight = road.cost
+                else:
+                    road_id = road_ids[road]
+                    weight = edge_heuristic(road.cost, CONDITIONS_BY_CODE[snapshot.conditions[road_id]], road.infrastructure, road.geography, snapshot.availability[road_id], vehicle.type)
                 # if the current node isn't in both open_list and closed_list
                 # add it to open_list and note n as it's parent
                 if m not in open_list and m not in closed_list:
@@ -95,14 +107,24 @@ def a_star(graph, start, end, use_simple_heuristic=True, vehicle=None):
                 # otherwise, check if it's quicker to first visit n, then m
                 # and if it is, update parent data and g data
                 # and if the node was in the closed_list, move it to open_list
+                elif g[m] > g[n] + weight:
+                    g[m] = g[n] + weight
+                    parents[m] = n
+
+                    if m in closed_list:
+                        closed_list.remove(m)
+                        open_list.add(m)
+                        if stats is not None:
+                            stats.reopenings += 1
+
                 else:
-                    if g[m] > g[n] + weight:
-                        g[m] = g[n] + weight
-                        parents[m] = n
+                    continue
 
-                        if m in closed_list:
-                            closed_list.remove(m)
-                            open_list.add(m)
+                if m not in h:
+                    m.determine_self_heuristic()
+                    h[m] = distances_to_goal[m] + (0.0 if use_simple_heuristic else m.heuristic)
+                heapq.heappush(heap, (g[m] + h[m], counter, g[m], m))
+                counter += 1
 
             # remove n from the open_list, and add it to closed_list
             # because all of his neighbors were inspected
@@ -111,13 +133,137 @@ def a_star(graph, start, end, use_simple_heuristic=True, vehicle=None):
 
             iterations_count += 1
 
+        if stats is not None:
+            stats.record_heap(iterations_count - 1, counter, len(heap), len(h))
+            stats.lap("search", clock)
         return None, None, None
 
-def get_min_heuristic(map):
-    minimum = float('inf')
-    zone = None
-    for key in map:
-        if map[key] < minimum:
-            minimum = map[key]
-            zone = key
-    return zone
\ No newline at end of file
+def a_star_csr(graph, start, end, use_simple_heuristic=True, vehicle=None, stats=None):
+    """
+    A* search over the CSR form of a graph, with the same evaluation function as a_star.
+
+    Args:
+        graph (CSRGraph): The CSR graph.
+        start (Zone or int or Coordinate): The starting zone or its id.
+        end (Zone or int or Coordinate): The target zone or its id.
+        use_simple_heuristic (bool): Whether to use the road cost instead of the weighted, dynamic mode.
+        vehicle (Vehicle): The vehicle used in the weighted mode.
+        stats (SearchStats): Optional counters and phase times of the search.
+
+    Returns:
+        tuple: (path, visited_zones, total_cost)
+    """
+    if stats is not None:
+        clock = stats.start()
+    start = snap_to_zone(graph, start)
+    end = snap_to_zone(graph, end)
+    start = graph.zone_id(start)
+    end = graph.zone_id(end)
+    offsets, neighbors, edge_roads = graph.offsets, graph.neighbors, graph.edge_roads
+
+    g = {start: 0}
+    parents = {start: start}
+    h = {}
+    distances_to_goal = graph.distances_to_goal(end)
+    if use_simple_heuristic:
+        weights = graph.cost
+    else:
+        # the weighted mode pins the road state, concurrent updates only show up in later snapshots
+        snapshot = graph.snapshot()
+        weights = graph.weights_for(vehicle.type, snapshot)
+    if stats is not None:
+        clock = stats.lap("heuristic", clock)
+    closed_list = set()
+    heap = [(0, 0, 0, start)]
+    counter = 1
+
+    iterations_count = 1
+    while heap:
+        _, _, g_n, n = heapq.heappop(heap)
+        if n in closed_list or g_n > g[n]:
+            continue
+
+        if not use_simple_heuristic and iterations_count % 3 == 0:
+            apply_sampled_randomness_to_csr(graph)
+            snapshot = graph.snapshot()
+            weights = graph.weights_for(vehicle.type, snapshot)
+            if stats is not None:
+                stats.dynamic_updates += 1
+
+        if n == end:
+            reconst_path = [n]
+            while parents[n] != n:
+                n = parents[n]
+                reconst_path.append(n)
+            reconst_path.reverse()
+
+            if stats is not None:
+                stats.record_heap(iterations_count - 1, counter, len(heap), len(h))
+                clock = stats.lap("search", clock)
+            if graph.zones is None:
+                result = reconst_path, closed_list, graph.path_cost(reconst_path)
+            else:
+                result = travel_path(graph.to_zones(reconst_path), set(graph.to_zones(closed_list)), use_simple_heuristic, vehicle)
+            if stats is not None:
+                stats.lap("path", clock)
+            return result
+
+        lo, hi = offsets[n], offsets[n + 1]
+        if stats is not None:
+            stats.relaxations += int(hi - lo)
+        for m, road in zip(neighbors[lo:hi].tolist(), edge_roads[lo:hi].tolist()):
+            g_m = g[n] + weights[road]
+            if m in g and g[m] <= g_m:
+                continue
+
+            # a shorter way to m was found, (re)open it
+            g[m] = g_m
+            parents[m] = n
+            if m in closed_list:
+                closed_list.remove(m)
+                if stats is not None:
+                    stats.reopenings += 1
+
+            if m not in h:
+                h[m] = distances_to_goal[m] + (0.0 if use_simple_heuristic else graph.zone_heuristic(m))
+            heapq.heappush(heap, (g_m + h[m], counter, g_m, m))
+            counter += 1
+
+        closed_list.add(n)
+        iterations_count += 1
+
+    if stats is not None:
+        stats.record_heap(iterations_count - 1, counter, len(heap), len(h))
+        stats.lap("search", clock)
+    return None, None, None
+
+def travel_path(reconst_path, closed_list, use_simple_heuristic=True, vehicle=None):
+    """
+    Compute the cost of a found path and, in the weighted mode, drive the vehicle along it
+    leaving supplies at every zone until it runs out of autonomy or load.
+
+    The trip is kept as vehicle.trip, a TripSimulation with a record of every leg.
+
+    Args:
+        reconst_path (list): The zones of the path, from start to goal.
+        closed_list (set): The zones visited by the search.
+        use_simple_heuristic (bool): Whether the search ran in the simple mode.
+        vehicle (Vehicle): The vehicle driving the path in the weighted mode.
+
+    Returns:
+        tuple: (path, visited_zones, total_cost), the path being cut where the vehicle stopped.
+    """
+    # distance of every leg of the path, computed in bulk
+    legs = haversine(
+        [zone.coordinate.latitude for zone in reconst_path[:-1]], [zone.coordinate.longitude for zone in reconst_path[:-1]],
+        [zone.coordinate.latitude for zone in reconst_path[1:]], [zone.coordinate.longitude for zone in reconst_path[1:]],
+    ).tolist()
+
+    if use_simple_heuristic or not vehicle:
+        total_path_cost = 0
+        for distance in legs:
+            total_path_cost += distance
+        return reconst_path, closed_list, total_path_cost
+
+    vehicle.trip = simulate_trip(reconst_path, legs, vehicle)
+    return vehicle.trip.path, closed_list, vehicle.trip.cost
@@ -0,0 +1,159 @@
+import heapq
+import numpy as np
+
+from graph.algorithms.a_star import travel_path
+from graph.spatial_index import snap_to_zone
+
+INF = float('inf')
+
+
+def alt_a_star(graph, start, end, bidirectional=False):
+    """
+    A* search on the road cost guided by ALT landmark lower bounds.
+
+    The heuristic of a zone is the largest of its straight-line distance to the goal and of the
+    triangle inequality bounds given by the landmarks of the graph, which are preprocessed with
+    the default settings on first use if Graph.preprocess_landmarks was not called.
+
+    Args:
+        graph (Graph): The graph containing zones and connections.
+        start (Zone or Coordinate): The starting zone.
+        end (Zone or Coordinate): The target zone.
+        bidirectional (bool): Whether to search from both ends at once.
+
+    Returns:
+        tuple: (path, visited_zones, total_cost)
+    """
+    start = snap_to_zone(graph, start)
+    end = snap_to_zone(graph, end)
+    if bidirectional:
+        return bidirectional_alt_a_star(graph, start, end)
+    if graph.landmarks is None:
+        graph.preprocess_landmarks()
+
+    columns = graph.landmarks.columns
+    heuristic = lower_bounds_to(graph, end).tolist()
+
+    g = {start: 0}
+    parents = {start: start}
+    closed_list = set()
+    heap = [(heuristic[columns[start]], 0, 0, start)]
+    counter = 1
+
+    while heap:
+        _, _, g_n, n = heapq.heappop(heap)
+        if n in closed_list or g_n > g[n]:
+            continue
+
+        if n == end:
+            path = [n]
+            while parents[n] != n:
+                n = parents[n]
+                path.append(n)
+            path.reverse()
+            return travel_path(path, closed_list)
+
+        for m, road in graph.get_connections(n):
+            g_m = g_n + road.cost
+            if g_m < g.get(m, INF):
+                g[m] = g_m
+                parents[m] = n
+                closed_list.discard(m)
+                heapq.heappush(heap, (g_m + heuristic[columns[m]], counter, g_m, m))
+                counter += 1
+
+        closed_list.add(n)
+
+    return None, None, None
+
+
+def bidirectional_alt_a_star(graph, start, end):
+    """
+    Bidirectional A* with the average ALT potentials: the forward search uses
+    p(v) = (bound(v, end) - bound(start, v)) / 2 and the backward search -p(v). Both potentials are
+    consistent, so the two searches behave as Dijkstra on the same reduced costs and can stop as
+    soon as their smallest keys add up to the best meeting cost found.
+
+    Args:
+        graph (Graph): The graph containing zones and connections.
+        start (Zone or Coordinate): The starting zone.
+        end (Zone or Coordinate): The target zone.
+
+    Returns:
+        tuple: (path, visited_zones, total_cost)
+    """
+    start = snap_to_zone(graph, start)
+    end = snap_to_zone(graph, end)
+    if graph.landmarks is None:
+        graph.preprocess_landmarks()
+
+    columns = graph.landmarks.columns
+    potential = ((lower_bounds_to(graph, end) - lower_bounds_to(graph, start)) / 2).tolist()
+
+    # index 0 is the forward search from start, index 1 the backward search from end
+    g = ({start: 0}, {end: 0})
+    parents = ({start: None}, {end: None})
+    settled = (set(), set())
+    heaps = ([(potential[columns[start]], 0, 0, start)], [(-potential[columns[end]], 0, 0, end)])
+    signs = (1, -1)
+    counter = 1
+
+    best_cost = 0 if start == end else INF
+    meeting_zone = start if start == end else None
+
+    while True:
+        # drop stale entries from the top of both heaps
+        for side in (0, 1):
+            heap = heaps[side]
+            while heap and (heap[0][3] in settled[side] or heap[0][2] > g[side][heap[0][3]]):
+                heapq.heappop(heap)
+        if not heaps[0] or not heaps[1] or heaps[0][0][0] + heaps[1][0][0] >= best_cost:
+            break
+
+        side = 0 if heaps[0][0][0] <= heaps[1][0][0] else 1
+        _, _, g_n, n = heapq.heappop(heaps[side])
+        settled[side].add(n)
+
+        side_g, other_g = g[side], g[1 - side]
+        for m, road in graph.get_connections(n):
+            g_m = g_n + road.cost
+            if g_m < side_g.get(m, INF):
+                side_g[m] = g_m
+                parents[side][m] = n
+                heapq.heappush(heaps[side], (g_m + signs[side] * potential[columns[m]], counter, g_m, m))
+                counter += 1
+            if m in other_g and side_g[m] + other_g[m] < best_cost:
+                best_cost = side_g[m] + other_g[m]
+                meeting_zone = m
+
+    if meeting_zone is None:
+        return None, None, None
+
+    path = []
+    zone = meeting_zone
+    while zone is not None:
+        path.append(zone)
+        zone = parents[0][zone]
+    path.reverse()
+    zone = parents[1][meeting_zone]
+    while zone is not None:
+        path.append(zone)
+        zone = parents[1][zone]
+
+    return travel_path(path, settled[0] | settled[1])
+
+
+def lower_bounds_to(graph, target):
+    """
+    Lower bound of the road distance from every zone to a target, the largest of the landmark
+    bounds and of the straight-line distance.
+
+    Args:
+        graph (Graph): The graph, with its landmarks preprocessed.
+        target (Zone): The target zone.
+
+    Returns:
+        np.ndarray: The lower bound of every zone, indexed by the landmark columns.
+    """
+    straight_line = np.fromiter(graph.distances_to_goal(target).values(), dtype=np.float64, count=len(graph.graph))
+    return np.maximum(graph.landmarks.lower_bounds_to(target), straight_line)
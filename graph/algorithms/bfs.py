@@ -1,39 +1,59 @@
-from queue import Queue
+from collections import deque
+from graph.csr_graph import CSRGraph
+from utils.haversine import zone_path_length
+from graph.spatial_index import snap_to_zone
 
-def bfs(graph, start_zone, goal_zone):
+def bfs(graph, start_zone, goal_zone, stats=None):
     """
     Breadth-First Search (BFS) algorithm to find the shortest path between zones.
 
     Args:
-        graph (Graph): The graph containing zones and connections.
-        start_zone (Zone): The starting zone.
-        goal_zone (Zone): The target zone.
+        graph (Graph or CSRGraph): The graph containing zones and connections.
+        start_zone (Zone or Coordinate): The starting zone.
+        goal_zone (Zone or Coordinate): The target zone.
+        stats (SearchStats): Optional counters and phase times of the search.
 
     Returns:
         tuple: (path, visited_zones, total_cost)
     """
+    start_zone = snap_to_zone(graph, start_zone)
+    goal_zone = snap_to_zone(graph, goal_zone)
+    if isinstance(graph, CSRGraph):
+        return bfs_csr(graph, start_zone, goal_zone, stats)
+
+    if stats is not None:
+        clock = stats.start()
     visited = set()
-    queue = Queue()
+    # single-threaded search, a plain deque avoids the locking of queue.Queue
+    queue = deque()
     cost = 0
 
-    queue.put(start_zone)
+    queue.append(start_zone)
     visited.add(start_zone)
 
     parent = dict()
     parent[start_zone] = None
 
     path_found = False
-    while not queue.empty() and path_found == False:
-        current_zone = queue.get()
+    while queue and path_found == False:
+        current_zone = queue.popleft()
         if current_zone == goal_zone:
             path_found = True
         else:
-            for neighbor, road in graph.get_connections(current_zone):
+            connections = graph.get_connections(current_zone)
+            if stats is not None:
+                stats.relaxations += len(connections)
+            for neighbor, road in connections:
                 if neighbor not in visited:
-                    queue.put(neighbor)
+                    queue.append(neighbor)
                     parent[neighbor] = current_zone 
                     visited.add(neighbor)
 
+    if stats is not None:
+        # every dequeued zone was expanded, except the goal
+        stats.expansions += len(visited) - len(queue) - path_found
+        clock = stats.lap("search", clock)
+
     path = []
     if path_found:
         path.append(goal_zone)
@@ -42,10 +62,144 @@ def bfs(graph, start_zone, goal_zone):
             goal_zone = parent[goal_zone]
         path.reverse()    
         cost = calculate_cost(path)
+        if stats is not None:
+            stats.lap("path", clock)
         return path, visited, cost
     
     return None, None, None
 
+def bfs_csr(graph, start_zone, goal_zone, stats=None):
+    """
+    Breadth-First Search over the CSR form of a graph.
+
+    Args:
+        graph (CSRGraph): The CSR graph.
+        start_zone (Zone or int): The starting zone or its id.
+        goal_zone (Zone or int): The target zone or its id.
+        stats (SearchStats): Optional counters and phase times of the search.
+
+    Returns:
+        tuple: (path, visited_zones, total_cost)
+    """
+    if stats is not None:
+        clock = stats.start()
+    start = graph.zone_id(start_zone)
+    goal = graph.zone_id(goal_zone)
+    offsets, neighbors = graph.offsets, graph.neighbors
+
+    queue = deque([start])
+    parent = {start: None}
+
+    while queue:
+        current = queue.popleft()
+        if current == goal:
+            if stats is not None:
+                stats.expansions += len(parent) - len(queue) - 1
+                clock = stats.lap("search", clock)
+            path = []
+            while current is not None:
+                path.append(current)
+                current = parent[current]
+            path.reverse()
+            result = graph.to_zones(path), set(graph.to_zones(parent)), graph.path_cost(path)
+            if stats is not None:
+                stats.lap("path", clock)
+            return result
+
+        lo, hi = offsets[current], offsets[current + 1]
+        if stats is not None:
+            stats.relaxations += int(hi - lo)
+        for neighbor in neighbors[lo:hi].tolist():
+            if neighbor not in parent:
+                parent[neighbor] = current
+                queue.append(neighbor)
+
+    if stats is not None:
+        stats.expansions += len(parent)
+        stats.lap("search", clock)
+    return None, None, None
+
+def bidirectional_bfs(graph, start_zone, goal_zone, stats=None):
+    """
+    Bidirectional Breadth-First Search, growing one BFS tree from the start and another from the goal
+    until they meet. Expanding the smaller frontier one whole layer at a time keeps the path with
+    the fewest edges while exploring far fewer zones than a single BFS on sparse graphs.
+
+    Args:
+        graph (Graph or CSRGraph): The graph containing zones and connections.
+        start_zone (Zone or Coordinate): The starting zone.
+        goal_zone (Zone or Coordinate): The target zone.
+        stats (SearchStats): Optional counters and phase times of the search.
+
+    Returns:
+        tuple: (path, visited_zones, total_cost)
+    """
+    if stats is not None:
+        clock = stats.start()
+    start_zone = snap_to_zone(graph, start_zone)
+    goal_zone = snap_to_zone(graph, goal_zone)
+    is_csr = isinstance(graph, CSRGraph)
+    if is_csr:
+        start_zone, goal_zone = graph.zone_id(start_zone), graph.zone_id(goal_zone)
+
+    # parent of every zone reached from each side, and each side's current layer
+    forward_parent = {start_zone: None}
+    backward_parent = {goal_zone: None}
+    forward_layer = [start_zone]
+    backward_layer = [goal_zone]
+
+    meeting_zone = start_zone if start_zone == goal_zone else None
+    while meeting_zone is None and forward_layer and backward_layer:
+        if len(forward_layer) <= len(backward_layer):
+            layer, parent, other_parent = forward_layer, forward_parent, backward_parent
+        else:
+            layer, parent, other_parent = backward_layer, backward_parent, forward_parent
+
+        next_layer = []
+        if stats is not None:
+            stats.expansions += len(layer)
+        for current_zone in layer:
+            adjacent = graph.adjacent_zones(current_zone)
+            if stats is not None:
+                stats.relaxations += len(adjacent)
+            for neighbor in adjacent:
+                if neighbor not in parent:
+                    parent[neighbor] = current_zone
+                    next_layer.append(neighbor)
+                    # the first meeting inside a layer is as short as any other one in it
+                    if meeting_zone is None and neighbor in other_parent:
+                        meeting_zone = neighbor
+
+        if parent is forward_parent:
+            forward_layer = next_layer
+        else:
+            backward_layer = next_layer
+
+    if stats is not None:
+        clock = stats.lap("search", clock)
+    if meeting_zone is None:
+        return None, None, None
+
+    path = []
+    zone = meeting_zone
+    while zone is not None:
+        path.append(zone)
+        zone = forward_parent[zone]
+    path.reverse()
+    zone = backward_parent[meeting_zone]
+    while zone is not None:
+        path.append(zone)
+        zone = backward_parent[zone]
+
+    visited = forward_parent.keys() | backward_parent.keys()
+    if is_csr:
+        result = graph.to_zones(path), set(graph.to_zones(visited)), graph.path_cost(path)
+    else:
+        result = path, visited, calculate_cost(path)
+    if stats is not None:
+        stats.lap("path", clock)
+    return result
+
 def calculate_cost(path):
     """
     Calculate the total cost of the path.
@@ -56,7 +210,4 @@ def calculate_cost(path):
     Returns:
         float: The total cost of the path.
     """
-    total_cost = 0
-    for i in range(len(path) - 1):
-        total_cost += path[i].calculate_distance_between_zones(path[i + 1])
-    return total_cost
+    return zone_path_length(path)
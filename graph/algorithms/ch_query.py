@@ -0,0 +1,27 @@
+from graph.algorithms.a_star import travel_path
+from graph.spatial_index import snap_to_zone
+
+
+def ch_search(graph, start, end):
+    """
+    Shortest path query on the contraction hierarchy of the graph, built on first use if
+    Graph.preprocess_contraction_hierarchy was not called.
+
+    Unlike a_star the hierarchy never uses unavailable roads, and road changes published on the
+    graph are taken into account by re-customizing only the affected part of the hierarchy.
+
+    Args:
+        graph (Graph): The graph containing zones and connections.
+        start (Zone or Coordinate): The starting zone.
+        end (Zone or Coordinate): The target zone.
+
+    Returns:
+        tuple: (path, visited_zones, total_cost)
+    """
+    start = snap_to_zone(graph, start)
+    end = snap_to_zone(graph, end)
+    hierarchy = graph.preprocess_contraction_hierarchy()
+    path, visited, _ = hierarchy.query(start, end)
+    if path is None:
+        return None, None, None
+    return travel_path(path, visited)
@@ -1,49 +1,172 @@
-def dfs(graph, start_zone, goal_zone):
+from itertools import count
+from graph.csr_graph import CSRGraph
+from utils.haversine import zone_path_length
+from graph.spatial_index import snap_to_zone
+
+def dfs(graph, start_zone, goal_zone, depth_limit=None, stats=None):
     """
     Depth-First Search algorithm to find the best path in terms of minimum cost.
 
     Args:
-        graph (Graph): The graph containing zones and connections.
-        start_zone (Zone): The starting zone.
-        goal_zone (Zone): The target zone.
+        graph (Graph or CSRGraph): The graph containing zones and connections.
+        start_zone (Zone or Coordinate): The starting zone.
+        goal_zone (Zone or Coordinate): The target zone.
+        depth_limit (int): Optional maximum number of edges of the path.
+        stats (SearchStats): Optional counters and phase times of the search.
 
     Returns:
         tuple: (best_path, visited_zones, total_cost)
     """
-    path = []
-    visited = set()
-    return dfs_recursive(graph, start_zone, goal_zone, path, visited)
+    start_zone = snap_to_zone(graph, start_zone)
+    goal_zone = snap_to_zone(graph, goal_zone)
+    if isinstance(graph, CSRGraph):
+        return dfs_csr(graph, start_zone, goal_zone, depth_limit, stats)
+
+    if stats is not None:
+        clock = stats.start()
+    path, visited, _ = depth_first_search(graph.adjacent_zones, start_zone, goal_zone, depth_limit, stats)
+    if stats is not None:
+        clock = stats.lap("search", clock)
+    if path is None:
+        return None, None, None
+    result = path, visited, calculate_cost(path)
+    if stats is not None:
+        stats.lap("path", clock)
+    return result
 
-def dfs_recursive(graph, start_zone, goal_zone, path, visited):
+def dfs_csr(graph, start_zone, goal_zone, depth_limit=None, stats=None):
     """
-    Recursive helper function for the Depth-First Search algorithm.
+    Depth-First Search over the CSR form of a graph, visiting neighbors in the same order as dfs.
 
     Args:
-        graph (Graph): The graph containing zones and connections.
-        start_zone (Zone): The starting zone.
-        goal_zone (Zone): The target zone.
-        path (list): The current path.
-        visited (set): The set of visited zones.
-    
+        graph (CSRGraph): The CSR graph.
+        start_zone (Zone or int): The starting zone or its id.
+        goal_zone (Zone or int): The target zone or its id.
+        depth_limit (int): Optional maximum number of edges of the path.
+        stats (SearchStats): Optional counters and phase times of the search.
+
     Returns:
         tuple: (best_path, visited_zones, total_cost)
     """
-    path.append(start_zone)
-    visited.add(start_zone)
-
-    if start_zone == goal_zone:
-        cost = calculate_cost(path)
-        return path, visited, cost
-    
-    for neighbor, road in graph.get_connections(start_zone):
-        if neighbor not in visited:
-            best_path, zone_visited, current_cost = dfs_recursive(graph, neighbor, goal_zone, path, visited)
-            if best_path is not None:
-                return best_path, zone_visited, current_cost
-    
-    path.pop()
+    if stats is not None:
+        clock = stats.start()
+    path, visited, _ = depth_first_search(graph.adjacent_zones, graph.zone_id(start_zone), graph.zone_id(goal_zone), depth_limit, stats)
+    if stats is not None:
+        clock = stats.lap("search", clock)
+    if path is None:
+        return None, None, None
+    result = graph.to_zones(path), set(graph.to_zones(visited)), graph.path_cost(path)
+    if stats is not None:
+        stats.lap("path", clock)
+    return result
+
+def iddfs(graph, start_zone, goal_zone, max_depth=None, stats=None):
+    """
+    Iterative Deepening Depth-First Search, repeating a depth-limited DFS with growing limits
+    so the path found has the fewest edges while memory stays linear in the depth.
+
+    Args:
+        graph (Graph or CSRGraph): The graph containing zones and connections.
+        start_zone (Zone or Coordinate): The starting zone.
+        goal_zone (Zone or Coordinate): The target zone.
+        max_depth (int): Optional largest depth limit to try.
+        stats (SearchStats): Optional counters and phase times of the search, summed over the iterations.
+
+    Returns:
+        tuple: (best_path, visited_zones, total_cost), visited_zones being those of the last iteration.
+    """
+    if stats is not None:
+        clock = stats.start()
+    start_zone = snap_to_zone(graph, start_zone)
+    goal_zone = snap_to_zone(graph, goal_zone)
+    if isinstance(graph, CSRGraph):
+        start, goal = graph.zone_id(start_zone), graph.zone_id(goal_zone)
+    else:
+        start, goal = start_zone, goal_zone
+
+    for depth_limit in count():
+        if max_depth is not None and depth_limit > max_depth:
+            break
+
+        path, visited, cutoff = depth_first_search(graph.adjacent_zones, start, goal, depth_limit, stats)
+        if path is not None:
+            if stats is not None:
+                clock = stats.lap("search", clock)
+            if isinstance(graph, CSRGraph):
+                result = graph.to_zones(path), set(graph.to_zones(visited)), graph.path_cost(path)
+            else:
+                result = path, visited, calculate_cost(path)
+            if stats is not None:
+                stats.lap("path", clock)
+            return result
+
+        # nothing was left unexplored because of the limit, a deeper search cannot find more
+        if not cutoff:
+            break
+
+    if stats is not None:
+        stats.lap("search", clock)
     return None, None, None
 
+def depth_first_search(neighbors_of, start, goal, depth_limit=None, stats=None):
+    """
+    Explicit-stack Depth-First Search, exploring neighbors in the order neighbors_of returns them.
+
+    Without a depth limit every zone is entered once. With a limit a zone is entered again when it
+    is reached through a shallower path, otherwise a deep first visit could hide a goal that is
+    within the limit.
+
+    Args:
+        neighbors_of (callable): Function returning the neighbors of a zone.
+        start: The starting zone.
+        goal: The target zone.
+        depth_limit (int): Optional maximum number of edges of the path.
+        stats (SearchStats): Optional counters of the search, the entered zones counted as expansions.
+
+    Returns:
+        tuple: (path, visited_zones, cutoff), path being None when the goal was not found and
+               cutoff telling whether some zone was not expanded because of the depth limit.
+    """
+    path = [start]
+    # depth at which each visited zone was last entered
+    depth = {start: 0}
+    cutoff = False
+
+    if start == goal:
+        return path, set(depth), cutoff
+    if depth_limit is not None and depth_limit <= 0:
+        return None, set(depth), True
+
+    # Each stack entry is the iterator over the remaining neighbors of the zone at the same depth in path
+    adjacent = neighbors_of(start)
+    if stats is not None:
+        stats.expansions += 1
+        stats.relaxations += len(adjacent)
+    stack = [iter(adjacent)]
+    while stack:
+        level = len(path)
+        for neighbor in stack[-1]:
+            if neighbor not in depth or (depth_limit is not None and depth[neighbor] > level):
+                path.append(neighbor)
+                depth[neighbor] = level
+                if neighbor == goal:
+                    return path, set(depth), cutoff
+                if depth_limit is not None and level >= depth_limit:
+                    cutoff = True
+                    path.pop()
+                    continue
+                adjacent = neighbors_of(neighbor)
+                if stats is not None:
+                    stats.expansions += 1
+                    stats.relaxations += len(adjacent)
+                stack.append(iter(adjacent))
+                break
+        else:
+            stack.pop()
+            path.pop()
+
+    return None, set(depth), cutoff
+
 def calculate_cost(path):
     """
     Calculate the total cost of the path.
@@ -54,7 +177,4 @@ def calculate_cost(path):
     Returns:
         float: The total cost of the path.
     """
-    total_cost = 0
-    for i in range(len(path) - 1):
-        total_cost += path[i].calculate_distance_between_zones(path[i + 1])
-    return total_cost
+    return zone_path_length(path)
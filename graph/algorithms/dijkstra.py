@@ -0,0 +1,163 @@
+import heapq
+
+from graph.algorithms.heuristic import edge_heuristic
+from graph.csr_graph import CONDITIONS_BY_CODE
+from graph.spatial_index import snap_to_zone
+
+
+def road_cost(road):
+    """
+    Default edge weight of the shortest path searches, the cost of the road.
+    """
+    return road.cost
+
+
+def vehicle_weight(vehicle_type, graph=None):
+    """
+    Edge weight of the weighted searches for a vehicle type, see edge_heuristic.
+
+    Args:
+        vehicle_type (VehicleType): The type of the vehicle, or None for the road cost.
+        graph (Graph): Optional graph whose road state is pinned now, so the weights ignore the
+                       updates published afterwards; by default the roads are read as they are.
+
+    Returns:
+        callable: Function giving the weight of a road.
+    """
+    if vehicle_type is None:
+        return road_cost
+
+    if graph is not None:
+        snapshot = graph.snapshot()
+        road_ids = graph.road_ids
+
+        def weight(road):
+            road_id = road_ids[road]
+            return edge_heuristic(road.cost, CONDITIONS_BY_CODE[snapshot.conditions[road_id]], road.infrastructure, road.geography, snapshot.availability[road_id], vehicle_type)
+        return weight
+
+    def weight(road):
+        return edge_heuristic(road.cost, road.conditions, road.infrastructure, road.geography, road.availability, vehicle_type)
+    return weight
+
+
+def dijkstra(graph, source, weight=road_cost, targets=None):
+    """
+    Dijkstra's algorithm computing the shortest distance from a zone to every reachable zone.
+
+    With targets the sweep stops as soon as every target is settled, so a single search gives the
+    shortest paths from the source to all of them.
+
+    Args:
+        graph (Graph): The graph containing zones and connections.
+        source (Zone): The zone to measure distances from.
+        weight (callable): Function giving the weight of a road, the road cost by default.
+        targets (iterable): Optional zones after which the search can stop.
+
+    Returns:
+        tuple: (distances, parents), the distance and the previous zone on the shortest path of
+               every reached zone.
+    """
+    distances = {source: 0}
+    parents = {source: None}
+    settled = set()
+    heap = [(0, 0, source)]
+    counter = 1
+    remaining = None if targets is None else set(targets)
+
+    while heap:
+        distance, _, zone = heapq.heappop(heap)
+        if zone in settled:
+            continue
+        settled.add(zone)
+
+        if remaining is not None:
+            remaining.discard(zone)
+            if not remaining:
+                break
+
+        for neighbor, road in graph.get_connections(zone):
+            new_distance = distance + weight(road)
+            if new_distance < distances.get(neighbor, float('inf')):
+                distances[neighbor] = new_distance
+                parents[neighbor] = zone
+                heapq.heappush(heap, (new_distance, counter, neighbor))
+                counter += 1
+
+    return distances, parents
+
+
+def multi_target_dijkstra(graph, source, targets, vehicle_type=None):
+    """
+    Shortest paths from one zone to many, settling every target in a single Dijkstra sweep
+    instead of one search per target.
+
+    Args:
+        graph (Graph): The graph containing zones and connections.
+        source (Zone or Coordinate): The starting zone, e.g. a depot.
+        targets (list): The zones (or coordinates) to reach.
+        vehicle_type (VehicleType): Optional vehicle whose weighted cost is minimized instead of the road cost.
+
+    Returns:
+        dict: (path, total_cost) of every target, (None, float('inf')) for the unreachable ones.
+    """
+    source = snap_to_zone(graph, source)
+    targets = [snap_to_zone(graph, target) for target in targets]
+    distances, parents = dijkstra(graph, source, vehicle_weight(vehicle_type, graph), targets)
+
+    results = {}
+    for target in targets:
+        cost = distances.get(target, float('inf'))
+        if cost == float('inf'):
+            results[target] = (None, cost)
+            continue
+        results[target] = (extract_path(parents, target), cost)
+    return results
+
+
+def dijkstra_route(graph, start, end, vehicle=None):
+    """
+    Shortest path between two zones, a Dijkstra search stopping once the goal is settled.
+
+    With a vehicle it minimizes the vehicle's weighted cost on the road state pinned when it
+    starts. Unlike the weighted A* search it neither changes the roads nor drives the vehicle,
+    so the same query on the same road state always gives the same route.
+
+    Args:
+        graph (Graph): The graph containing zones and connections.
+        start (Zone or Coordinate): The starting zone.
+        end (Zone or Coordinate): The target zone.
+        vehicle (Vehicle): Optional vehicle whose weighted cost is minimized instead of the road cost.
+
+    Returns:
+        tuple: (path, visited_zones, total_cost), (None, None, None) when the goal is unreachable.
+    """
+    start = snap_to_zone(graph, start)
+    end = snap_to_zone(graph, end)
+    weight = vehicle_weight(None if vehicle is None else vehicle.type, graph)
+    distances, parents = dijkstra(graph, start, weight, [end])
+
+    cost = distances.get(end, float('inf'))
+    if cost == float('inf'):
+        return None, None, None
+    return extract_path(parents, end), set(distances), cost
+
+
+def extract_path(parents, target):
+    """
+    Follow the parents of a Dijkstra search back from a zone.
+
+    Args:
+        parents (dict): The previous zone of every reached zone, None for the source.
+        target (Zone): A reached zone.
+
+    Returns:
+        list: The zones from the source to the target.
+    """
+    path = []
+    zone = target
+    while zone is not None:
+        path.append(zone)
+        zone = parents[zone]
+    path.reverse()
+    return path
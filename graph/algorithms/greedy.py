@@ -1,15 +1,29 @@
-def greedy(graph, start_zone, goal_zone):
+import heapq
+from graph.csr_graph import CSRGraph
+from utils.haversine import zone_path_length
+from graph.spatial_index import snap_to_zone
+
+def greedy(graph, start_zone, goal_zone, stats=None):
     """
     Greedy algorithm to find a path using straight-line distance heuristic.
 
     Args:
-        graph (Graph): The graph containing zones and connections.
-        start_zone (Zone): The starting zone.
-        goal_zone (Zone): The target zone.
+        graph (Graph or CSRGraph): The graph containing zones and connections.
+        start_zone (Zone or Coordinate): The starting zone.
+        goal_zone (Zone or Coordinate): The target zone.
+        stats (SearchStats): Optional counters and phase times of the search.
 
     Returns:
         tuple: (best_path, visited_zones, total_cost)
     """
+    start_zone = snap_to_zone(graph, start_zone)
+    goal_zone = snap_to_zone(graph, goal_zone)
+    if isinstance(graph, CSRGraph):
+        return greedy_csr(graph, start_zone, goal_zone, stats)
+
+    if stats is not None:
+        clock = stats.start()
+
     open_list = set([start_zone])
     closed_list = set([])
 
@@ -20,16 +34,19 @@ def greedy(graph, start_zone, goal_zone):
     # Track visited zones
     visited = set()
 
-    while len(open_list) > 0:
-        n = None
+    # Binary heap of (distance to goal, tie-breaker, zone) entries for the zones in open_list
+    distances_to_goal = graph.distances_to_goal(goal_zone)
+    if stats is not None:
+        clock = stats.lap("heuristic", clock)
+    start_zone.distanceToGoal = distances_to_goal[start_zone]
+    heap = [(start_zone.distanceToGoal, 0, start_zone)]
+    counter = 1
 
-        # Find the node with the lowest heuristic value
-        for v in open_list:
-            if n is None or v.distanceToGoal < n.distanceToGoal:
-                n = v
-
-        if n is None:
-            return None, None, None
+    while heap:
+        # Find the node with the lowest heuristic value, skipping entries of already closed zones
+        _, _, n = heapq.heappop(heap)
+        if n not in open_list:
+            continue
 
         # If the current node is the goal, reconstruct the path
         if n == goal_zone:
@@ -42,15 +59,28 @@ def greedy(graph, start_zone, goal_zone):
             reconst_path.append(start_zone)
             reconst_path.reverse()
 
-            return reconst_path, visited, calculate_cost(reconst_path)
+            if stats is not None:
+                # every pushed zone had its distance to the goal looked up
+                stats.record_heap(len(closed_list), counter, len(heap), counter)
+                clock = stats.lap("search", clock)
+            result = reconst_path, visited, calculate_cost(reconst_path)
+            if stats is not None:
+                stats.lap("path", clock)
+            return result
 
         # For all neighbors of the current node
-        for (m, road) in graph.get_connections(n):
+        connections = graph.get_connections(n)
+        if stats is not None:
+            stats.relaxations += len(connections)
+        for (m, road) in connections:
             # If the current node is not in both open_list and closed_list
             # add it to open_list and note n as its parent
             if m not in open_list and m not in closed_list:
                 open_list.add(m)
                 parents[m] = n
+                m.distanceToGoal = distances_to_goal[m]
+                heapq.heappush(heap, (m.distanceToGoal, counter, m))
+                counter += 1
 
         # Remove n from open_list and add it to closed_list
         # because all of its neighbors were inspected
@@ -58,6 +88,71 @@ def greedy(graph, start_zone, goal_zone):
         closed_list.add(n)
         visited.add(n)
 
+    if stats is not None:
+        stats.record_heap(len(closed_list), counter, len(heap), counter)
+        stats.lap("search", clock)
+    return None, None, None
+
+def greedy_csr(graph, start_zone, goal_zone, stats=None):
+    """
+    Greedy search over the CSR form of a graph.
+
+    Args:
+        graph (CSRGraph): The CSR graph.
+        start_zone (Zone or int): The starting zone or its id.
+        goal_zone (Zone or int): The target zone or its id.
+        stats (SearchStats): Optional counters and phase times of the search.
+
+    Returns:
+        tuple: (best_path, visited_zones, total_cost)
+    """
+    if stats is not None:
+        clock = stats.start()
+    start = graph.zone_id(start_zone)
+    goal = graph.zone_id(goal_zone)
+    offsets, neighbors = graph.offsets, graph.neighbors
+
+    parents = {start: start}
+    closed_list = set()
+    distances_to_goal = graph.distances_to_goal(goal)
+    if stats is not None:
+        clock = stats.lap("heuristic", clock)
+    heap = [(distances_to_goal[start], 0, start)]
+    counter = 1
+
+    while heap:
+        _, _, n = heapq.heappop(heap)
+        if n in closed_list:
+            continue
+
+        if n == goal:
+            path = [n]
+            while parents[n] != n:
+                n = parents[n]
+                path.append(n)
+            path.reverse()
+            if stats is not None:
+                stats.record_heap(len(closed_list), counter, len(heap), counter)
+                clock = stats.lap("search", clock)
+            result = graph.to_zones(path), set(graph.to_zones(closed_list)), graph.path_cost(path)
+            if stats is not None:
+                stats.lap("path", clock)
+            return result
+
+        lo, hi = offsets[n], offsets[n + 1]
+        if stats is not None:
+            stats.relaxations += int(hi - lo)
+        for m in neighbors[lo:hi].tolist():
+            if m not in parents:
+                parents[m] = n
+                heapq.heappush(heap, (distances_to_goal[m], counter, m))
+                counter += 1
+
+        closed_list.add(n)
+
+    if stats is not None:
+        stats.record_heap(len(closed_list), counter, len(heap), counter)
+        stats.lap("search", clock)
     return None, None, None
 
 def calculate_cost(path):
@@ -70,7 +165,4 @@ def calculate_cost(path):
     Returns:
         float: The total cost of the path.
     """
-    total_cost = 0
-    for i in range(len(path) - 1):
-        total_cost += path[i].calculate_distance_between_zones(path[i + 1])
-    return total_cost
\ No newline at end of file
+    return zone_path_length(path)
\ No newline at end of file
@@ -1,46 +1,52 @@
+import itertools
+import numpy as np
+
 from enums.conditions import Conditions
 from enums.infrastructure import Infrastructure
 from enums.geography import Geography
 from enums.vehicle_type import VehicleType
 
-def edge_heuristic(cost, conditions, infrastructure, geography, availability, vehicle_type):
+# Normalize and weigh edge components based on Conditions
+CONDITION_WEIGHT = {
+    Conditions.VERY_GOOD: 0.8,
+    Conditions.GOOD: 1.0,
+    Conditions.REASONABLE: 1.2,
+    Conditions.BAD: 1.5,
+    Conditions.VERY_BAD: 2.0,
+}
+
+# Order of the vehicle types in the first axis of EDGE_WEIGHT_ARRAY
+VEHICLE_TYPES = list(VehicleType)
+
+
+def edge_multiplier(conditions, infrastructure, geography, availability, vehicle_type):
     """
-    Computes a heuristic score between two zones based on edge properties.
+    Computes the factor applied to the cost of an edge based on its properties.
 
     Args:
-        cost (float): The cost associated with the edge.
-        conditions (Conditions): Conditions of the edge.
+        conditions (Conditions): Conditions of the edge, None counts as neutral.
         infrastructure (Infrastructure): Infrastructure type of the edge.
         geography (Geography): Geography type of the edge.
         availability (bool): Availability of the edge.
         vehicle_type (VehicleType): Type of the vehicle
-        
+
     Returns:
-        float: Heuristic score between the two zones, or float('inf') if unavailable.
+        float: The multiplier of the edge cost, or float('inf') if the vehicle cannot use the edge.
     """
     # If the connection is not available, return infinity to avoid this edge. Drones can traverse unavailable edges.
     if not availability and vehicle_type != VehicleType.DRONE:
         return float('inf')
-    
+
     # Drones cannot traverse highways
     if vehicle_type == VehicleType.DRONE and (infrastructure == Infrastructure.HIGHWAY or conditions == Conditions.VERY_BAD or conditions == Conditions.BAD):
         return float('inf')
-    
+
     # Trucks cannot traverse mountainous terrain
     if vehicle_type == VehicleType.TRUCK and geography == Geography.MOUNTAINOUS:
         return float('inf')
 
-    # Normalize and weigh edge components based on Conditions
-    condition_weight = {
-        Conditions.VERY_GOOD: 0.8,
-        Conditions.GOOD: 1.0,
-        Conditions.REASONABLE: 1.2,
-        Conditions.BAD: 1.5,
-        Conditions.VERY_BAD: 2.0,
-    }
-    
     infrastructure_weight = 0.8 if infrastructure == Infrastructure.HIGHWAY else 1.2  # Favor high-quality infrastructure
-    
+
     # Geography weight
     geography_weight = 1.0  # Default weight
     if geography == Geography.MOUNTAINOUS:
@@ -48,6 +54,113 @@ def edge_heuristic(cost, conditions, infrastructure, geography, availability, ve
     elif geography == Geography.PLATEAU:
         geography_weight = 0.9  # Favor plateau terrain
 
-    # Combine the weights with cost to produce the heuristic score
-    edge_score = cost * condition_weight[conditions] * infrastructure_weight * geography_weight
-    return edge_score
+    return CONDITION_WEIGHT.get(conditions, 1.0) * infrastructure_weight * geography_weight
+
+
+# Every combination of edge properties, precompiled once: (conditions, infrastructure, geography, availability, vehicle type) -> multiplier
+EDGE_WEIGHT_TABLE = {
+    key: edge_multiplier(*key)
+    for key in itertools.product(
+        [None, *Conditions], [None, *Infrastructure], [None, *Geography], [False, True], VEHICLE_TYPES
+    )
+}
+
+# The same table indexed by [vehicle type, conditions code, infrastructure code, geography code, availability],
+# where the codes are the enum values and 0 stands for an unset property
+EDGE_WEIGHT_ARRAY = np.empty((len(VEHICLE_TYPES), len(Conditions) + 1, len(Infrastructure) + 1, len(Geography) + 1, 2))
+for (conditions, infrastructure, geography, availability, vehicle_type), multiplier in EDGE_WEIGHT_TABLE.items():
+    EDGE_WEIGHT_ARRAY[
+        VEHICLE_TYPES.index(vehicle_type),
+        0 if conditions is None else conditions.value,
+        0 if infrastructure is None else infrastructure.value,
+        0 if geography is None else geography.value,
+        int(availability),
+    ] = multiplier
+
+
+def edge_heuristic(cost, conditions, infrastructure, geography, availability, vehicle_type):
+    """
+    Computes a heuristic score between two zones based on edge properties.
+
+    Args:
+        cost (float): The cost associated with the edge.
+        conditions (Conditions): Conditions of the edge.
+        infrastructure (Infrastructure): Infrastructure type of the edge.
+        geography (Geography): Geography type of the edge.
+        availability (bool): Availability of the edge.
+        vehicle_type (VehicleType): Type of the vehicle
+
+    Returns:
+        float: Heuristic score between the two zones, or float('inf') if unavailable.
+    """
+    multiplier = EDGE_WEIGHT_TABLE[(conditions, infrastructure, geography, bool(availability), vehicle_type)]
+    return multiplier if multiplier == float('inf') else cost * multiplier
+
+
+def edge_weights(cost, conditions, infrastructure, geography, availability, vehicle_type):
+    """
+    Vectorized edge_heuristic over parallel arrays of road properties stored as enum codes.
+
+    Args:
+        cost (np.ndarray): The cost of every road.
+        conditions (np.ndarray): Conditions code of every road.
+        infrastructure (np.ndarray): Infrastructure code of every road.
+        geography (np.ndarray): Geography code of every road.
+        availability (np.ndarray): Availability of every road.
+        vehicle_type (VehicleType): Type of the vehicle
+
+    Returns:
+        np.ndarray: The heuristic score of every road.
+    """
+    multiplier = EDGE_WEIGHT_ARRAY[VEHICLE_TYPES.index(vehicle_type), conditions, infrastructure, geography, availability.astype(np.intp)]
+    return np.where(np.isinf(multiplier), np.inf, cost * multiplier)
+
+
+class EdgeWeights:
+    """
+    Weighted-mode cost of every road of a CSR graph, materialized once as one array per vehicle type.
+
+    Every array belongs to the road state snapshot it was computed from and is never changed
+    afterwards, since concurrent searches may still be using it. The array of a newer snapshot is
+    derived from the last one by recomputing only the roads whose attributes differ between them.
+
+    Attributes:
+        graph (CSRGraph): The graph the weights belong to.
+        weights (dict): The (snapshot, weight array) last materialized for every vehicle type.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.weights = {}
+
+    def for_vehicle(self, vehicle_type, snapshot):
+        """
+        Get the weight array of a vehicle type at a snapshot of the road state.
+
+        Args:
+            vehicle_type (VehicleType): Type of the vehicle
+            snapshot (RoadSnapshot): The conditions and availability of the roads.
+
+        Returns:
+            np.ndarray: The read-only weight of every road id.
+        """
+        graph = self.graph
+        cached = self.weights.get(vehicle_type)
+        if cached is not None and cached[0] is snapshot:
+            return cached[1]
+
+        if cached is None:
+            weights = edge_weights(graph.cost, snapshot.conditions, graph.infrastructure, graph.geography, snapshot.availability, vehicle_type)
+        else:
+            base, weights = cached
+            if snapshot.changed is not None and snapshot.version == base.version + 1:
+                roads = snapshot.changed
+            else:
+                roads = np.flatnonzero((base.conditions != snapshot.conditions) | (base.availability != snapshot.availability))
+            weights = weights.copy()
+            weights[roads] = edge_weights(graph.cost[roads], snapshot.conditions[roads], graph.infrastructure[roads],
+                                          graph.geography[roads], snapshot.availability[roads], vehicle_type)
+
+        weights.flags.writeable = False
+        self.weights[vehicle_type] = (snapshot, weights)
+        return weights
@@ -0,0 +1,190 @@
+import heapq
+
+from graph.algorithms.a_star import travel_path
+from graph.algorithms.heuristic import edge_heuristic, EDGE_WEIGHT_TABLE
+from utils.graph_generator import apply_sampled_randomness_to_graph
+from graph.spatial_index import snap_to_zone
+
+INF = float('inf')
+
+# Smallest finite edge multiplier, scaling the straight-line distance by it keeps the heuristic admissible in the weighted mode
+MIN_EDGE_MULTIPLIER = min(multiplier for multiplier in EDGE_WEIGHT_TABLE.values() if multiplier != INF)
+
+# Number of map changes lpa_star simulates after the first plan in the weighted mode
+DYNAMIC_REPLANS = 3
+
+
+class LPAStar:
+    """
+    Lifelong Planning A* (LPA*) between two fixed zones of a graph.
+
+    For every zone it has seen the planner keeps g, the cost of the best path found so far, and rhs,
+    a one-step lookahead on g. It listens to the road updates published on the graph and only
+    touches the endpoints of the changed roads, so replan repairs the existing search tree
+    instead of searching from scratch.
+
+    Attributes:
+        graph (Graph): The graph being searched.
+        start (Zone): The starting zone.
+        goal (Zone): The target zone.
+        vehicle_type (VehicleType): The vehicle of the weighted mode, or None to use the road cost.
+        expanded (set): Every zone expanded since the planner was created.
+    """
+
+    def __init__(self, graph, start, goal, vehicle_type=None):
+        self.graph = graph
+        self.start = start
+        self.goal = goal
+        self.vehicle_type = vehicle_type
+        self.expanded = set()
+
+        self.g = {}
+        self.rhs = {start: 0}
+
+        # heap of (key, tie-breaker, zone) entries, queued holds the only valid key of every queued zone
+        self.queue = []
+        self.queued = {}
+        self.counter = 0
+
+        self.distances_to_goal = graph.distances_to_goal(goal)
+        self.heuristic_scale = 1.0 if vehicle_type is None else MIN_EDGE_MULTIPLIER
+
+        self.push(start)
+        graph.updates.subscribe(self.on_road_updates)
+
+    def close(self):
+        """
+        Stop listening to the road updates of the graph.
+        """
+        self.graph.updates.unsubscribe(self.on_road_updates)
+
+    def weight(self, road):
+        if self.vehicle_type is None:
+            return road.cost
+        return edge_heuristic(road.cost, road.conditions, road.infrastructure, road.geography, road.availability, self.vehicle_type)
+
+    def key(self, zone):
+        best = min(self.g.get(zone, INF), self.rhs.get(zone, INF))
+        return (best + self.heuristic_scale * self.distances_to_goal[zone], best)
+
+    def push(self, zone):
+        key = self.key(zone)
+        self.queued[zone] = key
+        heapq.heappush(self.queue, (key, self.counter, zone))
+        self.counter += 1
+
+    def top_key(self):
+        # drop the entries superseded by a later push or by a removal
+        while self.queue:
+            key, _, zone = self.queue[0]
+            if self.queued.get(zone) == key:
+                return key
+            heapq.heappop(self.queue)
+        return (INF, INF)
+
+    def update_zone(self, zone):
+        """
+        Recompute the lookahead of a zone and (re)queue it if it became inconsistent.
+
+        Args:
+            zone (Zone): The zone to update.
+        """
+        if zone is not self.start:
+            self.rhs[zone] = min((self.g.get(neighbor, INF) + self.weight(road) for neighbor, road in self.graph.get_connections(zone)), default=INF)
+
+        self.queued.pop(zone, None)
+        if self.g.get(zone, INF) != self.rhs.get(zone, INF):
+            self.push(zone)
+
+    def on_road_updates(self, updates):
+        """
+        Feed subscriber, marks the endpoints of the changed roads for the next replan.
+
+        Args:
+            updates (list): The applied RoadUpdate objects.
+        """
+        for update in updates:
+            for zone in self.graph.road_endpoints.get(update.road, ()):
+                self.update_zone(zone)
+
+    def replan(self):
+        """
+        Expand inconsistent zones until the cost of the goal is final.
+        """
+        goal = self.goal
+        while True:
+            top_key = self.top_key()
+            if top_key == (INF, INF):
+                break
+            if top_key >= self.key(goal) and self.rhs.get(goal, INF) == self.g.get(goal, INF):
+                break
+
+            _, _, zone = heapq.heappop(self.queue)
+            del self.queued[zone]
+            self.expanded.add(zone)
+
+            if self.g.get(zone, INF) > self.rhs[zone]:
+                # overconsistent, the zone got cheaper
+                self.g[zone] = self.rhs[zone]
+            else:
+                # underconsistent, the zone got more expensive
+                self.g[zone] = INF
+                self.update_zone(zone)
+
+            for neighbor, _ in self.graph.get_connections(zone):
+                self.update_zone(neighbor)
+
+    def path(self):
+        """
+        Extract the current best path by following the cheapest predecessors back from the goal.
+
+        Returns:
+            list: The zones of the path, from start to goal, or None if the goal is unreachable.
+        """
+        if self.g.get(self.goal, INF) == INF:
+            return None
+
+        path = [self.goal]
+        zone = self.goal
+        while zone is not self.start:
+            zone = min(self.graph.get_connections(zone), key=lambda connection: self.g.get(connection[0], INF) + self.weight(connection[1]))[0]
+            if zone in path:
+                return None
+            path.append(zone)
+
+        path.reverse()
+        return path
+
+
+def lpa_star(graph, start, end, use_simple_heuristic=True, vehicle=None, replans=DYNAMIC_REPLANS):
+    """
+    Plans a path with LPA* and, in the weighted mode, keeps it up to date while the map changes,
+    repairing the search tree after every sampled change instead of searching again.
+
+    Args:
+        graph (Graph): The graph containing zones and connections.
+        start (Zone or Coordinate): The starting zone.
+        end (Zone or Coordinate): The target zone.
+        use_simple_heuristic (bool): Whether to use the road cost instead of the weighted, dynamic mode.
+        vehicle (Vehicle): The vehicle used in the weighted mode.
+        replans (int): The number of map changes simulated in the weighted mode.
+
+    Returns:
+        tuple: (path, visited_zones, total_cost)
+    """
+    start = snap_to_zone(graph, start)
+    end = snap_to_zone(graph, end)
+    planner = LPAStar(graph, start, end, None if use_simple_heuristic else vehicle.type)
+    try:
+        planner.replan()
+        if not use_simple_heuristic:
+            for _ in range(replans):
+                apply_sampled_randomness_to_graph(graph)
+                planner.replan()
+        path = planner.path()
+    finally:
+        planner.close()
+
+    if path is None:
+        return None, None, None
+    return travel_path(path, planner.expanded, use_simple_heuristic, vehicle)
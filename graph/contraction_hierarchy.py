@@ -0,0 +1,302 @@
+import heapq
+
+INF = float('inf')
+
+
+def road_weight(road):
+    """
+    Metric of the hierarchy, the road cost or infinity when the road is unavailable.
+    """
+    return road.cost if road.availability else INF
+
+
+class ContractionHierarchy:
+    """
+    Customizable contraction hierarchy (CCH) of a graph.
+
+    Preprocessing has two phases. The contraction order and the shortcuts only depend on the
+    topology of the graph: zones are contracted by minimum degree and every pair of neighbors of a
+    contracted zone gets an arc, so the hierarchy stays valid whatever the road weights are. The
+    customization then computes the weight of every arc from the roads, going up the hierarchy
+    through the lower triangles of each arc.
+
+    The hierarchy listens to the road updates of the graph. A changed road only marks its own arc,
+    and the next query re-customizes the arcs whose weight can change because of it instead of
+    rebuilding the hierarchy.
+
+    Attributes:
+        graph (Graph): The graph the hierarchy belongs to.
+        zones (list): The zones, indexed by id.
+        index (dict): The id of every zone.
+        rank (list): The contraction position of every zone.
+        up (list): The neighbors of every zone contracted after it.
+        down (list): The neighbors of every zone contracted before it.
+        weights (dict): The customized weight of every arc, keyed by (lower zone id, higher zone id).
+        middle (dict): The zone id a shortcut arc goes through, None for an arc that is a road.
+    """
+
+    def __init__(self, graph, weight=road_weight):
+        self.graph = graph
+        self.weight = weight
+        self.zones = list(graph.graph)
+        self.index = {zone: i for i, zone in enumerate(self.zones)}
+
+        # roads between every pair of adjacent zones
+        self.arc_roads = {}
+        self.road_arcs = {}
+        for zone, connections in graph.graph.items():
+            i = self.index[zone]
+            for neighbor, road in connections:
+                j = self.index[neighbor]
+                if i == j:
+                    continue
+                roads = self.arc_roads.setdefault((min(i, j), max(i, j)), [])
+                if road not in roads:
+                    roads.append(road)
+
+        self.contract()
+        for (i, j), roads in self.arc_roads.items():
+            for road in roads:
+                self.road_arcs.setdefault(road, set()).add(self.arc(i, j))
+
+        self.base = {}
+        self.weights = {}
+        self.middle = {}
+        self.dirty = set()
+        self.customize()
+
+        graph.updates.subscribe(self.on_road_updates)
+
+    def close(self):
+        """
+        Stop listening to the road updates of the graph.
+        """
+        self.graph.updates.unsubscribe(self.on_road_updates)
+
+    def arc(self, i, j):
+        """
+        Key of the arc between two zone ids, the lower ranked zone first.
+        """
+        return (i, j) if self.rank[i] < self.rank[j] else (j, i)
+
+    def contract(self):
+        """
+        Compute the metric-independent contraction order and the arcs of the hierarchy.
+
+        Zones are contracted by increasing degree in the remaining graph, connecting all remaining
+        neighbors of each contracted zone to each other (fill-in).
+        """
+        count = len(self.zones)
+        adjacency = [set() for _ in range(count)]
+        for i, j in self.arc_roads:
+            adjacency[i].add(j)
+            adjacency[j].add(i)
+
+        self.rank = [0] * count
+        self.up = [None] * count
+        self.down = [set() for _ in range(count)]
+        contracted = [False] * count
+
+        heap = [(len(neighbors), i) for i, neighbors in enumerate(adjacency)]
+        heapq.heapify(heap)
+        position = 0
+        while heap:
+            degree, zone = heapq.heappop(heap)
+            if contracted[zone] or degree != len(adjacency[zone]):
+                continue
+
+            contracted[zone] = True
+            self.rank[zone] = position
+            position += 1
+
+            neighbors = adjacency[zone]
+            self.up[zone] = sorted(neighbors)
+            for neighbor in neighbors:
+                self.down[neighbor].add(zone)
+                adjacency[neighbor].discard(zone)
+                adjacency[neighbor].update(other for other in neighbors if other != neighbor)
+                heapq.heappush(heap, (len(adjacency[neighbor]), neighbor))
+            adjacency[zone] = set()
+
+        self.order = sorted(range(count), key=self.rank.__getitem__)
+
+    def base_weight(self, arc):
+        return min((self.weight(road) for road in self.arc_roads.get(arc_pair(arc), ())), default=INF)
+
+    def customize(self):
+        """
+        Compute the weight of every arc from scratch, contracting zones in order and relaxing the
+        arc between every two upper neighbors through the contracted zone.
+        """
+        self.base = {}
+        self.weights = {}
+        self.middle = {}
+        for zone in self.order:
+            for neighbor in self.up[zone]:
+                arc = (zone, neighbor)
+                self.base[arc] = self.base_weight(arc)
+                self.weights[arc] = self.base[arc]
+                self.middle[arc] = None
+
+        weights, middle = self.weights, self.middle
+        for zone in self.order:
+            upper = self.up[zone]
+            for a in range(len(upper)):
+                first = upper[a]
+                first_weight = weights[(zone, first)]
+                if first_weight == INF:
+                    continue
+                for second in upper[a + 1:]:
+                    candidate = first_weight + weights[(zone, second)]
+                    arc = self.arc(first, second)
+                    if candidate < weights[arc]:
+                        weights[arc] = candidate
+                        middle[arc] = zone
+        self.dirty.clear()
+
+    def recustomize(self):
+        """
+        Update the weights after road changes, visiting only the arcs that depend on a changed road.
+
+        Arcs are recomputed by increasing rank of their lower zone, after every arc of their lower
+        triangles, and an arc whose weight changed marks the arcs it is a lower triangle side of.
+        """
+        heap = []
+        queued = set()
+
+        def mark(arc):
+            if arc not in queued:
+                queued.add(arc)
+                heapq.heappush(heap, (self.rank[arc[0]], arc))
+
+        for arc in self.dirty:
+            self.base[arc] = self.base_weight(arc)
+            mark(arc)
+        self.dirty.clear()
+
+        weights, middle = self.weights, self.middle
+        while heap:
+            _, arc = heapq.heappop(heap)
+            queued.discard(arc)
+            low, high = arc
+
+            weight, through = self.base[arc], None
+            for zone in self.down[low] & self.down[high]:
+                candidate = weights[(zone, low)] + weights[(zone, high)]
+                if candidate < weight:
+                    weight, through = candidate, zone
+
+            if weight == weights[arc] and through == middle[arc]:
+                continue
+            weights[arc] = weight
+            middle[arc] = through
+            for other in self.up[low]:
+                if other != high:
+                    mark(self.arc(high, other))
+
+    def on_road_updates(self, updates):
+        """
+        Feed subscriber, marks the arcs of the changed roads for the next query.
+
+        Args:
+            updates (list): The applied RoadUpdate objects.
+        """
+        for update in updates:
+            self.dirty.update(self.road_arcs.get(update.road, ()))
+
+    def query(self, start, end):
+        """
+        Shortest path between two zones, searching upward in the hierarchy from both ends.
+
+        Args:
+            start (Zone): The starting zone.
+            end (Zone): The target zone.
+
+        Returns:
+            tuple: (path, settled, cost), the zones of the unpacked path (None if unreachable),
+                   the zones settled by both searches and the path cost.
+        """
+        if self.dirty:
+            self.recustomize()
+
+        source, target = self.index[start], self.index[end]
+        weights, up = self.weights, self.up
+
+        distances = ({source: 0}, {target: 0})
+        parents = ({source: None}, {target: None})
+        settled = (set(), set())
+        heaps = ([(0, source)], [(0, target)])
+        best_cost = INF
+        meeting = None
+
+        while heaps[0] or heaps[1]:
+            side = 0 if not heaps[1] or (heaps[0] and heaps[0][0][0] <= heaps[1][0][0]) else 1
+            distance, zone = heapq.heappop(heaps[side])
+            if zone in settled[side]:
+                continue
+            # upward distances past the best meeting cost cannot improve it
+            if distance >= best_cost:
+                heaps[side].clear()
+                continue
+            settled[side].add(zone)
+
+            other = distances[1 - side].get(zone)
+            if other is not None and distance + other < best_cost:
+                best_cost = distance + other
+                meeting = zone
+
+            side_distances = distances[side]
+            for neighbor in up[zone]:
+                new_distance = distance + weights[(zone, neighbor)]
+                if new_distance < side_distances.get(neighbor, INF):
+                    side_distances[neighbor] = new_distance
+                    parents[side][neighbor] = zone
+                    heapq.heappush(heaps[side], (new_distance, neighbor))
+
+        zones = self.zones
+        visited = {zones[zone] for zone in settled[0] | settled[1]}
+        if meeting is None:
+            return None, visited, INF
+
+        upward = []
+        zone = meeting
+        while zone is not None:
+            upward.append(zone)
+            zone = parents[0][zone]
+        upward.reverse()
+        zone = parents[1][meeting]
+        while zone is not None:
+            upward.append(zone)
+            zone = parents[1][zone]
+
+        return [zones[zone] for zone in self.unpack(upward)], visited, best_cost
+
+    def unpack(self, path):
+        """
+        Replace every shortcut of a path of the hierarchy with the roads it stands for.
+
+        Args:
+            path (list): Zone ids joined by arcs of the hierarchy.
+
+        Returns:
+            list: Zone ids joined by roads.
+        """
+        unpacked = [path[0]]
+        for i in range(len(path) - 1):
+            stack = [(path[i], path[i + 1])]
+            while stack:
+                first, second = stack.pop()
+                through = self.middle[self.arc(first, second)]
+                if through is None:
+                    unpacked.append(second)
+                else:
+                    stack.append((through, second))
+                    stack.append((first, through))
+        return unpacked
+
+
+def arc_pair(arc):
+    """
+    Key of the roads of an arc, the lower zone id first.
+    """
+    return (arc[0], arc[1]) if arc[0] < arc[1] else (arc[1], arc[0])
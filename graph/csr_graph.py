@@ -0,0 +1,347 @@
+import math
+import numpy as np
+
+from enums.conditions import Conditions
+from enums.geography import Geography
+from enums.infrastructure import Infrastructure
+from graph.algorithms.heuristic import EdgeWeights
+from graph.road_state import RoadStateStore
+from graph.spatial_index import SpatialIndex
+from utils.haversine import one_to_many, path_length
+
+# Decoding tables from the int8 codes stored in the arrays back to the enums (code 0 means unset)
+CONDITIONS_BY_CODE = [None] + sorted(Conditions, key=lambda c: c.value)
+GEOGRAPHY_BY_CODE = [None] + sorted(Geography, key=lambda g: g.value)
+INFRASTRUCTURE_BY_CODE = [None] + sorted(Infrastructure, key=lambda i: i.value)
+
+# Number of goals whose distance-to-goal tables are kept by distances_to_goal
+GOAL_CACHE_SIZE = 16
+
+
+def encode_enum(value):
+    """
+    Encode an enum member as the int8 code used by the CSR arrays.
+
+    Args:
+        value (Enum): The enum member, or None.
+
+    Returns:
+        int: The enum value, or 0 when unset.
+    """
+    return 0 if value is None else value.value
+
+
+class CSRGraph:
+    """
+    Frozen, array-backed compressed sparse row (CSR) form of a Graph.
+
+    Zones are identified by integer ids and every undirected road by an integer road id. The neighbors
+    of zone i are neighbors[offsets[i]:offsets[i + 1]] and the roads used to reach them are the
+    matching slice of edge_roads, in the same order as the adjacency lists of the source Graph.
+
+    Every array is read-only. The dynamic road attributes (conditions and availability) live in
+    versioned snapshots of road_state: changes are published as a new version, and a search pins the
+    snapshot it started from so concurrent searches never see each other's changes half applied.
+
+    Attributes:
+        offsets (np.ndarray): int64 start of each zone's row, of size num_zones + 1.
+        neighbors (np.ndarray): int32 neighbor zone id of every directed edge.
+        edge_roads (np.ndarray): int32 road id of every directed edge.
+        latitude (np.ndarray): float64 latitude of every zone.
+        longitude (np.ndarray): float64 longitude of every zone.
+        population (np.ndarray): int64 population of every zone.
+        severity (np.ndarray): int8 severity of every zone.
+        cost (np.ndarray): float64 cost of every road.
+        conditions (np.ndarray): int8 Conditions code of every road (0 when unset), at the latest version.
+        geography (np.ndarray): int8 Geography code of every road (0 when unset).
+        infrastructure (np.ndarray): int8 Infrastructure code of every road (0 when unset).
+        availability (np.ndarray): bool availability of every road, at the latest version.
+        road_state (RoadStateStore): The versioned conditions and availability of the roads.
+        zones (list): The Zone object of every id, or None when the graph was built without them.
+    """
+
+    def __init__(self, offsets, neighbors, edge_roads, latitude, longitude, population, severity,
+                 cost, conditions, geography, infrastructure, availability, zones=None):
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.neighbors = np.asarray(neighbors, dtype=np.int32)
+        self.edge_roads = np.asarray(edge_roads, dtype=np.int32)
+        self.latitude = np.asarray(latitude, dtype=np.float64)
+        self.longitude = np.asarray(longitude, dtype=np.float64)
+        self.population = np.asarray(population, dtype=np.int64)
+        self.severity = np.asarray(severity, dtype=np.int8)
+        self.cost = np.asarray(cost, dtype=np.float64)
+        self.geography = np.asarray(geography, dtype=np.int8)
+        self.infrastructure = np.asarray(infrastructure, dtype=np.int8)
+        self.road_state = RoadStateStore(conditions, availability)
+        self.zones = zones
+        self.index = {zone: i for i, zone in enumerate(zones)} if zones is not None else None
+        self.goal_distances = {}
+        self.edge_weights = None
+        self.spatial_index = None
+
+        for array in (self.offsets, self.neighbors, self.edge_roads, self.latitude, self.longitude,
+                      self.population, self.severity, self.cost, self.geography, self.infrastructure):
+            array.flags.writeable = False
+
+    @classmethod
+    def from_edges(cls, latitude, longitude, sources, targets, cost, conditions=None, geography=None,
+                   infrastructure=None, availability=None, population=None, severity=None, zones=None):
+        """
+        Build a CSR graph from parallel arrays of undirected roads.
+
+        Road i connects sources[i] and targets[i]; each road is stored in both directions and
+        the rows keep the roads in the order they are given.
+
+        Args:
+            latitude (array): Latitude of every zone.
+            longitude (array): Longitude of every zone.
+            sources (array): First zone id of every road.
+            targets (array): Second zone id of every road.
+            cost (array): Cost of every road.
+            conditions, geography, infrastructure (array): Optional int8 codes of every road.
+            availability (array): Optional availability of every road, defaults to available.
+            population (array): Optional population of every zone.
+            severity (array): Optional severity of every zone, defaults to 3.
+            zones (list): Optional Zone object of every id.
+
+        Returns:
+            CSRGraph: The CSR graph.
+        """
+        num_zones = len(latitude)
+        sources = np.asarray(sources, dtype=np.int32)
+        targets = np.asarray(targets, dtype=np.int32)
+        num_roads = len(sources)
+        road_ids = np.arange(num_roads, dtype=np.int32)
+
+        # Every road appears once from each endpoint, a stable sort groups them by source zone
+        directed_sources = np.concatenate((sources, targets))
+        directed_targets = np.concatenate((targets, sources))
+        directed_roads = np.concatenate((road_ids, road_ids))
+        order = np.argsort(directed_sources, kind="stable")
+
+        offsets = np.zeros(num_zones + 1, dtype=np.int64)
+        np.cumsum(np.bincount(directed_sources, minlength=num_zones), out=offsets[1:])
+
+        def road_codes(values):
+            return np.zeros(num_roads, dtype=np.int8) if values is None else values
+
+        return cls(
+            offsets,
+            directed_targets[order],
+            directed_roads[order],
+            latitude,
+            longitude,
+            np.zeros(num_zones, dtype=np.int64) if population is None else population,
+            np.full(num_zones, 3, dtype=np.int8) if severity is None else severity,
+            cost,
+            road_codes(conditions),
+            road_codes(geography),
+            road_codes(infrastructure),
+            np.ones(num_roads, dtype=bool) if availability is None else availability,
+            zones,
+        )
+
+    @property
+    def conditions(self):
+        return self.road_state.latest.conditions
+
+    @property
+    def availability(self):
+        return self.road_state.latest.availability
+
+    @property
+    def num_zones(self):
+        return len(self.offsets) - 1
+
+    @property
+    def num_roads(self):
+        return len(self.cost)
+
+    def zone_id(self, zone):
+        """
+        Get the integer id of a zone.
+
+        Args:
+            zone (Zone or int): A Zone of the source graph, or an id.
+
+        Returns:
+            int: The zone id.
+        """
+        if isinstance(zone, (int, np.integer)):
+            return int(zone)
+        return self.index[zone]
+
+    def to_zones(self, ids):
+        """
+        Translate zone ids back to Zone objects when they are available.
+
+        Args:
+            ids (iterable): Zone ids.
+
+        Returns:
+            list: The Zone objects, or the ids themselves when the graph has no zones.
+        """
+        if self.zones is None:
+            return list(ids)
+        return [self.zones[i] for i in ids]
+
+    def get_all_zones(self):
+        """
+        Get all zones in the graph.
+
+        Returns:
+            list: The Zone objects, or the range of ids when the graph has no zones.
+        """
+        return list(self.zones) if self.zones is not None else range(self.num_zones)
+
+    def get_spatial_index(self):
+        """
+        Get the spatial index over the zone coordinates, building it if needed.
+
+        Returns:
+            SpatialIndex: The index of the zones, whose items are the zone ids.
+        """
+        if self.spatial_index is None:
+            self.spatial_index = SpatialIndex(self.latitude, self.longitude, range(self.num_zones))
+        return self.spatial_index
+
+    def nearest_zone(self, coordinate):
+        """
+        Get the id of the zone nearest to a position.
+
+        Args:
+            coordinate (Coordinate): The position.
+
+        Returns:
+            int: The nearest zone id, or None if the graph is empty.
+        """
+        return self.get_spatial_index().nearest_one(coordinate)
+
+    def get_connections(self, zone_id):
+        """
+        Get the neighbor ids of a zone and the road ids used to reach them.
+
+        Args:
+            zone_id (int): The zone id.
+
+        Returns:
+            list of tuples: Each tuple contains a neighbor id and a road id.
+        """
+        lo, hi = self.offsets[zone_id], self.offsets[zone_id + 1]
+        return list(zip(self.neighbors[lo:hi].tolist(), self.edge_roads[lo:hi].tolist()))
+
+    def adjacent_zones(self, zone_id):
+        """
+        Get the neighbor ids of a zone, in row order.
+
+        Args:
+            zone_id (int): The zone id.
+
+        Returns:
+            list: The neighbor ids.
+        """
+        return self.neighbors[self.offsets[zone_id]:self.offsets[zone_id + 1]].tolist()
+
+    def distance(self, zone1, zone2):
+        """
+        Haversine distance between two zones, as Coordinate.calculate_distance.
+
+        Args:
+            zone1 (int): First zone id.
+            zone2 (int): Second zone id.
+
+        Returns:
+            float: The distance in kilometers.
+        """
+        R = 6371
+        lat1 = math.radians(self.latitude[zone1])
+        lon1 = math.radians(self.longitude[zone1])
+        lat2 = math.radians(self.latitude[zone2])
+        lon2 = math.radians(self.longitude[zone2])
+
+        a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+        return R * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+    def path_cost(self, path):
+        """
+        Calculate the total straight-line cost of a path of zone ids.
+
+        Args:
+            path (list): The zone ids of the path.
+
+        Returns:
+            float: The total cost of the path.
+        """
+        return path_length(self.latitude[path], self.longitude[path])
+
+    def distances_to_goal(self, goal):
+        """
+        Get the straight-line distance from every zone to a goal zone, cached for the
+        GOAL_CACHE_SIZE most recently used goals.
+
+        Args:
+            goal (int): The goal zone id.
+
+        Returns:
+            np.ndarray: The distance to the goal of every zone id.
+        """
+        distances = self.goal_distances.pop(goal, None)
+        if distances is None:
+            distances = one_to_many(self.latitude[goal], self.longitude[goal], self.latitude, self.longitude)
+            if len(self.goal_distances) >= GOAL_CACHE_SIZE:
+                del self.goal_distances[next(iter(self.goal_distances))]
+
+        self.goal_distances[goal] = distances
+        return distances
+
+    def snapshot(self):
+        """
+        Pin the latest version of the road conditions and availability.
+
+        Returns:
+            RoadSnapshot: The snapshot, which later updates leave untouched.
+        """
+        return self.road_state.latest
+
+    def weights_for(self, vehicle_type, snapshot=None):
+        """
+        Get the weighted-mode cost of every road for a vehicle type.
+
+        The weight arrays are materialized once per graph and only the roads whose conditions or
+        availability changed since the last snapshot asked for are recomputed.
+
+        Args:
+            vehicle_type (VehicleType): Type of the vehicle
+            snapshot (RoadSnapshot): The pinned road state, the latest one by default.
+
+        Returns:
+            np.ndarray: The read-only weight of every road id.
+        """
+        if self.edge_weights is None:
+            self.edge_weights = EdgeWeights(self)
+        return self.edge_weights.for_vehicle(vehicle_type, self.snapshot() if snapshot is None else snapshot)
+
+    def zone_heuristic(self, zone_id):
+        """
+        Heuristic value of a zone based on its properties, as Zone.determine_self_heuristic.
+
+        Args:
+            zone_id (int): The zone id.
+
+        Returns:
+            float: The heuristic value of the zone.
+        """
+        scaled_severity = int(self.severity[zone_id]) / 6
+        scaled_population = (int(self.population[zone_id]) - 1000) / (100000 - 1000)
+        return 0.7 * scaled_severity + 0.3 * scaled_population
+
+    def nbytes(self):
+        """
+        Total memory used by the arrays of the graph.
+
+        Returns:
+            int: The size in bytes.
+        """
+        return sum(array.nbytes for array in (
+            self.offsets, self.neighbors, self.edge_roads, self.latitude, self.longitude, self.population,
+            self.severity, self.cost, self.conditions, self.geography, self.infrastructure, self.availability))
@@ -0,0 +1,87 @@
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+from graph.algorithms.dijkstra import dijkstra, vehicle_weight
+
+# Graph searched by the worker processes, set once per worker by init_worker
+worker_graph = None
+
+
+def init_worker(graph):
+    """
+    Process pool initializer, keeps the graph so it is sent once per worker instead of once per task.
+
+    Args:
+        graph (Graph): The graph to search.
+    """
+    global worker_graph
+    worker_graph = graph
+
+
+def distance_rows(graph, sources, targets, vehicle_type=None):
+    """
+    Rows of the distance matrix, one multi-target Dijkstra sweep per source.
+
+    Args:
+        graph (Graph): The graph containing zones and connections.
+        sources (list): Positions of the source zones in the zone order of the graph.
+        targets (list): Positions of the target zones in the zone order of the graph.
+        vehicle_type (VehicleType): Optional vehicle whose weighted cost is used instead of the road cost.
+
+    Returns:
+        np.ndarray: Matrix of shape (len(sources), len(targets)), infinity where unreachable.
+    """
+    zones = list(graph.graph)
+    target_zones = [zones[i] for i in targets]
+    weight = vehicle_weight(vehicle_type, graph)
+    if vehicle_type is not None:
+        # the weight of every road is computed once instead of on every relaxation of every sweep
+        weight = {road: weight(road) for road in graph.roads}.__getitem__
+
+    rows = np.full((len(sources), len(targets)), np.inf)
+    for row, source in enumerate(sources):
+        distances, _ = dijkstra(graph, zones[source], weight, target_zones)
+        rows[row] = [distances.get(zone, np.inf) for zone in target_zones]
+    return rows
+
+
+def worker_distance_rows(sources, targets, vehicle_type):
+    return distance_rows(worker_graph, sources, targets, vehicle_type)
+
+
+def distance_matrix(graph, sources, targets, vehicle_type=None, processes=None):
+    """
+    Many-to-many shortest path distances, e.g. from depots to affected zones, so that a vehicle
+    routing plan costs a single matrix build instead of one search per pair.
+
+    Zones are sent to the worker processes as their position in the graph, which a pickled copy
+    of the graph keeps, since the zone objects of a worker are copies too.
+
+    Args:
+        graph (Graph): The graph containing zones and connections.
+        sources (list): The zones the distances are measured from.
+        targets (list): The zones the distances are measured to.
+        vehicle_type (VehicleType): Optional vehicle whose weighted cost is used instead of the road cost.
+        processes (int): Number of worker processes, None or 1 to compute the matrix in this process.
+
+    Returns:
+        np.ndarray: Matrix where entry [i, j] is the distance from sources[i] to targets[j],
+                    infinity where unreachable.
+    """
+    index = {zone: i for i, zone in enumerate(graph.graph)}
+    source_ids = [index[zone] for zone in sources]
+    target_ids = [index[zone] for zone in targets]
+
+    if not processes or processes <= 1 or len(source_ids) <= 1:
+        return distance_rows(graph, source_ids, target_ids, vehicle_type)
+
+    # a few chunks per worker keeps them busy when some sources take longer than others
+    chunk_count = min(len(source_ids), processes * 4)
+    chunks = [source_ids[i::chunk_count] for i in range(chunk_count)]
+
+    matrix = np.empty((len(source_ids), len(target_ids)))
+    with ProcessPoolExecutor(max_workers=processes, initializer=init_worker, initargs=(graph,)) as executor:
+        futures = [executor.submit(worker_distance_rows, chunk, target_ids, vehicle_type) for chunk in chunks]
+        for i, future in enumerate(futures):
+            matrix[i::chunk_count] = future.result()
+    return matrix
@@ -0,0 +1,428 @@
+import math
+import os
+
+from graph.distance_matrix import distance_matrix
+from graph.spatial_index import snap_to_zone
+
+# Largest number of local search passes over the routes, a pass improving nothing ends it earlier
+MAX_LOCAL_SEARCH_PASSES = 50
+
+# Number of positions (depot and demand zones) from which the distance matrices are computed by a
+# process per CPU when no number of processes is given, below it the pool costs more than it saves
+PARALLEL_MATRIX_POSITIONS = 100
+
+# Tolerance of the capacity, autonomy and improvement comparisons, against rounding errors
+EPSILON = 1e-9
+
+
+def zone_demand(zone):
+    """
+    Supplies a zone needs, see Zone.calculate_supplies_to_leave, never negative.
+    """
+    return max(0.0, zone.calculate_supplies_to_leave())
+
+
+class FleetRoute:
+    """
+    Class representing the trip of one vehicle of the fleet, from the depot through its zones
+    and back to the depot.
+
+    Attributes:
+        vehicle (Vehicle): The vehicle driving the trip, left untouched by the planner.
+        zones (list): The zones served, in order.
+        deliveries (list): The supplies left at each zone, the vehicle leaving the depot with their sum.
+        distance (float): The length of the trip in kilometers, weighted for the type of the vehicle.
+        autonomy_used (float): The autonomy the trip takes, given the load on every leg.
+    """
+
+    def __init__(self, vehicle, zones, deliveries, distance, autonomy_used):
+        self.vehicle = vehicle
+        self.zones = zones
+        self.deliveries = deliveries
+        self.distance = distance
+        self.autonomy_used = autonomy_used
+
+    @property
+    def load(self):
+        return sum(self.deliveries)
+
+
+class FleetPlan:
+    """
+    Class representing the routes planned for a fleet.
+
+    Attributes:
+        depot (Zone): The zone every route starts and ends at.
+        routes (list): The FleetRoute of every vehicle used.
+        unserved (list): The demand zones no vehicle of the fleet can serve.
+    """
+
+    def __init__(self, depot, routes, unserved):
+        self.depot = depot
+        self.routes = routes
+        self.unserved = unserved
+
+    @property
+    def distance(self):
+        return sum(route.distance for route in self.routes)
+
+
+class FleetPlanner:
+    """
+    Capacitated vehicle routing with autonomy limits for a heterogeneous fleet.
+
+    Every demand zone is served once by one vehicle, which leaves the depot loaded with the
+    supplies of its zones and comes back empty. A route fits a vehicle when their sum is within
+    its capacity and the autonomy lost on the legs, which depends on the load carried on each of
+    them, is within its autonomy.
+
+    Routes are built with the Clarke-Wright savings heuristic, joining the routes whose merge
+    saves the most distance as long as some vehicle of the fleet fits the merged route. They are
+    then given to the vehicles, largest first and each to the smallest vehicle it fits. Zones of
+    routes left without a vehicle are inserted where they cost the least. Finally a local
+    search relocates zones between and within routes and reverses segments of routes (2-opt)
+    while that shortens the plan.
+
+    A vehicle type may be slowed down on some roads or not allowed on them at all, so the legs
+    of a route are measured on a distance matrix of the weighted costs of its vehicle type, see
+    edge_heuristic, and a route with an unreachable leg fits no vehicle of that type. The savings
+    only rank the joins, and are measured on the road distance matrix.
+
+    The matrices are computed once between the depot and the demand zones, so the graph, its
+    zones and the vehicles are only read, and a plan can be computed again or in another process
+    with the same result. They are most of the cost of a plan: one Dijkstra sweep per position
+    for the road matrix and as many for every vehicle type of the fleet. From
+    PARALLEL_MATRIX_POSITIONS positions on they are computed by one process per CPU unless a
+    number of processes is given.
+
+    Attributes:
+        depot (Zone): The depot.
+        zones (list): The demand zones, position i + 1 in the matrix being zones[i].
+        fleet (list): The vehicles available.
+        matrix (list): Road distance between every pair of positions, the depot being position 0.
+        matrices (dict): The weighted distance between every pair of positions, by vehicle type.
+        demands (list): The supplies needed at every position.
+    """
+
+    def __init__(self, graph, depot, zones, fleet, processes=None, matrix=None, matrices=None):
+        self.depot = snap_to_zone(graph, depot)
+        # every zone is served once, and the depot needs no delivery
+        self.zones = [zone for zone in dict.fromkeys(snap_to_zone(graph, zone) for zone in zones) if zone is not self.depot]
+        self.fleet = list(fleet)
+        positions = [self.depot] + self.zones
+        if processes is None and len(positions) >= PARALLEL_MATRIX_POSITIONS:
+            processes = os.cpu_count()
+        if matrix is None:
+            matrix = distance_matrix(graph, positions, positions, processes=processes)
+        self.matrix = [list(map(float, row)) for row in matrix]
+
+        # one matrix per vehicle type of the fleet, reused by all its vehicles
+        self.matrices = {}
+        for vehicle_type in dict.fromkeys(vehicle.type for vehicle in self.fleet):
+            if matrices is not None and vehicle_type in matrices:
+                type_matrix = matrices[vehicle_type]
+            elif vehicle_type is None:
+                type_matrix = matrix
+            else:
+                type_matrix = distance_matrix(graph, positions, positions, vehicle_type, processes)
+            self.matrices[vehicle_type] = [list(map(float, row)) for row in type_matrix]
+        self.demands = [0.0] + [zone_demand(zone) for zone in self.zones]
+
+    def vehicle_matrix(self, vehicle=None):
+        """
+        Distance matrix of a vehicle, the road distance matrix without one.
+        """
+        return self.matrix if vehicle is None else self.matrices[vehicle.type]
+
+    def route_distance(self, route, vehicle=None):
+        matrix = self.vehicle_matrix(vehicle)
+        distance = 0.0
+        previous = 0
+        for position in route:
+            distance += matrix[previous][position]
+            previous = position
+        return distance + matrix[previous][0]
+
+    def route_autonomy(self, route, vehicle):
+        """
+        Autonomy a vehicle loses driving a route, loaded with the demand of all its zones.
+        """
+        matrix = self.vehicle_matrix(vehicle)
+        load = sum(self.demands[position] for position in route)
+        used = 0.0
+        previous = 0
+        for position in route:
+            used += vehicle.autonomy_loss(matrix[previous][position], load)
+            load -= self.demands[position]
+            previous = position
+        return used + vehicle.autonomy_loss(matrix[previous][0], 0.0)
+
+    def fits(self, route, vehicle, load=None):
+        if load is None:
+            load = sum(self.demands[position] for position in route)
+        if load > vehicle.capacity + EPSILON:
+            return False
+        # a leg the vehicle cannot drive, or between zones its roads do not connect
+        if not math.isfinite(self.route_distance(route, vehicle)):
+            return False
+        return self.route_autonomy(route, vehicle) <= vehicle.autonomy + EPSILON
+
+    def vehicle_kinds(self):
+        # one vehicle of every distinct type, autonomy and capacity, tried when joining routes
+        kinds = {}
+        for vehicle in self.fleet:
+            kinds.setdefault((vehicle.type, vehicle.autonomy, vehicle.capacity), vehicle)
+        return list(kinds.values())
+
+    def savings_routes(self):
+        """
+        Clarke-Wright savings construction.
+
+        Returns:
+            tuple: (routes, unserved positions)
+        """
+        kinds = self.vehicle_kinds()
+        routes = {}
+        unserved = []
+        for position in range(1, len(self.matrix)):
+            route = [position]
+            if any(self.fits(route, vehicle) for vehicle in kinds):
+                routes[position] = route
+            else:
+                unserved.append(position)
+
+        served = sorted(routes)
+        savings = []
+        for a, i in enumerate(served):
+            for j in served[a + 1:]:
+                saving = self.matrix[i][0] + self.matrix[0][j] - self.matrix[i][j]
+                if saving > EPSILON:
+                    savings.append((saving, i, j))
+        savings.sort(key=lambda entry: (-entry[0], entry[1], entry[2]))
+
+        # route_of maps every position to the route it is in, an endpoint of it while it can be joined
+        route_of = {position: routes[position] for position in served}
+        for _, i, j in savings:
+            first, second = route_of[i], route_of[j]
+            if first is second or i not in (first[0], first[-1]) or j not in (second[0], second[-1]):
+                continue
+            merged = (first if first[-1] == i else first[::-1]) + (second if second[0] == j else second[::-1])
+            load = sum(self.demands[position] for position in merged)
+            if not any(self.fits(merged, vehicle, load) for vehicle in kinds):
+                # the load drops along the route, so the reverse order may take less autonomy
+                merged.reverse()
+                if not any(self.fits(merged, vehicle, load) for vehicle in kinds):
+                    continue
+            for position in merged:
+                route_of[position] = merged
+
+        unique = {id(route): route for route in route_of.values()}
+        return list(unique.values()), unserved
+
+    def cheapest_insertion(self, position, routes, vehicles, free):
+        """
+        Insert a zone where it adds the least distance, in a route of the plan or as a new route
+        of a free vehicle.
+
+        Returns:
+            bool: Whether the zone was inserted.
+        """
+        demand = self.demands[position]
+        best = None
+        for index, route in enumerate(routes):
+            vehicle = vehicles[index]
+            load = sum(self.demands[p] for p in route) + demand
+            if load > vehicle.capacity + EPSILON:
+                continue
+            matrix = self.vehicle_matrix(vehicle)
+            previous = 0
+            for place in range(len(route) + 1):
+                following = route[place] if place < len(route) else 0
+                added = matrix[previous][position] + matrix[position][following] - matrix[previous][following]
+                if best is None or added < best[0] - EPSILON:
+                    candidate = route[:place] + [position] + route[place:]
+                    if self.fits(candidate, vehicle, load):
+                        best = (added, index, candidate)
+                previous = following
+
+        if best is not None:
+            _, index, candidate = best
+            routes[index] = candidate
+            return True
+
+        for vehicle in sorted(free, key=lambda vehicle: (vehicle.capacity, vehicle.autonomy)):
+            if self.fits([position], vehicle):
+                free.remove(vehicle)
+                routes.append([position])
+                vehicles.append(vehicle)
+                return True
+        return False
+
+    def assign_vehicles(self, routes):
+        """
+        Give the largest routes first to the smallest vehicle they fit, then insert the zones of
+        the routes no vehicle was left for.
+
+        Returns:
+            tuple: (routes, their vehicles, unserved positions)
+        """
+        free = list(self.fleet)
+        assigned = []
+        vehicles = []
+        leftover = []
+        routes = sorted(routes, key=lambda route: (-sum(self.demands[p] for p in route), route[0]))
+        for route in routes:
+            chosen = None
+            for vehicle in sorted(free, key=lambda vehicle: (vehicle.capacity, vehicle.autonomy)):
+                if self.fits(route, vehicle):
+                    chosen = (vehicle, route)
+                elif self.fits(route[::-1], vehicle):
+                    chosen = (vehicle, route[::-1])
+                if chosen is not None:
+                    break
+            if chosen is None:
+                leftover.extend(route)
+                continue
+            free.remove(chosen[0])
+            vehicles.append(chosen[0])
+            assigned.append(chosen[1])
+
+        unserved = []
+        for position in sorted(leftover, key=lambda position: (-self.demands[position], position)):
+            if not self.cheapest_insertion(position, assigned, vehicles, free):
+                unserved.append(position)
+        return assigned, vehicles, unserved
+
+    def two_opt(self, route, vehicle):
+        """
+        Reverse the segment of a route that shortens it the most, if any.
+
+        Returns:
+            list: The improved route, or None.
+        """
+        matrix = self.vehicle_matrix(vehicle)
+        best = None
+        tour = [0] + route + [0]
+        for a in range(1, len(tour) - 2):
+            for b in range(a + 1, len(tour) - 1):
+                change = (matrix[tour[a - 1]][tour[b]] + matrix[tour[a]][tour[b + 1]]
+                          - matrix[tour[a - 1]][tour[a]] - matrix[tour[b]][tour[b + 1]])
+                if change < -EPSILON and (best is None or change < best[0]):
+                    candidate = route[:a - 1] + route[a - 1:b][::-1] + route[b:]
+                    if self.fits(candidate, vehicle):
+                        best = (change, candidate)
+        return best[1] if best is not None else None
+
+    def relocate(self, routes, vehicles):
+        """
+        Move the zone whose relocation, within its route or to another one, shortens the plan
+        the most.
+
+        Returns:
+            bool: Whether a zone was moved.
+        """
+        loads = [sum(self.demands[p] for p in route) for route in routes]
+        best = None
+        # the distance of every route is measured for its own vehicle
+        matrices = [self.vehicle_matrix(vehicle) for vehicle in vehicles]
+        for source, route in enumerate(routes):
+            matrix = matrices[source]
+            for place, position in enumerate(route):
+                previous = route[place - 1] if place > 0 else 0
+                following = route[place + 1] if place + 1 < len(route) else 0
+                removed = matrix[previous][position] + matrix[position][following] - matrix[previous][following]
+                shortened = route[:place] + route[place + 1:]
+                demand = self.demands[position]
+
+                for target, other in enumerate(routes):
+                    if target != source and loads[target] + demand > vehicles[target].capacity + EPSILON:
+                        continue
+                    base = shortened if target == source else other
+                    target_matrix = matrices[target]
+                    before = 0
+                    for slot in range(len(base) + 1):
+                        after = base[slot] if slot < len(base) else 0
+                        change = target_matrix[before][position] + target_matrix[position][after] - target_matrix[before][after] - removed
+                        if change < -EPSILON and (best is None or change < best[0]):
+                            candidate = base[:slot] + [position] + base[slot:]
+                            if self.fits(candidate, vehicles[target]):
+                                best = (change, source, target, shortened, candidate)
+                        before = after
+
+        if best is None:
+            return False
+        _, source, target, shortened, candidate = best
+        if source == target:
+            routes[source] = candidate
+        else:
+            routes[source] = shortened
+            routes[target] = candidate
+        return True
+
+    def local_search(self, routes, vehicles, max_passes=MAX_LOCAL_SEARCH_PASSES):
+        for _ in range(max_passes):
+            improved = False
+            for index in range(len(routes)):
+                while True:
+                    candidate = self.two_opt(routes[index], vehicles[index])
+                    if candidate is None:
+                        break
+                    routes[index] = candidate
+                    improved = True
+            if self.relocate(routes, vehicles):
+                improved = True
+            if not improved:
+                break
+
+        # vehicles whose zones were all moved to other routes stay at the depot
+        kept = [index for index, route in enumerate(routes) if route]
+        return [routes[index] for index in kept], [vehicles[index] for index in kept]
+
+    def plan(self, max_passes=MAX_LOCAL_SEARCH_PASSES):
+        """
+        Plan the routes of the fleet.
+
+        Args:
+            max_passes (int): Largest number of local search passes, 0 to keep the constructed routes.
+
+        Returns:
+            FleetPlan: The routes and the zones left unserved.
+        """
+        routes, unserved = self.savings_routes()
+        routes, vehicles, leftover = self.assign_vehicles(routes)
+        routes, vehicles = self.local_search(routes, vehicles, max_passes)
+
+        fleet_routes = []
+        for route, vehicle in zip(routes, vehicles):
+            fleet_routes.append(FleetRoute(
+                vehicle,
+                [self.zones[position - 1] for position in route],
+                [self.demands[position] for position in route],
+                self.route_distance(route, vehicle),
+                self.route_autonomy(route, vehicle),
+            ))
+        return FleetPlan(self.depot, fleet_routes, [self.zones[position - 1] for position in sorted(unserved + leftover)])
+
+
+def plan_fleet(graph, depot, zones, fleet, processes=None, max_passes=MAX_LOCAL_SEARCH_PASSES):
+    """
+    Plan the routes of a heterogeneous fleet delivering supplies from a depot, see FleetPlanner.
+
+    Most of the time goes into the distance matrices, one Dijkstra sweep per position (the depot
+    and every demand zone) for the roads and as many for every vehicle type of the fleet, against
+    a fraction of it for the routing itself. On large inputs they are computed by one process
+    per CPU unless processes is given.
+
+    Args:
+        graph (Graph): The graph containing zones and connections.
+        depot (Zone or Coordinate): The zone the vehicles start and end at.
+        zones (list): The zones to supply, each needing Zone.calculate_supplies_to_leave.
+        fleet (list): The vehicles available, drones, cars and trucks alike.
+        processes (int): Number of worker processes of the distance matrices, 1 for none, None for
+                         one per CPU from PARALLEL_MATRIX_POSITIONS positions on and none below.
+        max_passes (int): Largest number of local search passes.
+
+    Returns:
+        FleetPlan: The routes and the zones left unserved.
+    """
+    return FleetPlanner(graph, depot, zones, fleet, processes).plan(max_passes)
@@ -1,5 +1,12 @@
 from core.zone import Zone
 import core.road as Road
+from graph.csr_graph import CSRGraph, encode_enum, GOAL_CACHE_SIZE
+from graph.contraction_hierarchy import ContractionHierarchy
+from graph.landmarks import Landmarks, DEFAULT_LANDMARKS
+from graph.road_state import RoadStateStore
+from graph.road_updates import RoadUpdateFeed
+from graph.spatial_index import SpatialIndex
+from utils.haversine import one_to_many
 
 class Graph:
     """
@@ -8,6 +15,38 @@ class Graph:
     
     def __init__(self):
         self.graph = {}
+        # Indexes kept in sync by add_zone and add_connection for constant time lookups
+        self.zones_by_name = {}
+        self.neighbors = {}
+        # Per-goal cache of the distance from every zone to the goal, most recently used last
+        self.goal_distances = {}
+        # Every road once, in insertion order, with the two zones it connects
+        self.roads = []
+        self.road_endpoints = {}
+        # Condition and availability changes of the roads are published here
+        self.updates = RoadUpdateFeed()
+        # Versioned snapshots of the road conditions and availability for the searches to pin,
+        # built on first use with the position of every road in roads as its id
+        self.road_state = None
+        self.road_ids = None
+        self.road_state_version = 0
+        self.updates.subscribe(self.on_road_updates)
+        # ALT and contraction hierarchy preprocessing, dropped whenever zones or roads are added
+        self.landmarks = None
+        self.contraction_hierarchy = None
+        # Grid over the zone coordinates, built on the first lookup by position
+        self.spatial_index = None
+
+    def __getstate__(self):
+        # The hierarchy follows the road updates through a subscription copies do not keep
+        state = self.__dict__.copy()
+        state["contraction_hierarchy"] = None
+        return state
+
+    def __setstate__(self, state):
+        # The feed of a copy starts without subscribers
+        self.__dict__.update(state)
+        self.updates.subscribe(self.on_road_updates)
     
     def add_zone(self, zone: Zone):
         """
@@ -18,6 +57,11 @@ class Graph:
         """
         if zone not in self.graph:
             self.graph[zone] = []
+            self.neighbors[zone] = set()
+            self.zones_by_name.setdefault(zone.name, zone)
+            self.goal_distances.clear()
+            self.spatial_index = None
+            self.drop_preprocessing()
     
     def add_connection(self, zone1: Zone, zone2: Zone, road: Road):
         """
@@ -33,6 +77,16 @@ class Graph:
         
         self.graph[zone1].append((zone2, road))
         self.graph[zone2].append((zone1, road))
+        self.neighbors[zone1].add(zone2)
+        self.neighbors[zone2].add(zone1)
+        self.roads.append(road)
+        self.road_endpoints[road] = (zone1, zone2)
+        if self.road_state is not None:
+            # the next store carries on with the version ids
+            self.road_state_version = self.road_state.latest.version + 1
+            self.road_state = None
+            self.road_ids = None
+        self.drop_preprocessing()
 
     def get_zone(self, name: str):
         """
@@ -44,9 +98,30 @@ class Graph:
         Returns:
             Zone: The zone object.
         """
-        for zone in self.graph:
-            if zone.name == name:
-                return zone
+        return self.zones_by_name.get(name)
+
+    def get_spatial_index(self):
+        """
+        Get the spatial index over the zone coordinates, building it if needed.
+
+        Returns:
+            SpatialIndex: The index of the zones.
+        """
+        if self.spatial_index is None:
+            self.spatial_index = SpatialIndex.from_zones(self.graph)
+        return self.spatial_index
+
+    def nearest_zone(self, coordinate):
+        """
+        Get the zone nearest to a position, e.g. a GPS fix reported by a field team.
+
+        Args:
+            coordinate (Coordinate): The position.
+
+        Returns:
+            Zone: The nearest zone, or None if the graph is empty.
+        """
+        return self.get_spatial_index().nearest_one(coordinate)
 
     def get_connections(self, zone: Zone):
         """
@@ -60,6 +135,18 @@ class Graph:
         """
         return [(neighbor, road) for neighbor, road in self.graph[zone]]
     
+    def adjacent_zones(self, zone: Zone):
+        """
+        Get the neighboring zones of a zone, in the order their connections were added.
+
+        Args:
+            zone (Zone): The zone from which to get neighbors.
+
+        Returns:
+            list: The neighboring zones.
+        """
+        return [neighbor for neighbor, _ in self.graph[zone]]
+
     def has_connection(self, zone1, zone2):
         """
         Check if there is a connection between two zones.
@@ -71,7 +158,118 @@ class Graph:
         Returns:
             bool: True if there is a connection, False otherwise.
         """
-        return any(neighbor == zone2 for neighbor, _ in self.graph.get(zone1, []))
+        return zone2 in self.neighbors.get(zone1, ())
+
+    def distances_to_goal(self, goal: Zone):
+        """
+        Get the straight-line distance from every zone to a goal zone.
+
+        The distances are computed in bulk the first time a goal is asked for and kept for the
+        GOAL_CACHE_SIZE most recently used goals. Adding a zone clears the cache.
+
+        Args:
+            goal (Zone): The goal zone.
+
+        Returns:
+            dict: The distance to the goal of every zone.
+        """
+        distances = self.goal_distances.pop(goal, None)
+        if distances is None:
+            zones = list(self.graph)
+            latitudes = [zone.coordinate.latitude for zone in zones]
+            longitudes = [zone.coordinate.longitude for zone in zones]
+            distances = dict(zip(zones, one_to_many(goal.coordinate.latitude, goal.coordinate.longitude, latitudes, longitudes).tolist()))
+            if len(self.goal_distances) >= GOAL_CACHE_SIZE:
+                del self.goal_distances[next(iter(self.goal_distances))]
+
+        self.goal_distances[goal] = distances
+        return distances
+
+    def get_road_state(self):
+        """
+        Get the versioned store of the road conditions and availability, building it if needed.
+
+        Returns:
+            RoadStateStore: The store, indexed by the position of every road in roads.
+        """
+        if self.road_state is None:
+            self.road_ids = {road: i for i, road in enumerate(self.roads)}
+            self.road_state = RoadStateStore(
+                [encode_enum(road.conditions) for road in self.roads],
+                [road.availability for road in self.roads],
+                self.road_state_version,
+            )
+        return self.road_state
+
+    def snapshot(self):
+        """
+        Pin the latest version of the road conditions and availability.
+
+        The Road objects always hold the latest values, a search that reads the snapshot instead
+        (through road_ids) is not affected by the updates published while it runs.
+
+        Returns:
+            RoadSnapshot: The snapshot.
+        """
+        return self.get_road_state().latest
+
+    def on_road_updates(self, updates):
+        """
+        Feed subscriber, publishes the changed roads as a new version of the road state.
+
+        Args:
+            updates (list): The applied RoadUpdate objects.
+        """
+        if self.road_state is None:
+            # built from the Road objects, which already hold the changes
+            return
+        self.road_state.publish(
+            [self.road_ids[update.road] for update in updates],
+            [encode_enum(update.conditions) for update in updates],
+            [update.availability for update in updates],
+        )
+
+    def preprocess_landmarks(self, count=DEFAULT_LANDMARKS, path=None):
+        """
+        Run the ALT preprocessing: pick landmark zones and compute their road distance to every zone.
+
+        Args:
+            count (int): The number of landmarks.
+            path (str): Optional .npz file where the distances are stored; distances stored there
+                        for this same graph are reused instead of being recomputed.
+
+        Returns:
+            Landmarks: The landmarks, also kept in the landmarks attribute.
+        """
+        landmarks = Landmarks.load(self, path) if path else None
+        if landmarks is None or len(landmarks.landmarks) != min(count, len(self.graph)):
+            landmarks = Landmarks.build(self, count)
+            if path:
+                landmarks.save(path)
+
+        self.landmarks = landmarks
+        return landmarks
+
+    def preprocess_contraction_hierarchy(self):
+        """
+        Build the customizable contraction hierarchy of the graph, which keeps itself up to date
+        with the published road updates.
+
+        Returns:
+            ContractionHierarchy: The hierarchy, also kept in the contraction_hierarchy attribute.
+        """
+        if self.contraction_hierarchy is None:
+            self.contraction_hierarchy = ContractionHierarchy(self)
+        return self.contraction_hierarchy
+
+    def drop_preprocessing(self):
+        """
+        Discard the landmarks and the contraction hierarchy after a change of the topology.
+        """
+        self.landmarks = None
+        if self.contraction_hierarchy is not None:
+            self.contraction_hierarchy.close()
+            self.contraction_hierarchy = None
 
     def get_all_zones(self):
         """
@@ -81,3 +279,47 @@ class Graph:
             list: All zones in the graph.
         """
         return list(self.graph.keys())
+
+    def to_csr(self):
+        """
+        Export the graph to its frozen, array-backed CSR form.
+
+        Zone ids follow the insertion order of the zones, road ids the order in which each road is
+        first met, and every row keeps the order of the zone's adjacency list.
+
+        Returns:
+            CSRGraph: The CSR form of the graph.
+        """
+        zones = list(self.graph.keys())
+        index = {zone: i for i, zone in enumerate(zones)}
+
+        offsets = [0]
+        neighbors = []
+        edge_roads = []
+        road_ids = {}
+        roads = []
+        for zone in zones:
+            for neighbor, road in self.graph[zone]:
+                road_id = road_ids.get(id(road))
+                if road_id is None:
+                    road_id = road_ids[id(road)] = len(roads)
+                    roads.append(road)
+                neighbors.append(index[neighbor])
+                edge_roads.append(road_id)
+            offsets.append(len(neighbors))
+
+        return CSRGraph(
+            offsets,
+            neighbors,
+            edge_roads,
+            [zone.coordinate.latitude for zone in zones],
+            [zone.coordinate.longitude for zone in zones],
+            [zone.population for zone in zones],
+            [getattr(zone.severity, "value", zone.severity) for zone in zones],
+            [road.cost for road in roads],
+            [encode_enum(road.conditions) for road in roads],
+            [encode_enum(road.geography) for road in roads],
+            [encode_enum(road.infrastructure) for road in roads],
+            [road.availability for road in roads],
+            zones,
+        )
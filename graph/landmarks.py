@@ -0,0 +1,154 @@
+import hashlib
+import os
+import numpy as np
+
+from graph.algorithms.dijkstra import dijkstra
+
+# Number of landmarks picked when none is given
+DEFAULT_LANDMARKS = 8
+
+
+def graph_signature(graph):
+    """
+    Fingerprint of the zones and road costs of a graph, used to tell whether stored
+    landmark distances still belong to it.
+
+    Args:
+        graph (Graph): The graph.
+
+    Returns:
+        str: Hex digest of the zone names and of every road's endpoints and cost.
+    """
+    digest = hashlib.sha256()
+    for zone in graph.graph:
+        digest.update(zone.name.encode("utf-8"))
+        digest.update(b"\0")
+    for road in graph.roads:
+        zone1, zone2 = graph.road_endpoints[road]
+        digest.update(f"{zone1.name}\0{zone2.name}\0{road.cost!r}\0".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class Landmarks:
+    """
+    ALT (A*, Landmarks and Triangle inequality) preprocessing of a graph.
+
+    The shortest road-cost distance from a few landmark zones to every zone is computed once.
+    For any zones v and t and any landmark L the triangle inequality gives
+    dist(v, t) >= |dist(L, t) - dist(L, v)|, a lower bound much tighter than the straight-line
+    distance on a road network.
+
+    Attributes:
+        graph (Graph): The graph the landmarks belong to.
+        landmarks (list): The landmark zones.
+        distances (np.ndarray): Matrix where entry [i, j] is the distance from landmark i to zone j.
+        columns (dict): The column of every zone in distances.
+    """
+
+    def __init__(self, graph, landmarks, distances):
+        self.graph = graph
+        self.landmarks = landmarks
+        self.distances = distances
+        self.columns = {zone: i for i, zone in enumerate(graph.graph)}
+
+    @classmethod
+    def build(cls, graph, count=DEFAULT_LANDMARKS):
+        """
+        Pick landmarks by farthest selection and run one Dijkstra from each of them.
+
+        The first landmark is the zone farthest from an arbitrary zone, every next one the zone
+        farthest from all landmarks picked so far, which spreads them around the border of the map.
+
+        Args:
+            graph (Graph): The graph to preprocess.
+            count (int): The number of landmarks.
+
+        Returns:
+            Landmarks: The preprocessed landmarks.
+        """
+        zones = list(graph.graph)
+        count = min(count, len(zones))
+        if count == 0:
+            return cls(graph, [], np.zeros((0, 0)))
+        # position of every zone, instead of a linear zones.index search for every landmark
+        index = {zone: i for i, zone in enumerate(zones)}
+
+        def distances_from(zone):
+            distances, _ = dijkstra(graph, zone)
+            return np.array([distances.get(other, np.inf) for other in zones])
+
+        landmarks = []
+        rows = []
+        # distance from every zone to its closest landmark, seeded with an arbitrary zone
+        closest = distances_from(zones[0])
+        while len(landmarks) < count:
+            # unreachable zones are never picked unless nothing else is left
+            candidates = np.where(np.isfinite(closest), closest, -1.0)
+            for landmark in landmarks:
+                candidates[index[landmark]] = -np.inf
+            landmark = zones[int(np.argmax(candidates))]
+
+            row = distances_from(landmark)
+            landmarks.append(landmark)
+            rows.append(row)
+            closest = row if len(rows) == 1 else np.minimum(closest, row)
+
+        return cls(graph, landmarks, np.vstack(rows))
+
+    def save(self, path):
+        """
+        Store the landmark distances on disk.
+
+        Args:
+            path (str): The .npz file to write.
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        np.savez(
+            path,
+            signature=np.array(graph_signature(self.graph)),
+            landmarks=np.array([self.columns[landmark] for landmark in self.landmarks], dtype=np.int64),
+            distances=self.distances,
+        )
+
+    @classmethod
+    def load(cls, graph, path):
+        """
+        Load landmark distances stored by save.
+
+        Args:
+            graph (Graph): The graph the landmarks were built for.
+            path (str): The .npz file to read.
+
+        Returns:
+            Landmarks: The landmarks, or None if the file is missing or belongs to another graph.
+        """
+        if not os.path.exists(path):
+            return None
+
+        with np.load(path) as data:
+            if str(data["signature"]) != graph_signature(graph):
+                return None
+            zones = list(graph.graph)
+            return cls(graph, [zones[i] for i in data["landmarks"]], data["distances"])
+
+    def lower_bounds_to(self, target):
+        """
+        Landmark lower bound of the distance from every zone to a target zone.
+
+        Args:
+            target (Zone): The target zone.
+
+        Returns:
+            np.ndarray: The lower bound of every zone, indexed by columns.
+        """
+        if len(self.landmarks) == 0:
+            return np.zeros(len(self.columns))
+
+        target_distances = self.distances[:, self.columns[target]][:, None]
+        with np.errstate(invalid="ignore"):
+            bounds = np.abs(self.distances - target_distances)
+        # zones in another component than a landmark give no information
+        bounds[np.isnan(bounds)] = 0
+        return bounds.max(axis=0)
@@ -0,0 +1,117 @@
+import threading
+import numpy as np
+
+# Number of versions a store keeps for lookups by version id, pinned snapshots stay usable anyway
+MAX_VERSIONS = 16
+
+
+def frozen(array, dtype):
+    """
+    Read-only copy of an array.
+    """
+    array = np.array(array, dtype=dtype)
+    array.flags.writeable = False
+    return array
+
+
+class RoadSnapshot:
+    """
+    The dynamic attributes of every road at one version, never changed once published.
+
+    A search pins a snapshot by keeping a reference to it, and reads the road conditions and
+    availability from it instead of the shared Road objects, so updates published meanwhile
+    do not change what it sees.
+
+    Attributes:
+        version (int): The version id, increasing with every publish.
+        conditions (np.ndarray): Read-only int8 Conditions code of every road id (0 when unset).
+        availability (np.ndarray): Read-only bool availability of every road id.
+        changed (np.ndarray): Ids of the roads published over the previous version, or None when
+                              every road may have changed.
+    """
+
+    def __init__(self, version, conditions, availability, changed=None):
+        self.version = version
+        self.conditions = conditions
+        self.availability = availability
+        self.changed = changed
+
+
+class RoadStateStore:
+    """
+    Versioned copy-on-write store of the dynamic road attributes of a graph.
+
+    Every publish copies the arrays of the latest snapshot, applies the changes to the copy and
+    makes it the latest snapshot under a new version id, so concurrent searches can each work on
+    the snapshot they pinned while updates keep coming. Publishing is serialized by a lock and
+    reading the latest snapshot needs none.
+
+    Attributes:
+        latest (RoadSnapshot): The most recent snapshot.
+        versions (dict): The MAX_VERSIONS most recent snapshots, by version id.
+    """
+
+    def __init__(self, conditions, availability, version=0):
+        self.lock = threading.Lock()
+        self.latest = RoadSnapshot(version, frozen(conditions, np.int8), frozen(availability, bool))
+        self.versions = {version: self.latest}
+
+    def __getstate__(self):
+        # Locks cannot be pickled, and copies only share the data
+        state = self.__dict__.copy()
+        del state["lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    def snapshot(self, version=None):
+        """
+        Get a snapshot of the road attributes.
+
+        Args:
+            version (int): The version id, or None for the latest one.
+
+        Returns:
+            RoadSnapshot: The snapshot.
+
+        Raises:
+            KeyError: If the version is not kept anymore.
+        """
+        if version is None:
+            return self.latest
+        return self.versions[version]
+
+    def publish(self, roads, conditions, availability):
+        """
+        Publish a new version with some roads changed.
+
+        Args:
+            roads (array_like): The ids of the changed roads, or None when every road changed.
+            conditions (array_like): The new Conditions code of each of them.
+            availability (array_like): The new availability of each of them.
+
+        Returns:
+            RoadSnapshot: The new latest snapshot.
+        """
+        with self.lock:
+            base = self.latest
+            if roads is None:
+                new_conditions = frozen(conditions, np.int8)
+                new_availability = frozen(availability, bool)
+            else:
+                roads = np.asarray(roads, dtype=np.intp)
+                new_conditions = base.conditions.copy()
+                new_availability = base.availability.copy()
+                new_conditions[roads] = conditions
+                new_availability[roads] = availability
+                new_conditions.flags.writeable = False
+                new_availability.flags.writeable = False
+
+            snapshot = RoadSnapshot(base.version + 1, new_conditions, new_availability, roads)
+            self.versions[snapshot.version] = snapshot
+            if len(self.versions) > MAX_VERSIONS:
+                del self.versions[next(iter(self.versions))]
+            self.latest = snapshot
+            return snapshot
@@ -0,0 +1,106 @@
+import random
+from enums.conditions import Conditions
+
+
+class RoadUpdate:
+    """
+    Class representing a change of the dynamic attributes of a road.
+
+    Attributes:
+        road (Road): The road that changes.
+        conditions (Conditions): The new weather conditions of the road.
+        availability (bool): The new availability of the road.
+    """
+
+    def __init__(self, road, conditions, availability):
+        self.road = road
+        self.conditions = conditions
+        self.availability = availability
+
+
+class RoadUpdateFeed:
+    """
+    Publishes road updates as deltas to every subscriber.
+
+    Road condition and availability changes, either sampled for a simulation or coming from an
+    external feed, are applied through publish so that searches and caches built over the graph
+    only need to look at the roads that actually changed.
+    """
+
+    def __init__(self):
+        self.subscribers = []
+
+    def subscribe(self, callback):
+        """
+        Register a callback called with the list of applied updates after every publish.
+
+        Args:
+            callback (callable): Function taking a list of RoadUpdate.
+        """
+        self.subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        """
+        Remove a previously registered callback.
+
+        Args:
+            callback (callable): The callback to remove.
+        """
+        if callback in self.subscribers:
+            self.subscribers.remove(callback)
+
+    def publish(self, updates):
+        """
+        Apply road updates and notify the subscribers of the ones that changed something.
+
+        Args:
+            updates (iterable): The RoadUpdate objects to apply.
+
+        Returns:
+            list: The updates that changed a road.
+        """
+        applied = []
+        for update in updates:
+            road = update.road
+            if road.conditions == update.conditions and road.availability == update.availability:
+                continue
+            road.conditions = update.conditions
+            road.availability = update.availability
+            applied.append(update)
+
+        if applied:
+            for callback in list(self.subscribers):
+                callback(applied)
+        return applied
+
+    def __getstate__(self):
+        # Subscribers belong to the process that registered them, copies start without any
+        return {"subscribers": []}
+
+
+def random_road_update(road):
+    """
+    Draw a random change for a road, with the distributions used by apply_randomness_to_road.
+
+    Args:
+        road (Road): The road to change.
+
+    Returns:
+        RoadUpdate: The sampled update.
+    """
+    return RoadUpdate(road, random.choice(list(Conditions)), random.choices([True, False], weights=[0.7, 0.3])[0])
+
+
+def sample_road_updates(graph, count):
+    """
+    Sample random updates for a few roads of the graph, to simulate a changing map.
+
+    Args:
+        graph (Graph): The graph whose roads are perturbed.
+        count (int): The number of roads to change.
+
+    Returns:
+        list: The sampled RoadUpdate objects, not applied yet.
+    """
+    roads = random.sample(graph.roads, min(count, len(graph.roads)))
+    return [random_road_update(road) for road in roads]
@@ -0,0 +1,262 @@
+import collections
+import threading
+import time
+
+from graph.algorithms.dijkstra import dijkstra_route
+from graph.spatial_index import snap_to_zone
+
+# Number of routes a cache keeps, the least recently used one is evicted beyond it
+ROUTE_CACHE_SIZE = 1024
+
+# Seconds a cached route is served for, None to keep routes until evicted or invalidated
+ROUTE_CACHE_TTL = 600.0
+
+# Searches a cache runs for a vehicle: they read its type alone and change neither the roads nor
+# the vehicle, unlike the weighted, dynamic modes of A* and LPA*
+VEHICLE_SEARCHES = (dijkstra_route,)
+
+
+class CachedRoute:
+    """
+    Class representing a search result kept by a RouteCache.
+
+    Attributes:
+        result (tuple): The (path, visited_zones, total_cost) of the search, see frozen_route.
+        roads (list): The roads between consecutive zones of the path.
+        version (int): The road state version the search ran on.
+        expires (float): When the route stops being served, from time.monotonic, or None.
+    """
+
+    def __init__(self, result, roads, version, expires):
+        self.result = result
+        self.roads = roads
+        self.version = version
+        self.expires = expires
+
+
+def frozen_route(result):
+    """
+    Copy of a search result its callers cannot change, since a cached result is shared by all of them.
+
+    Args:
+        result (tuple): The (path, visited_zones, total_cost) of a search.
+
+    Returns:
+        tuple: The path as a tuple and the visited zones as a frozenset, None staying None.
+    """
+    path, visited, cost = result
+    return (None if path is None else tuple(path), None if visited is None else frozenset(visited), cost)
+
+
+def path_roads(graph, path):
+    """
+    Get the roads a path may use, every road between consecutive zones of the path.
+
+    Args:
+        graph (Graph): The graph containing the path.
+        path (list): The zones of the path.
+
+    Returns:
+        list: The roads, once each.
+    """
+    roads = {}
+    for zone, next_zone in zip(path, path[1:]):
+        for neighbor, road in graph.graph[zone]:
+            if neighbor is next_zone:
+                roads[road] = None
+    return list(roads)
+
+
+class RouteCache:
+    """
+    Bounded LRU cache of the results of path searches on a graph, keyed by start, goal, algorithm
+    and vehicle type.
+
+    A route is computed on one version of the road state and served for every later version
+    until one of the roads of its path changes conditions or availability: the cache follows the
+    road updates published on the graph and drops exactly the routes through the changed roads.
+    Routes are also dropped once older than ttl seconds, and the least recently used one when
+    more than max_entries are kept. Searches that found no path are not cached.
+
+    Attributes:
+        graph (Graph): The graph searched.
+        max_entries (int): Most routes kept.
+        ttl (float): Seconds a route is served for, or None.
+        hits (int): Lookups answered from the cache.
+        misses (int): Lookups that found no valid route.
+        evictions (int): Routes dropped to stay within max_entries.
+        expirations (int): Routes dropped for being older than ttl.
+        invalidations (int): Routes dropped because a road of their path changed.
+    """
+
+    def __init__(self, graph, max_entries=ROUTE_CACHE_SIZE, ttl=ROUTE_CACHE_TTL):
+        self.graph = graph
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+        # routes by key, most recently used last, and the keys of the routes through every road
+        self.routes = collections.OrderedDict()
+        self.keys_by_road = {}
+        self.lock = threading.Lock()
+        graph.updates.subscribe(self.on_road_updates)
+
+    def close(self):
+        """
+        Stop following the road updates of the graph.
+        """
+        self.graph.updates.unsubscribe(self.on_road_updates)
+
+    def get(self, start, goal, algorithm, vehicle_type=None, version=None):
+        """
+        Look up a cached route.
+
+        Args:
+            start (Zone): The starting zone.
+            goal (Zone): The target zone.
+            algorithm (str): The name of the search.
+            vehicle_type (VehicleType): The vehicle the route was searched for, or None.
+            version (int): The road state version the route is needed for, the latest by default;
+                           routes are only served for the latest version.
+
+        Returns:
+            tuple: The cached (path, visited_zones, total_cost), or None on a miss.
+        """
+        key = (start, goal, algorithm, vehicle_type)
+        with self.lock:
+            route = self.routes.get(key)
+            if route is not None and route.expires is not None and time.monotonic() >= route.expires:
+                self.discard(key)
+                self.expirations += 1
+                route = None
+            if route is None or (version is not None and version != self.graph.snapshot().version):
+                self.misses += 1
+                return None
+            self.routes.move_to_end(key)
+            self.hits += 1
+            return route.result
+
+    def put(self, start, goal, algorithm, result, vehicle_type=None, version=None):
+        """
+        Cache the result of a search, as a frozen_route copy.
+
+        Args:
+            start (Zone): The starting zone.
+            goal (Zone): The target zone.
+            algorithm (str): The name of the search.
+            result (tuple): The (path, visited_zones, total_cost) of the search.
+            vehicle_type (VehicleType): The vehicle the route was searched for, or None.
+            version (int): The road state version the search ran on, the latest by default.
+        """
+        path = result[0]
+        if path is None:
+            return
+        key = (start, goal, algorithm, vehicle_type)
+        with self.lock:
+            latest = self.graph.snapshot().version
+            if version is not None and version != latest:
+                # a road may have changed since, and its update was already processed
+                return
+            self.discard(key)
+            expires = None if self.ttl is None else time.monotonic() + self.ttl
+            route = self.routes[key] = CachedRoute(frozen_route(result), path_roads(self.graph, path), latest, expires)
+            for road in route.roads:
+                self.keys_by_road.setdefault(road, set()).add(key)
+
+            while len(self.routes) > self.max_entries:
+                self.discard(next(iter(self.routes)))
+                self.evictions += 1
+
+    def search(self, algorithm, start, goal, vehicle=None):
+        """
+        Run a search, or answer it from the cache.
+
+        Only searches that change neither the graph nor the vehicle are cached, so that a cached
+        route is the one the search would find again: without a vehicle the search runs in its
+        default, simple mode, and with one it must be one of VEHICLE_SEARCHES. Routes for a
+        vehicle are cached by its type, the only attribute of it these searches read.
+
+        Args:
+            algorithm (callable): The search, called as algorithm(graph, start, goal), or as
+                                  algorithm(graph, start, goal, vehicle) with a vehicle; it must
+                                  only depend on the road state through the roads of its path.
+            start (Zone or Coordinate): The starting zone.
+            goal (Zone or Coordinate): The target zone.
+            vehicle (Vehicle): Optional vehicle the search is for.
+
+        Returns:
+            tuple: (path, visited_zones, total_cost), see frozen_route.
+
+        Raises:
+            ValueError: If a vehicle is given to a search outside VEHICLE_SEARCHES.
+        """
+        if vehicle is not None and algorithm not in VEHICLE_SEARCHES:
+            raise ValueError(f"{algorithm.__name__} may change the roads or the vehicle, its routes for a vehicle are not cached")
+        start = snap_to_zone(self.graph, start)
+        goal = snap_to_zone(self.graph, goal)
+        vehicle_type = None if vehicle is None else vehicle.type
+        result = self.get(start, goal, algorithm.__name__, vehicle_type)
+        if result is None:
+            version = self.graph.snapshot().version
+            if vehicle is None:
+                result = frozen_route(algorithm(self.graph, start, goal))
+            else:
+                result = frozen_route(algorithm(self.graph, start, goal, vehicle))
+            self.put(start, goal, algorithm.__name__, result, vehicle_type, version)
+        return result
+
+    def discard(self, key):
+        """
+        Drop a route and its entries in the road index, if cached.
+        """
+        route = self.routes.pop(key, None)
+        if route is None:
+            return
+        for road in route.roads:
+            keys = self.keys_by_road[road]
+            keys.discard(key)
+            if not keys:
+                del self.keys_by_road[road]
+
+    def on_road_updates(self, updates):
+        """
+        Feed subscriber, drops the routes through the changed roads.
+
+        Args:
+            updates (list): The applied RoadUpdate objects.
+        """
+        with self.lock:
+            for update in updates:
+                for key in list(self.keys_by_road.get(update.road, ())):
+                    self.discard(key)
+                    self.invalidations += 1
+
+    def clear(self):
+        """
+        Drop every route, keeping the counters.
+        """
+        with self.lock:
+            self.routes.clear()
+            self.keys_by_road.clear()
+
+    def stats(self):
+        """
+        Counters of the cache, as metrics.
+
+        Returns:
+            dict: The hits, misses, evictions, expirations and invalidations, the hit rate and the number of cached routes.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "cached_routes": len(self.routes),
+        }
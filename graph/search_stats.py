@@ -0,0 +1,92 @@
+import time
+
+
+class SearchStats:
+    """
+    Counters and phase timings of one search, filled in by the algorithms that take a stats argument.
+
+    Searches only touch it when one is passed, and count in bulk where they can (per expanded zone
+    rather than per edge, or from sizes they already keep), so a search run without it does no
+    extra work in its inner loop.
+
+    Attributes:
+        expansions (int): Zones whose neighbors were inspected.
+        relaxations (int): Edges inspected from the expanded zones.
+        heap_pushes (int): Entries pushed on the priority queue.
+        heap_pops (int): Entries popped from the priority queue, stale ones included.
+        heuristic_evaluations (int): Zones whose heuristic was evaluated.
+        reopenings (int): Closed zones opened again because a shorter way to them was found.
+        dynamic_updates (int): Times the map changed while the search ran.
+        phases (dict): Nanoseconds spent in every phase of the search, by phase name.
+    """
+
+    COUNTERS = (
+        "expansions",
+        "relaxations",
+        "heap_pushes",
+        "heap_pops",
+        "heuristic_evaluations",
+        "reopenings",
+        "dynamic_updates",
+    )
+
+    def __init__(self):
+        self.expansions = 0
+        self.relaxations = 0
+        self.heap_pushes = 0
+        self.heap_pops = 0
+        self.heuristic_evaluations = 0
+        self.reopenings = 0
+        self.dynamic_updates = 0
+        self.phases = {}
+
+    def start(self):
+        """
+        Current time, the start of the first phase.
+
+        Returns:
+            int: The time in nanoseconds.
+        """
+        return time.perf_counter_ns()
+
+    def lap(self, phase, since):
+        """
+        Add the time elapsed since a given time to a phase.
+
+        Args:
+            phase (str): The phase that ended now.
+            since (int): When it started, from start or the previous lap.
+
+        Returns:
+            int: The current time, the start of the next phase.
+        """
+        now = time.perf_counter_ns()
+        self.phases[phase] = self.phases.get(phase, 0) + now - since
+        return now
+
+    def record_heap(self, expansions, pushes, left_on_heap, heuristic_evaluations):
+        """
+        Add the counts a heap-based search keeps anyway, instead of counting them in its loop.
+
+        Args:
+            expansions (int): The number of expanded zones.
+            pushes (int): The number of entries pushed on the heap, the start entry included.
+            left_on_heap (int): The number of entries still on the heap.
+            heuristic_evaluations (int): The number of zones whose heuristic was evaluated.
+        """
+        self.expansions += expansions
+        self.heap_pushes += pushes
+        self.heap_pops += pushes - left_on_heap
+        self.heuristic_evaluations += heuristic_evaluations
+
+    def as_dict(self):
+        """
+        Counters and phase times, in seconds, as metrics.
+
+        Returns:
+            dict: The metrics, phase times under "<phase>_time".
+        """
+        metrics = {counter: getattr(self, counter) for counter in self.COUNTERS}
+        for phase, duration in self.phases.items():
+            metrics[f"{phase}_time"] = duration / 1e9
+        return metrics
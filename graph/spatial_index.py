@@ -0,0 +1,223 @@
+import math
+import numpy as np
+
+from utils.coordinate import Coordinate
+from utils.haversine import EARTH_RADIUS, one_to_many
+
+# Average number of zones per grid cell
+CELL_OCCUPANCY = 4
+
+# Kilometers per degree of latitude
+KM_PER_DEGREE = EARTH_RADIUS * math.pi / 180
+
+
+class SpatialIndex:
+    """
+    Uniform grid over the coordinates of the zones for nearest-zone lookups by position.
+
+    Zones are bucketed in square cells of about CELL_OCCUPANCY zones. A query visits the rings of
+    cells around the cell of the queried position, nearest first, and stops as soon as no zone
+    outside the rings visited so far can be closer than the answer, so on evenly spread zones it
+    only looks at a handful of cells whatever the size of the map. Distances are haversine
+    kilometers, like the road costs.
+
+    Attributes:
+        items (list): The indexed zones (or zone ids), in the order of the coordinate arrays.
+        latitude (np.ndarray): Latitude of every item.
+        longitude (np.ndarray): Longitude of every item.
+        cell_size (float): Side of the cells, in degrees.
+        cells (dict): The positions of the items of every non-empty (row, column) cell.
+    """
+
+    def __init__(self, latitude, longitude, items):
+        self.items = list(items)
+        self.latitude = np.asarray(latitude, dtype=np.float64)
+        self.longitude = np.asarray(longitude, dtype=np.float64)
+
+        count = len(self.items)
+        if count == 0:
+            self.origin = (0.0, 0.0)
+            self.cell_size = 1.0
+            self.shape = (0, 0)
+            self.cells = {}
+            return
+
+        self.origin = (self.latitude.min(), self.longitude.min())
+        height = self.latitude.max() - self.origin[0]
+        width = self.longitude.max() - self.origin[1]
+        # zones spread along a line would otherwise get a tiny cell size from a near zero area,
+        # and zones all at the same position can share any cell
+        self.cell_size = max(math.sqrt(height * width * CELL_OCCUPANCY / count), max(height, width) * CELL_OCCUPANCY / count) or 1.0
+
+        rows = ((self.latitude - self.origin[0]) // self.cell_size).astype(np.int64)
+        columns = ((self.longitude - self.origin[1]) // self.cell_size).astype(np.int64)
+        self.shape = (int(rows.max()) + 1, int(columns.max()) + 1)
+
+        order = np.lexsort((columns, rows))
+        keys = rows[order] * self.shape[1] + columns[order]
+        boundaries = np.flatnonzero(np.diff(keys)) + 1
+        self.cells = {}
+        for group in np.split(order, boundaries):
+            self.cells[(int(rows[group[0]]), int(columns[group[0]]))] = group
+
+    @classmethod
+    def from_zones(cls, zones):
+        """
+        Index Zone objects by their coordinate.
+
+        Args:
+            zones (iterable): The zones to index.
+
+        Returns:
+            SpatialIndex: The index.
+        """
+        zones = list(zones)
+        return cls([zone.coordinate.latitude for zone in zones], [zone.coordinate.longitude for zone in zones], zones)
+
+    def cell(self, latitude, longitude):
+        return (int((latitude - self.origin[0]) // self.cell_size), int((longitude - self.origin[1]) // self.cell_size))
+
+    def ring(self, row, column, radius):
+        """
+        Positions of the items in the cells at a given ring distance from a cell, only the cells
+        of the ring inside the grid being looked up.
+        """
+        rows, columns = self.shape
+        if radius == 0:
+            cells = [(row, column)]
+        else:
+            first_column, last_column = max(column - radius, 0), min(column + radius, columns - 1)
+            first_row, last_row = max(row - radius + 1, 0), min(row + radius - 1, rows - 1)
+            cells = []
+            for r in (row - radius, row + radius):
+                if 0 <= r < rows:
+                    cells += [(r, c) for c in range(first_column, last_column + 1)]
+            for c in (column - radius, column + radius):
+                if 0 <= c < columns:
+                    cells += [(r, c) for r in range(first_row, last_row + 1)]
+        found = [self.cells[cell] for cell in cells if cell in self.cells]
+        return np.concatenate(found) if found else np.empty(0, dtype=np.int64)
+
+    def outside_distance(self, latitude, longitude, row, column, radius):
+        """
+        Lower bound of the distance from a position to any item outside the rings up to radius.
+        """
+        south = self.origin[0] + (row - radius) * self.cell_size
+        north = self.origin[0] + (row + radius + 1) * self.cell_size
+        west = self.origin[1] + (column - radius) * self.cell_size
+        east = self.origin[1] + (column + radius + 1) * self.cell_size
+
+        latitude_gap = max(0.0, min(latitude - south, north - latitude))
+        longitude_gap = max(0.0, min(longitude - west, east - longitude))
+        # a degree of longitude is shortest at the latitude of the rings nearest to a pole
+        polar = min(90.0, max(abs(south), abs(north)))
+        return KM_PER_DEGREE * min(latitude_gap, longitude_gap * math.cos(math.radians(polar)))
+
+    def max_radius(self, row, column):
+        # ring radius past which no cell of the grid is left
+        return max(row, column, self.shape[0] - 1 - row, self.shape[1] - 1 - column, 0)
+
+    def min_radius(self, row, column):
+        # first ring radius reaching a cell of the grid, 0 unless the cell is outside the grid
+        return max(-row, row - (self.shape[0] - 1), -column, column - (self.shape[1] - 1), 0)
+
+    def search(self, coordinate, k=None, radius=None):
+        """
+        Visit the rings around a position until the k nearest items, or every item within the
+        radius, are known.
+
+        Returns:
+            tuple: (positions, distances) of the candidates found, not sorted.
+        """
+        latitude, longitude = coordinate.latitude, coordinate.longitude
+        row, column = self.cell(latitude, longitude)
+
+        positions = []
+        distances = []
+        found = 0
+        # the rings between a position outside the grid and the grid are empty
+        ring = self.min_radius(row, column)
+        last_ring = self.max_radius(row, column)
+        while ring <= last_ring:
+            members = self.ring(row, column, ring)
+            if len(members):
+                positions.append(members)
+                distances.append(one_to_many(latitude, longitude, self.latitude[members], self.longitude[members]))
+                found += len(members)
+
+            bound = self.outside_distance(latitude, longitude, row, column, ring)
+            if radius is not None and bound > radius:
+                break
+            if k is not None and found >= k:
+                # the k-th smallest distance found so far cannot be beaten by farther rings
+                kth = np.partition(np.concatenate(distances), k - 1)[k - 1]
+                if kth <= bound:
+                    break
+            ring += 1
+
+        if not positions:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        return np.concatenate(positions), np.concatenate(distances)
+
+    def nearest(self, coordinate, k=1):
+        """
+        The k zones nearest to a position.
+
+        Args:
+            coordinate (Coordinate): The position.
+            k (int): The number of zones.
+
+        Returns:
+            list of tuples: (zone, distance in km) pairs, nearest first.
+        """
+        if not self.items or k < 1:
+            return []
+        positions, distances = self.search(coordinate, k=min(k, len(self.items)))
+        order = np.argsort(distances, kind="stable")[:k]
+        return [(self.items[positions[i]], float(distances[i])) for i in order]
+
+    def nearest_one(self, coordinate):
+        """
+        The zone nearest to a position.
+
+        Args:
+            coordinate (Coordinate): The position.
+
+        Returns:
+            Zone: The nearest zone, or None when the index is empty.
+        """
+        nearest = self.nearest(coordinate)
+        return nearest[0][0] if nearest else None
+
+    def within(self, coordinate, radius):
+        """
+        The zones within a distance of a position.
+
+        Args:
+            coordinate (Coordinate): The position.
+            radius (float): The distance, in km.
+
+        Returns:
+            list of tuples: (zone, distance in km) pairs, nearest first.
+        """
+        if not self.items:
+            return []
+        positions, distances = self.search(coordinate, radius=radius)
+        order = np.argsort(distances, kind="stable")
+        return [(self.items[positions[i]], float(distances[i])) for i in order if distances[i] <= radius]
+
+
+def snap_to_zone(graph, location):
+    """
+    Resolve a search endpoint given as a position to the nearest zone of the graph.
+
+    Args:
+        graph (Graph or CSRGraph): The graph being searched.
+        location (Zone, int or Coordinate): The endpoint.
+
+    Returns:
+        The nearest zone when location is a Coordinate, otherwise location itself.
+    """
+    if isinstance(location, Coordinate):
+        return graph.nearest_zone(location)
+    return location
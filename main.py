@@ -1,6 +1,9 @@
+import logging
 from utils.menu import Menu
 
 def main():
+    # trip events of the dynamic searches, DEBUG also logs every leg
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     menu = Menu()
     menu.run()
 
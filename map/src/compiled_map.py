@@ -0,0 +1,125 @@
+import hashlib
+import json
+import os
+import numpy as np
+
+# Source JSON produced by the data manipulation scripts and the binary artifact compiled from it
+MAP_JSON_PATH = "map/data/after/final_output.json"
+COMPILED_MAP_PATH = "map/data/after/final_output.npz"
+
+
+def file_sha256(path):
+    """
+    Hash the contents of a file.
+
+    Args:
+        path (str): The file to hash.
+
+    Returns:
+        str: The hex digest of the file.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def parse_population(population):
+    """
+    Population of a municipality as an integer, 0 when it is missing, "N/A" or malformed.
+    """
+    if population is None or population == "N/A":
+        return 0
+    try:
+        return int(population)
+    except ValueError:
+        return 0
+
+
+def compile_map(json_path=MAP_JSON_PATH, output_path=COMPILED_MAP_PATH):
+    """
+    Parse the map JSON once and store it as a binary .npz artifact.
+
+    The artifact holds the names, coordinates and populations of the municipalities and every
+    road once, as pairs of positions in the name array, in the same order load_roads_from_json
+    adds them. It also keeps the hash of the JSON it was compiled from.
+
+    Args:
+        json_path (str): The map JSON.
+        output_path (str): The .npz file to write.
+    """
+    with open(json_path, "r", encoding="utf-8") as jsonfile:
+        data = json.load(jsonfile)
+
+    names = list(data)
+    index = {name: i for i, name in enumerate(names)}
+    latitude = np.array([info["centroide"][0] for info in data.values()], dtype=np.float64)
+    longitude = np.array([info["centroide"][1] for info in data.values()], dtype=np.float64)
+    population = np.array([parse_population(info.get("population", None)) for info in data.values()], dtype=np.int64)
+
+    sources = []
+    targets = []
+    connected = set()
+    for name, info in data.items():
+        zone = index[name]
+        for neighbor_name in info["vizinhos"]:
+            neighbor = index.get(neighbor_name)
+            if neighbor is None:
+                continue
+            pair = (min(zone, neighbor), max(zone, neighbor))
+            if pair not in connected:
+                connected.add(pair)
+                sources.append(zone)
+                targets.append(neighbor)
+
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    np.savez(
+        output_path,
+        source_hash=np.array(file_sha256(json_path)),
+        names=np.array(names, dtype=np.str_),
+        latitude=latitude,
+        longitude=longitude,
+        population=population,
+        sources=np.array(sources, dtype=np.int32),
+        targets=np.array(targets, dtype=np.int32),
+    )
+
+
+def compiled_path(json_path):
+    """
+    Path of the artifact compiled from a map JSON, next to it with the .npz extension.
+    """
+    return os.path.splitext(json_path)[0] + ".npz"
+
+
+def load_compiled_map(json_path=MAP_JSON_PATH, path=None):
+    """
+    Open the compiled map, compiling it first when it is missing or the JSON changed since.
+
+    Arrays are only read from the file when they are accessed.
+
+    Args:
+        json_path (str): The map JSON the artifact must match.
+        path (str): The .npz artifact, by default next to the JSON.
+
+    Returns:
+        NpzFile: The arrays of the compiled map, see compile_map.
+    """
+    path = path or compiled_path(json_path)
+    source_hash = file_sha256(json_path)
+    if os.path.exists(path):
+        compiled = np.load(path)
+        if str(compiled["source_hash"]) == source_hash:
+            return compiled
+        compiled.close()
+
+    compile_map(json_path, path)
+    return np.load(path)
+
+
+if __name__ == "__main__":
+    compile_map()
+    print(f"File '{COMPILED_MAP_PATH}' successfully created.")
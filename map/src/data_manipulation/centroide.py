@@ -1,7 +1,6 @@
 import json
-from shapely.geometry import shape, MultiPolygon
+from shapely.geometry import MultiPolygon
 from pyproj import Proj, Transformer
-import matplotlib.pyplot as plt
 
 # Define as projeções
 etrs_tm06 = Proj("EPSG:3763")  # ETRS 1989 TM06
@@ -11,70 +10,70 @@ transformer = Transformer.from_proj(etrs_tm06, wgs84)  # Criar o transformador
 # Definir os caminhos para os ficheiros GeoJSON
 geojson_files = ['map/data/before/geojson/collapsed_info-continental.geojson']
 
-# Lista para armazenar todas as features
-all_features = []
 
-# Carregar e processar cada GeoJSON
-for file_path in geojson_files:
-    print("Creating centroids for", file_path.replace('geojson/', '').replace('.geojson', ''))
-    with open(file_path, 'r', encoding='utf-8') as f:
-        geojson_data = json.load(f)
-        for feature in geojson_data["features"]:
-            # Extrair e processar a geometria
-            polygon_geom = shape(feature["geometry"])
-            
-            # Verificar se a geometria é válida
-            if not polygon_geom.is_valid:
-                print(f"Geometria inválida para a feature: {feature['properties']}")
-                continue
-            
-            # Calcular o centróide usando a envoltória convexa se for MultiPolygon
-            if isinstance(polygon_geom, MultiPolygon):
-                hull = polygon_geom.convex_hull
-                centroid = hull.centroid
-                
-                # Visualizar todos os polígonos dentro do MultiPolygon
-                for poly in polygon_geom.geoms:  # Usar .geoms para iterar sobre os polígonos
-                    x, y = poly.exterior.xy
-                    plt.fill(x, y, alpha=0.5, fc='blue', ec='black')
-            else:
-                centroid = polygon_geom.centroid
-                x, y = polygon_geom.exterior.xy
-                plt.fill(x, y, alpha=0.5, fc='blue', ec='black')
+def compute_centroids(gdf):
+    # Dicionário com o centróide de cada município, por ordem alfabética
+    features = []
+    for municipio, polygon_geom in zip(gdf['Municipio'], gdf.geometry):
+        # Verificar se a geometria é válida
+        if not polygon_geom.is_valid:
+            print(f"Geometria inválida para o município: {municipio}")
+            continue
 
-            # Transformar as coordenadas
-            lon, lat = transformer.transform(centroid.x, centroid.y)
+        # Calcular o centróide usando a envoltória convexa se for MultiPolygon
+        if isinstance(polygon_geom, MultiPolygon):
+            centroid = polygon_geom.convex_hull.centroid
+        else:
+            centroid = polygon_geom.centroid
 
-            # Remover a geometria e adicionar o centróide
-            del feature["geometry"]
-            feature["properties"]["centroide"] = [lon, lat]
+        # Transformar as coordenadas
+        lon, lat = transformer.transform(centroid.x, centroid.y)
+        features.append((municipio, [lon, lat]))
 
-            # Adicionar a feature processada à lista geral
-            all_features.append(feature)
-           
-            ## Adicionar o ponto do centróide à visualização
-            #plt.plot(centroid.x, centroid.y, 'ro')  # Ponto do centróide
-            #plt.title(feature['properties']['Municipio'])
-            #plt.xlabel('Longitude')
-            #plt.ylabel('Latitude')
-            #plt.show()
+    # Ordenar todos os municípios alfabeticamente
+    features.sort(key=lambda x: x[0])
+    return dict(features)
 
-# Ordenar todas as features alfabeticamente pelo município
-all_features.sort(key=lambda x: x["properties"]["Municipio"])
 
-# Criar a estrutura do GeoJSON final
-final_geojson = {
-    "type": "FeatureCollection",
-    "name": "collapsed_info",
-    "crs": {
-        "type": "name",
-        "properties": {
-            "name": "urn:ogc:def:crs:EPSG::3763"
-        }
-    },
-    "features": all_features
-}
+def plot_municipalities(gdf):
+    # Visualizar todos os polígonos, só quando pedido
+    import matplotlib.pyplot as plt
 
-# Guardar o GeoJSON combinado num único ficheiro
-with open('map/data/before/final.geojson', 'w', encoding='utf-8') as f:
-    json.dump(final_geojson, f, ensure_ascii=False, indent=4)
+    for polygon_geom in gdf.geometry:
+        polygons = polygon_geom.geoms if isinstance(polygon_geom, MultiPolygon) else [polygon_geom]
+        for poly in polygons:
+            x, y = poly.exterior.xy
+            plt.fill(x, y, alpha=0.5, fc='blue', ec='black')
+    plt.show()
+
+
+if __name__ == '__main__':
+    import geopandas as gpd
+    import pandas as pd
+
+    # Carregar cada GeoJSON
+    gdfs = []
+    for file_path in geojson_files:
+        print("Creating centroids for", file_path.replace('geojson/', '').replace('.geojson', ''))
+        gdfs.append(gpd.read_file(file_path))
+    centroids = compute_centroids(pd.concat(gdfs))
+
+    # Criar a estrutura do GeoJSON final
+    final_geojson = {
+        "type": "FeatureCollection",
+        "name": "collapsed_info",
+        "crs": {
+            "type": "name",
+            "properties": {
+                "name": "urn:ogc:def:crs:EPSG::3763"
+            }
+        },
+        "features": [
+            {"type": "Feature", "properties": {"Municipio": municipio, "centroide": centroide}}
+            for municipio, centroide in centroids.items()
+        ]
+    }
+
+    # Guardar o GeoJSON combinado num único ficheiro
+    with open('map/data/before/final.geojson', 'w', encoding='utf-8') as f:
+        json.dump(final_geojson, f, ensure_ascii=False)
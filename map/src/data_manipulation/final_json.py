@@ -1,29 +1,35 @@
 import json
 
-# Carregar dados de final.geojson
-with open('map/data/before/final.geojson', 'r', encoding='utf-8') as geojson_file:
-    geojson_data = json.load(geojson_file)
-
-# Carregar dados de neighbors.json
-with open('map/data/before/neighbors.json', 'r', encoding='utf-8') as neighbors_file:
-    neighbors_data = json.load(neighbors_file)
-
-# Criar estrutura para o novo JSON
-municipios_data = {}
-
-# Iterar sobre cada município em geojson_data
-for feature in geojson_data['features']:
-    nome_municipio = feature['properties']['Municipio']
-    centroide = feature['properties']['centroide']
-    vizinhos = neighbors_data.get(nome_municipio, [])
-    
-    municipios_data[nome_municipio] = {
-        "centroide": centroide,
-        "vizinhos": vizinhos
-    }
-
-# Guardar o novo JSON
-with open('map/data/before/final.json', 'w', encoding='utf-8') as output_file:
-    json.dump(municipios_data, output_file, ensure_ascii=False, indent=4)
-
-print("File 'map/data/before/final.json' successfully created!")
+
+def merge_neighbors(centroids, neighbors_data):
+    # Criar estrutura para o novo JSON
+    municipios_data = {}
+
+    # Iterar sobre cada município com centróide
+    for nome_municipio, centroide in centroids.items():
+        vizinhos = neighbors_data.get(nome_municipio, [])
+
+        municipios_data[nome_municipio] = {
+            "centroide": centroide,
+            "vizinhos": vizinhos
+        }
+    return municipios_data
+
+
+if __name__ == '__main__':
+    # Carregar dados de final.geojson
+    with open('map/data/before/final.geojson', 'r', encoding='utf-8') as geojson_file:
+        geojson_data = json.load(geojson_file)
+
+    # Carregar dados de neighbors.json
+    with open('map/data/before/neighbors.json', 'r', encoding='utf-8') as neighbors_file:
+        neighbors_data = json.load(neighbors_file)
+
+    centroids = {feature['properties']['Municipio']: feature['properties']['centroide'] for feature in geojson_data['features']}
+    municipios_data = merge_neighbors(centroids, neighbors_data)
+
+    # Guardar o novo JSON
+    with open('map/data/before/final.json', 'w', encoding='utf-8') as output_file:
+        json.dump(municipios_data, output_file, ensure_ascii=False)
+
+    print("File 'map/data/before/final.json' successfully created!")
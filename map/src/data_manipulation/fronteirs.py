@@ -1,36 +1,91 @@
+from concurrent.futures import ProcessPoolExecutor
 import geopandas as gpd
 import json
 import os
+import numpy as np
+import shapely
 
 # Define the directory where the geojson files are located
 geojson_dir = 'map/data/before/geojson/'
 output_file = 'map/data/before/neighbors.json'
 
-def get_neighbors(municipality_name, gdf):
-    # Get the geometry of the current municipality
-    municipality_geom = gdf[gdf['Municipio'] == municipality_name].geometry.values[0]
-    # Find neighbors by checking if their geometries intersect with a small buffer
-    neighbors = gdf[gdf.geometry.buffer(0.001).intersects(municipality_geom)]
-    neighbors = neighbors[neighbors['Municipio'] != municipality_name]
-    return neighbors['Municipio'].tolist()
-
-# List to store all municipalities and their neighbors
-municipalities_neighbors = {}
-
-# Process each .geojson file in the directory
-for file_name in os.listdir(geojson_dir):
-    if file_name.endswith('.geojson'):
-        print("Parsing " + file_name + "\nThis may take a few minutes...")
-        file_path = os.path.join(geojson_dir, file_name)
-        gdf = gpd.read_file(file_path)
-        
-        # Iterate over each municipality in the file
-        for municipality_name in gdf['Municipio'].unique():
-            neighbors = get_neighbors(municipality_name, gdf)
-            municipalities_neighbors[municipality_name] = neighbors
-
-# Save the result in JSON format
-with open(output_file, 'w', encoding='utf-8') as f:
-    json.dump(municipalities_neighbors, f, ensure_ascii=False, indent=4)
-
-print(f"'{output_file}' successfully created!")
+# Distance under which two municipalities are considered to share a border
+buffer_distance = 0.001
+
+# Number of geometries buffered and checked by a worker process per task
+chunk_size = 256
+
+# Geometries of the file being parsed, set once per worker by init_worker
+worker_geometries = None
+worker_tree = None
+
+
+def init_worker(geometries):
+    # The geometries are sent once per worker instead of once per task, and each worker builds
+    # its own spatial index over them
+    global worker_geometries, worker_tree
+    worker_geometries = geometries
+    worker_tree = shapely.STRtree(geometries)
+
+
+def touching_pairs(start, stop):
+    # Buffer each geometry of the chunk once and keep only the candidates from the spatial
+    # index whose geometry really intersects the buffer
+    buffered = shapely.buffer(worker_geometries[start:stop], buffer_distance)
+    sources, targets = worker_tree.query(buffered, predicate='intersects')
+    return sources + start, targets
+
+
+def get_neighbors(gdf, processes=None):
+    """
+    Find the neighbors of every municipality of a GeoDataFrame.
+
+    A municipality is a neighbor of another when its geometry, grown by buffer_distance,
+    intersects the geometry of the other. Every geometry is buffered once and only checked
+    against the geometries whose bounding box it overlaps, with the chunks spread over a
+    process pool.
+
+    Args:
+        gdf (GeoDataFrame): The municipalities, with their name in the 'Municipio' column.
+        processes (int): Number of worker processes, by default one per CPU.
+
+    Returns:
+        dict: The names of the neighbors of every municipality, in the order of the file.
+    """
+    names = gdf['Municipio'].tolist()
+    geometries = np.asarray(gdf.geometry.values, dtype=object)
+    chunks = [(start, min(start + chunk_size, len(geometries))) for start in range(0, len(geometries), chunk_size)]
+
+    with ProcessPoolExecutor(max_workers=processes, initializer=init_worker, initargs=(geometries,)) as executor:
+        pairs = list(executor.map(touching_pairs, *zip(*chunks))) if chunks else []
+
+    # Pair (i, j) means the buffer of i intersects j, so i is a neighbor of j
+    neighbors = {name: [] for name in names}
+    if pairs:
+        sources = np.concatenate([chunk_sources for chunk_sources, _ in pairs])
+        targets = np.concatenate([chunk_targets for _, chunk_targets in pairs])
+        for position in np.lexsort((sources, targets)):
+            neighbor = names[sources[position]]
+            municipality = names[targets[position]]
+            if neighbor != municipality and neighbor not in neighbors[municipality]:
+                neighbors[municipality].append(neighbor)
+    return neighbors
+
+
+if __name__ == '__main__':
+    # List to store all municipalities and their neighbors
+    municipalities_neighbors = {}
+
+    # Process each .geojson file in the directory
+    for file_name in os.listdir(geojson_dir):
+        if file_name.endswith('.geojson'):
+            print("Parsing " + file_name)
+            file_path = os.path.join(geojson_dir, file_name)
+            gdf = gpd.read_file(file_path)
+            municipalities_neighbors.update(get_neighbors(gdf))
+
+    # Save the result in JSON format
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(municipalities_neighbors, f, ensure_ascii=False, indent=4)
+
+    print(f"'{output_file}' successfully created!")
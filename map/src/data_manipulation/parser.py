@@ -5,19 +5,28 @@ import geopandas as gpd
 import os
 import pandas as pd
 
-def parse(path, name):
+def is_municipality_file(file):
+    # Ficheiros com os limites dos municípios
+    return "_Mun_" in file
+
+
+def read_shapefiles(path):
     # Lista para armazenar os GeoDataFrames
     gdfs = []
 
     # Iterar sobre os arquivos shapefile
-    for file in os.listdir(path):
+    for file in sorted(os.listdir(path)):
 
-        if file.endswith('.shp') and "_Mun_" in file:
+        if file.endswith('.shp') and is_municipality_file(file):
             gdf = gpd.read_file(os.path.join(path, file), encoding='utf-8')
             gdfs.append(gdf)
 
     # Concatenar os GeoDataFrames
-    gdf_final = pd.concat(gdfs)
+    return pd.concat(gdfs)
+
+
+def parse(path, name):
+    gdf_final = read_shapefiles(path)
 
     # Criar destino do ficheiro
     output_dir = "map/data/before/geojson"
@@ -29,11 +38,12 @@ def parse(path, name):
     # Salvar como GeoJSON
     gdf_final.to_file(file_name, driver='GeoJSON')
 
-# Definir o diretório com os shapefiles
-main_dir = "map/data/before/data/"
-print("Parsing", main_dir)
-parse(main_dir, "continental")
+if __name__ == '__main__':
+    # Definir o diretório com os shapefiles
+    main_dir = "map/data/before/data/"
+    print("Parsing", main_dir)
+    parse(main_dir, "continental")
 
-print("Parsing complete!\n")
+    print("Parsing complete!\n")
 
 
@@ -0,0 +1,121 @@
+import hashlib
+import json
+import os
+import pickle
+
+from map.src.compiled_map import MAP_JSON_PATH, file_sha256, load_compiled_map
+from map.src.data_manipulation.centroide import compute_centroids, plot_municipalities
+from map.src.data_manipulation.final import add_population, read_population
+from map.src.data_manipulation.final_json import merge_neighbors
+from map.src.data_manipulation.fronteirs import buffer_distance, get_neighbors
+from map.src.data_manipulation.parser import is_municipality_file, read_shapefiles
+
+# Inputs of the pipeline and the directory where the output of every stage is cached
+DATA_DIR = "map/data/before/data"
+POPULATION_PATH = "map/data/before/municipalities_population.csv"
+CACHE_DIR = "map/data/cache"
+
+
+def stage_key(*parts):
+    """
+    Cache key of a stage, from the keys of its inputs and its parameters.
+    """
+    return hashlib.sha256(repr(parts).encode("utf-8")).hexdigest()
+
+
+def shapefiles_sha256(path):
+    """
+    Hash the municipality shapefiles of a directory, the input of the parse stage.
+
+    Args:
+        path (str): The directory of the shapefiles.
+
+    Returns:
+        str: The hex digest of the names and contents of the files.
+    """
+    digest = hashlib.sha256()
+    for file in sorted(os.listdir(path)):
+        if is_municipality_file(file):
+            digest.update(file.encode("utf-8"))
+            digest.update(file_sha256(os.path.join(path, file)).encode("ascii"))
+    return digest.hexdigest()
+
+
+def run_stage(name, key, compute, cache_dir=CACHE_DIR):
+    """
+    Return the cached output of a stage, or compute and cache it when its inputs changed.
+
+    Only the latest output of every stage is kept.
+
+    Args:
+        name (str): The stage.
+        key (str): Cache key of the inputs of the stage, see stage_key.
+        compute (callable): Computes the output of the stage.
+        cache_dir (str): The cache directory.
+
+    Returns:
+        The output of the stage.
+    """
+    path = os.path.join(cache_dir, f"{name}-{key}.pkl")
+    if os.path.exists(path):
+        print(f"{name}: unchanged, using the cached output")
+        with open(path, "rb") as file:
+            return pickle.load(file)
+
+    print(f"{name}: running")
+    output = compute()
+
+    os.makedirs(cache_dir, exist_ok=True)
+    for file in os.listdir(cache_dir):
+        if file.startswith(f"{name}-") and file.endswith(".pkl"):
+            os.remove(os.path.join(cache_dir, file))
+    # written under a temporary name so an interrupted run never leaves a truncated cache entry
+    with open(path + ".tmp", "wb") as file:
+        pickle.dump(output, file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(path + ".tmp", path)
+    return output
+
+
+def run_pipeline(data_dir=DATA_DIR, population_path=POPULATION_PATH, output_path=MAP_JSON_PATH, cache_dir=CACHE_DIR, plot=False, processes=None):
+    """
+    Build the map JSON and its compiled artifact from the municipality shapefiles, in one process.
+
+    The stages pass their GeoDataFrames and dictionaries to each other in memory:
+    parse (shapefiles to one GeoDataFrame), centroids and neighbors (both from the parsed
+    municipalities) and map (centroids, neighbors and population merged). Each output is cached
+    by the hash of the inputs of its stage, so only the stages whose inputs changed run again.
+
+    Args:
+        data_dir (str): The directory of the shapefiles.
+        population_path (str): The population CSV.
+        output_path (str): The map JSON to write, compiled next to it.
+        cache_dir (str): The directory of the stage cache.
+        plot (bool): Whether to draw the municipalities.
+        processes (int): Number of worker processes of the neighbors stage, by default one per CPU.
+
+    Returns:
+        dict: The map, as written to output_path.
+    """
+    source_key = shapefiles_sha256(data_dir)
+    municipalities = run_stage("parse", source_key, lambda: read_shapefiles(data_dir), cache_dir)
+    if plot:
+        plot_municipalities(municipalities)
+
+    centroids_key = stage_key("centroids", source_key)
+    centroids = run_stage("centroids", centroids_key, lambda: compute_centroids(municipalities), cache_dir)
+
+    neighbors_key = stage_key("neighbors", source_key, buffer_distance)
+    neighbors = run_stage("neighbors", neighbors_key, lambda: get_neighbors(municipalities, processes), cache_dir)
+
+    map_key = stage_key("map", centroids_key, neighbors_key, file_sha256(population_path))
+    municipios_data = run_stage("map", map_key, lambda: add_population(merge_neighbors(centroids, neighbors), read_population(population_path)), cache_dir)
+
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as output_file:
+        json.dump(municipios_data, output_file, indent=4, ensure_ascii=False)
+
+    # Recompiled only when the JSON differs from the one the artifact was compiled from
+    load_compiled_map(output_path).close()
+    return municipios_data
@@ -10,6 +10,7 @@ from core.road import Road
 from enums.conditions import Conditions
 from enums.geography import Geography
 from enums.infrastructure import Infrastructure
+from map.src.compiled_map import load_compiled_map
 
 # Constants
 DEFAULT_NODE_SIZE = 50  # Default size for nodes with N/A population
@@ -46,8 +47,8 @@ def load_roads_from_json(graph, filename):
     with open(filename, "r", encoding="utf-8") as jsonfile:
         data = json.load(jsonfile)
         for name, info in data.items():
+            zone = graph.get_zone(name)
             for neighbor_name in info["vizinhos"]:
-                zone = graph.get_zone(name)
                 neighbor = graph.get_zone(neighbor_name)
 
                 if zone and neighbor:
@@ -61,6 +62,37 @@ def load_roads_from_json(graph, filename):
                         graph.add_connection(zone, neighbor, road)
                 
 
+# Load municipalities and roads from the compiled map, recompiled when the JSON file changed
+def load_compiled_map_into_graph(graph, filename):
+    compiled = load_compiled_map(filename)
+    with compiled:
+        names = compiled["names"].tolist()
+        latitudes = compiled["latitude"].tolist()
+        longitudes = compiled["longitude"].tolist()
+        populations = compiled["population"].tolist()
+        sources = compiled["sources"].tolist()
+        targets = compiled["targets"].tolist()
+
+    zones = []
+    for name, latitude, longitude, population in zip(names, latitudes, longitudes, populations):
+        zone = Zone()
+        zone.name = name
+        zone.coordinate = Coordinate(latitude, longitude)
+        zone.population = population
+
+        zones.append(zone)
+        graph.add_zone(zone)
+
+    # Same roads, in the same order and with the same random draws, as load_roads_from_json
+    for source, target in zip(sources, targets):
+        zone, neighbor = zones[source], zones[target]
+        road = Road()
+        road.cost = zone.calculate_distance_between_zones(neighbor)
+        road.geography = random.choice(list(Geography))
+        road.infrastructure = random.choice(list(Infrastructure))
+
+        graph.add_connection(zone, neighbor, road)
+
 # Visualize the graph with NetworkX and Matplotlib
 def visualize_generated_graph(graph, show_labels=False, show_conditions=False, show_geography=False, show_infrastructure=False, show_cost=False):
     G = nx.Graph()
@@ -1,20 +1,10 @@
-import subprocess
 import os
+import sys
 
-main_dir = "map/data/before/data"
+from map.src.pipeline import DATA_DIR, run_pipeline
 
-# List of scripts to run in order
-    
-scripts = [
-    'map/src/data_manipulation/parser.py',
-    'map/src/data_manipulation/centroide.py',
-    'map/src/data_manipulation/fronteirs.py',
-    'map/src/data_manipulation/final_json.py',
-    'map/src/data_manipulation/final.py'
-]
-
-if os.path.exists(main_dir): # Run each script in order
-    for script in scripts:
-        print("\n==== Running " + script + " ====")
-        subprocess.run(['python3', script], check=True)
+# Run from the repository root with: python3 -m map.src.run_all [--plot]
+if os.path.exists(DATA_DIR): # Run every stage of the pipeline, skipping those whose inputs did not change
+    run_pipeline(plot="--plot" in sys.argv[1:])
+    print("Map data successfully created.")
 else: print("Process interrupted: unzip the .zip file first")
@@ -1,20 +1,111 @@
+import copy
+import gc
+import hashlib
+import inspect
+import json
+import pickle
 import random
 import time
 import tracemalloc
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import matplotlib.pyplot as plt
+import numpy as np
 
+from core.road import Road
 from core.vehicle import Vehicle
+from core.zone import Zone
 from enums.vehicle_type import VehicleType
 from graph.algorithms.greedy import greedy
 from graph.algorithms.a_star import a_star
-from graph.algorithms.bfs import bfs
-from graph.algorithms.dfs import dfs
-from utils.graph_generator import apply_randomness_to_graph, generate_random_graph
+from graph.algorithms.alt import alt_a_star, bidirectional_alt_a_star
+from graph.algorithms.ch_query import ch_search
+from graph.algorithms.bfs import bfs, bidirectional_bfs
+from graph.algorithms.dfs import dfs, iddfs
+from graph.algorithms.lpa_star import lpa_star
+from graph.graph_builder import Graph
+from graph.route_cache import RouteCache
+from graph.search_stats import SearchStats
+from utils.coordinate import Coordinate
+from utils.graph_generator import apply_randomness_to_graph, apply_sampled_randomness_to_graph, generate_spatial_graph
 
-def benchmark_algorithm(algorithm_func, graph, initial_state, goal_state, heuristic=True, vehicle=None):
+# Algorithms compared by bulk_benchmarking, the "Dynamic" ones run in the weighted mode with a vehicle
+ALGORITHMS = {
+    "DFS": dfs,
+    "IDDFS": iddfs,
+    "BFS": bfs,
+    "Bidirectional BFS": bidirectional_bfs,
+    "A* Search": a_star,
+    "ALT A* Search": alt_a_star,
+    "Bidirectional ALT A* Search": bidirectional_alt_a_star,
+    "Contraction Hierarchy": ch_search,
+    "Greedy": greedy,
+    "Dynamic A* Search": a_star,
+    "Dynamic LPA* Search": lpa_star,
+}
+
+# Preprocessing run on the graph before an algorithm is benchmarked, outside the measurements
+PREPROCESSING = {
+    "ALT A* Search": Graph.preprocess_landmarks,
+    "Bidirectional ALT A* Search": Graph.preprocess_landmarks,
+    "Contraction Hierarchy": Graph.preprocess_contraction_hierarchy,
+}
+
+# Largest graph each algorithm is benchmarked on, for those that do not scale to the biggest sizes
+SIZE_LIMITS = {
+    "IDDFS": 5000,
+    "Contraction Hierarchy": 20000,
+}
+
+# Numbers of zones of the graphs bulk_benchmarking generates by default, a run of a few minutes
+GRAPH_SIZES = [5, 10, 20, 50, 100, 500]
+
+# Numbers of zones of the scaling run, up to road networks of a country; SIZE_LIMITS drop the
+# algorithms that do not scale from the largest ones
+LARGE_GRAPH_SIZES = [5, 10, 20, 50, 100, 500, 1000, 5000, 10000, 20000, 50000, 100000]
+
+# Graph sizes the metrics menu offers for bulk benchmarking, by name
+GRAPH_SIZE_PRESETS = {
+    "small": GRAPH_SIZES,
+    "large": LARGE_GRAPH_SIZES,
+}
+
+# Untimed and timed runs of every benchmark_algorithm measurement
+DEFAULT_WARMUPS = 1
+DEFAULT_REPETITIONS = 5
+
+# Percentiles reported for every metric over the trials of a cell
+PERCENTILES = [50, 90, 95]
+
+# Number of zones the memory footprint is measured on
+FOOTPRINT_ZONES = 100000
+
+# Route cache workload: zones of the graph, queries between a few depots and destinations, and
+# queries between two samples of road changes
+ROUTE_CACHE_ZONES = 2000
+ROUTE_CACHE_QUERIES = 2000
+ROUTE_CACHE_DEPOTS = 5
+ROUTE_CACHE_DESTINATIONS = 50
+ROUTE_CACHE_UPDATE_EVERY = 100
+
+# Generated graph of the last (seed, size, trial) a worker process benchmarked, pickled so every
+# cell starts from the same untouched graph even after a dynamic search changed it
+worker_graph = {}
+
+def benchmark_algorithm(algorithm_func, graph, initial_state, goal_state, heuristic=True, vehicle=None, warmups=DEFAULT_WARMUPS, repetitions=DEFAULT_REPETITIONS, reset=None):
     """
     Benchmarks a graph traversal algorithm, including metrics like execution time,
     memory usage, and path quality.
+
+    Timing and memory are measured in separate passes, since tracing allocations slows the
+    algorithm down several times. After the warmup runs every timed repetition runs with
+    tracemalloc and the garbage collector off, then one more run is traced for the peak memory
+    and the live blocks, the memory blocks allocated by the run and still alive once it returned
+    (its result included), which tracemalloc counts instead of every allocation. execution_time
+    is the median of the repetitions. Algorithms taking a stats argument run once more with a
+    SearchStats, whose counters and phase times are added to the metrics.
+
+    Dynamic searches change the roads and the supplies of the zones they run on, so with a reset
+    every run, warmups included, starts from the state it returns, outside the measurements.
     
     :param algorithm_func: The algorithm function to benchmark.
     :param graph: The graph object to traverse.
@@ -22,21 +113,53 @@ def benchmark_algorithm(algorithm_func, graph, initial_state, goal_state, heuris
     :param goal_state: The target zone/state.
     :param heuristic: Optional heuristic function (for dynamic A*).
     :param vehicle: Optional vehicle object (for vehicle-specific algorithms).
+    :param warmups: Number of untimed runs before the measurements.
+    :param repetitions: Number of timed runs.
+    :param reset: Optional function returning a fresh (graph, initial_state, goal_state) for every run.
     :return: A dictionary of performance metrics.
     """
 
-    start_time = time.time()
-    tracemalloc.start()
+    def prepare():
+        return (graph, initial_state, goal_state) if reset is None else reset()
 
-    if not heuristic and vehicle:
-        path, visited_zones, total_cost = algorithm_func(graph, initial_state, goal_state, heuristic, vehicle)
-    else:
-        path, visited_zones, total_cost = algorithm_func(graph, initial_state, goal_state)
+    def run(state, stats=None):
+        run_graph, start, goal = state
+        # the timed runs leave stats out, so they measure the uninstrumented search
+        options = {} if stats is None else {"stats": stats}
+        if not heuristic and vehicle:
+            # every run drives its own copy of the vehicle, so runs do not drain each other
+            return algorithm_func(run_graph, start, goal, heuristic, copy.copy(vehicle), **options)
+        return algorithm_func(run_graph, start, goal, **options)
+
+    for _ in range(warmups):
+        run(prepare())
 
-    end_time = time.time()
-    _, peak_memory = tracemalloc.get_traced_memory()
+    durations = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(max(1, repetitions)):
+            state = prepare()
+            start_time = time.perf_counter_ns()
+            result = run(state)
+            durations.append(time.perf_counter_ns() - start_time)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    path, visited_zones, total_cost = result
 
-    tracemalloc.stop()
+    state = prepare()
+    tracemalloc.start()
+    try:
+        traced_result = run(state)
+        _, peak_memory = tracemalloc.get_traced_memory()
+        # blocks allocated by the run that are still alive, the result included
+        live_blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename"))
+    finally:
+        tracemalloc.stop()
+    del traced_result, state
+
+    durations = np.array(durations, dtype=np.float64) / 1e9
 
     total_zones = len(graph.get_all_zones())
     solution_length = len(path) - 1 if path else 0
@@ -44,8 +167,11 @@ def benchmark_algorithm(algorithm_func, graph, initial_state, goal_state, heuris
     zones_visited_percentage = (len(visited_zones) / total_zones) * 100 if total_zones > 0 else 0
 
     metrics = {
-        "execution_time": end_time - start_time,
+        "execution_time": float(np.median(durations)),
+        "execution_time_min": float(durations.min()),
+        "execution_time_p95": float(np.percentile(durations, 95)),
         "peak_memory_usage": peak_memory / 1024,
+        "live_blocks": live_blocks,
         "zones_visited": len(visited_zones),
         "solution_depth": solution_length,
         "solution_cost": total_cost,
@@ -53,6 +179,11 @@ def benchmark_algorithm(algorithm_func, graph, initial_state, goal_state, heuris
         "zones_visited_percentage": zones_visited_percentage,
     }
 
+    if "stats" in inspect.signature(algorithm_func).parameters:
+        stats = SearchStats()
+        run(prepare(), stats)
+        metrics.update(stats.as_dict())
+
     return metrics
 
 def compare_algorithms(algorithms, graph, initial_state, goal_state):
@@ -79,85 +210,298 @@ def compare_algorithms(algorithms, graph, initial_state, goal_state):
 
     return results
 
-def bulk_benchmarking():
+def cell_seed(*parts):
     """
-    Performs bulk benchmarking on various algorithms over graphs of increasing size.
-    Metrics are calculated for each graph size and saved for analysis.
-    """
-    import json
+    Deterministic seed derived from the parts identifying a benchmark cell.
 
-    graph_sizes = [5, 10, 20, 50, 100, 500]
-    
-    algorithms = {
-        "DFS": dfs,
-        "BFS": bfs,
-        "A* Search": a_star,
-        "Greedy": greedy,
-        "Dynamic A* Search": a_star,
-    }
+    Returns:
+        int: A 64-bit seed, the same in every process and run.
+    """
+    digest = hashlib.sha256("\0".join(map(str, parts)).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big")
 
-    results = {}
-    autonomyCapacity = 800
+def benchmark_graph(seed, size, trial):
+    """
+    Generate, or reuse from the worker cache, the graph and the start and goal zones of a trial.
 
-    for size in graph_sizes:
-        print(f"Generating graph with {size} nodes...")
-        graph = generate_random_graph(size)
+    Returns:
+        tuple: (pickled graph, start zone position, goal zone position)
+    """
+    key = (seed, size, trial)
+    if key not in worker_graph:
+        random.seed(cell_seed(seed, size, trial))
+        graph = generate_spatial_graph(size)
         apply_randomness_to_graph(graph)
+        initial_position, goal_position = random.sample(range(len(graph.graph)), 2)
+        worker_graph.clear()
+        worker_graph[key] = (pickle.dumps(graph), initial_position, goal_position)
+    return worker_graph[key]
+
+def benchmark_cell(seed, size, name, trial, autonomy, warmups=DEFAULT_WARMUPS, repetitions=DEFAULT_REPETITIONS):
+    """
+    Benchmark one algorithm on one trial graph, the unit of work of bulk_benchmarking.
+
+    Args:
+        seed (int): The seed of the whole benchmark.
+        size (int): The number of zones of the graph.
+        name (str): The name of the algorithm in ALGORITHMS.
+        trial (int): The trial number, each trial has its own graph and start and goal zones.
+        autonomy (int): Autonomy and capacity of the truck of the dynamic searches.
+        warmups (int): Untimed runs before the measurements.
+        repetitions (int): Timed runs.
+
+    Returns:
+        tuple: (size, name, trial, metrics), metrics being None when the algorithm failed.
+    """
+    data, initial_position, goal_position = benchmark_graph(seed, size, trial)
+    graph = pickle.loads(data)
+    zones = graph.get_all_zones()
+    initial_zone, goal_zone = zones[initial_position], zones[goal_position]
+
+    if name in PREPROCESSING:
+        PREPROCESSING[name](graph)
+
+    random.seed(cell_seed(seed, size, trial, name))
+    try:
+        if name.startswith("Dynamic"):
+            vehicle = Vehicle(VehicleType.TRUCK, autonomy, autonomy)
+
+            def reset():
+                # the untouched cell graph and the same random road changes for every run
+                random.seed(cell_seed(seed, size, trial, name))
+                run_graph = pickle.loads(data)
+                run_zones = run_graph.get_all_zones()
+                return run_graph, run_zones[initial_position], run_zones[goal_position]
+
+            metrics = benchmark_algorithm(ALGORITHMS[name], graph, initial_zone, goal_zone, False, vehicle, warmups, repetitions, reset)
+        else:
+            metrics = benchmark_algorithm(ALGORITHMS[name], graph, initial_zone, goal_zone, warmups=warmups, repetitions=repetitions)
+    except Exception as e:
+        print(f"Error running {name} on {size} zones, trial {trial}: {e}")
+        metrics = None
+    return size, name, trial, metrics
+
+def summarize_trials(trials):
+    """
+    Merge the metrics of the trials of a cell into one entry of the results file.
+
+    Every metric keeps its mean under its own name, so the entry reads like a single run, and
+    its spread is added under "statistics".
 
-        zones = list(graph.get_all_zones())
-        if len(zones) < 2:
+    Args:
+        trials (list): The metrics dictionaries of the successful trials.
+
+    Returns:
+        dict: The mean metrics with "trials" and "statistics" entries.
+    """
+    summary = {}
+    statistics = {}
+    for metric in trials[0]:
+        values = np.array([trial[metric] for trial in trials], dtype=np.float64)
+        summary[metric] = float(values.mean())
+        statistics[metric] = {
+            "mean": float(values.mean()),
+            "std": float(values.std()),
+            "min": float(values.min()),
+            "max": float(values.max()),
+            **{f"p{percentile}": float(np.percentile(values, percentile)) for percentile in PERCENTILES},
+        }
+    summary["trials"] = len(trials)
+    summary["statistics"] = statistics
+    return summary
+
+def bulk_benchmarking(graph_sizes=GRAPH_SIZES, trials=1, processes=None, seed=0, output="bulk_benchmarking_results.json", warmups=DEFAULT_WARMUPS, repetitions=DEFAULT_REPETITIONS):
+    """
+    Performs bulk benchmarking on various algorithms over graphs of increasing size.
+
+    Graphs come from generate_spatial_graph, whose nearest-neighbor roads look like a road
+    network and which scales to the largest sizes.
+
+    Every (size, algorithm, trial) cell runs in a process pool worker. A trial regenerates the
+    same graph and start and goal zones for every algorithm from a seed derived from the
+    benchmark seed, the size and the trial, so results can be reproduced and compared.
+    Metrics are averaged over the trials and saved for analysis.
+
+    Args:
+        graph_sizes (list): The numbers of zones of the generated graphs.
+        trials (int): The number of graphs generated for every size.
+        processes (int): Number of worker processes, None for one per CPU and 1 to run in this process.
+        seed (int): The seed of the whole benchmark.
+        output (str): The JSON file the results are written to.
+        warmups (int): Untimed runs before every measurement.
+        repetitions (int): Timed runs of every measurement.
+
+    Returns:
+        dict: The results, by size and algorithm.
+    """
+    cells = []
+    for position, size in enumerate(graph_sizes):
+        if size < 2:
             print(f"Graph with size {size} has insufficient zones. Skipping...")
             continue
+        # larger graphs get a truck with more autonomy
+        autonomy = 800 + 200 * position
+        for trial in range(trials):
+            for name in ALGORITHMS:
+                if size <= SIZE_LIMITS.get(name, size):
+                    cells.append((seed, size, name, trial, autonomy, warmups, repetitions))
 
-        initial_zone = random.choice(zones)
-        goal_zone = random.choice([z for z in zones if z != initial_zone])
-
-        vehicle = Vehicle(VehicleType.TRUCK, autonomyCapacity, autonomyCapacity)
-        autonomyCapacity = autonomyCapacity + 200
+    print(f"Benchmarking {len(cells)} cells...")
+    runs = {}
+    if processes == 1:
+        completed = (benchmark_cell(*cell) for cell in cells)
+        for size, name, trial, metrics in completed:
+            runs.setdefault(size, {}).setdefault(name, {})[trial] = metrics
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            futures = [executor.submit(benchmark_cell, *cell) for cell in cells]
+            for future in as_completed(futures):
+                size, name, trial, metrics = future.result()
+                runs.setdefault(size, {}).setdefault(name, {})[trial] = metrics
+                print(f"Completed {name} on {size} zones, trial {trial}.")
 
-        print(f"Benchmarking algorithms on graph with {size} nodes...")
+    results = {}
+    for size in graph_sizes:
+        if size not in runs:
+            continue
         results[size] = {}
+        for name in ALGORITHMS:
+            if name not in runs[size]:
+                continue
+            # in trial order, so the statistics do not depend on which worker finished first
+            successful = [metrics for _, metrics in sorted(runs[size][name].items()) if metrics is not None]
+            results[size][name] = summarize_trials(successful) if successful else "No path found"
 
-        for name, algorithm in algorithms.items():
-            print(f"Running {name}...")
-            
-            try:
-                if name == "Dynamic A* Search":
-                    metrics = benchmark_algorithm(algorithm, graph, initial_zone, goal_zone, False, vehicle)
-                else:
-                    metrics = benchmark_algorithm(algorithm, graph, initial_zone, goal_zone)
-                results[size][name] = metrics
-            except Exception as e:
-                print(f"Error running {name}: {e}")
-                results[size][name] = "No path found"
-
-        print(f"Completed benchmarking for graph with {size} nodes.\n")
-
-    with open("bulk_benchmarking_results.json", "w") as f:
+    with open(output, "w") as f:
         json.dump(results, f, indent=4)
 
-    print("Bulk benchmarking complete. Results saved to 'bulk_benchmarking_results.json'.")
+    print(f"Bulk benchmarking complete. Results saved to '{output}'.")
+    return results
+
+def traced_bytes(build):
+    """
+    Memory held by what a function builds, as traced by tracemalloc.
+
+    :param build: Function building the objects to measure.
+    :return: A tuple (bytes still allocated once build returned, what build returned).
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        built = build()
+        allocated, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return allocated, built
+
+def memory_footprint(num_zones=FOOTPRINT_ZONES, seed=0):
+    """
+    Measures the memory taken by every zone and road, alone and inside a generated graph,
+    to tell how large a graph fits in RAM.
+
+    Zones are measured with their own Coordinate and roads with their attributes set as
+    generate_spatial_graph sets them. The graphs are generated with num_zones zones, as a
+    Graph and as a CSRGraph.
+
+    :param num_zones: The number of zones and roads measured.
+    :param seed: The seed of the generated graphs.
+    :return: A dictionary of bytes per zone or road, and the projected size of a million-zone graph.
+    """
+    zone_bytes, zones = traced_bytes(lambda: [Zone(f"Z{i}", Coordinate(i * 1e-6, -i * 1e-6), population=i) for i in range(num_zones)])
+    road_bytes, roads = traced_bytes(lambda: [Road(float(i), availability=True) for i in range(num_zones)])
+    del zones, roads
+
+    random.seed(seed)
+    graph_bytes, graph = traced_bytes(lambda: generate_spatial_graph(num_zones))
+    num_roads = sum(len(connections) for connections in graph.graph.values()) // 2
+    del graph
+
+    random.seed(seed)
+    csr_bytes, csr_graph = traced_bytes(lambda: generate_spatial_graph(num_zones, as_csr=True))
+    del csr_graph
+
+    return {
+        "zones": num_zones,
+        "roads": num_roads,
+        "bytes_per_zone": zone_bytes / num_zones,
+        "bytes_per_road": road_bytes / num_zones,
+        "graph_bytes_per_zone": graph_bytes / num_zones,
+        "csr_graph_bytes_per_zone": csr_bytes / num_zones,
+        "million_zone_graph_mb": graph_bytes / num_zones * 1e6 / 2**20,
+        "million_zone_csr_graph_mb": csr_bytes / num_zones * 1e6 / 2**20,
+    }
+
+def route_cache_benchmark(num_zones=ROUTE_CACHE_ZONES, queries=ROUTE_CACHE_QUERIES, update_every=ROUTE_CACHE_UPDATE_EVERY, seed=0):
+    """
+    Replays repeated depot-to-zone A* queries with and without a RouteCache, changing a sample
+    of the roads every update_every queries, and measures what the cache saves.
+
+    Both runs answer every query on the same road state, one after the other.
+
+    :param num_zones: The number of zones of the generated graph.
+    :param queries: The number of queries.
+    :param update_every: The number of queries between two samples of road changes.
+    :param seed: The seed of the graph, the queries and the road changes.
+    :return: A dictionary with the counters of the cache and the time spent with and without it.
+    """
+    random.seed(seed)
+    graph = generate_spatial_graph(num_zones)
+    apply_randomness_to_graph(graph)
+    zones = graph.get_all_zones()
+    depots = random.sample(zones, ROUTE_CACHE_DEPOTS)
+    destinations = random.sample(zones, ROUTE_CACHE_DESTINATIONS)
+    workload = [(random.choice(depots), random.choice(destinations)) for _ in range(queries)]
+
+    cache = RouteCache(graph)
+    uncached_time = 0
+    cached_time = 0
+    for i, (start, goal) in enumerate(workload):
+        if i and i % update_every == 0:
+            apply_sampled_randomness_to_graph(graph)
+
+        start_time = time.perf_counter_ns()
+        a_star(graph, start, goal)
+        uncached_time += time.perf_counter_ns() - start_time
+
+        start_time = time.perf_counter_ns()
+        cache.search(a_star, start, goal)
+        cached_time += time.perf_counter_ns() - start_time
+    cache.close()
+
+    return {
+        "queries": queries,
+        **cache.stats(),
+        "uncached_time": uncached_time / 1e9,
+        "cached_time": cached_time / 1e9,
+        "speedup": uncached_time / cached_time if cached_time else 0.0,
+    }
 
 def visualize_comparisons(data):
     metrics = [
         "execution_time",
+        "execution_time_p95",
         "peak_memory_usage",
+        "live_blocks",
         "zones_visited",
         "solution_depth",
         "solution_cost",
         "avg_cost_per_edge",
-        "zones_visited_percentage"
+        "zones_visited_percentage",
+        *SearchStats.COUNTERS,
+        "search_time",
     ]
     
     for metric in metrics:
         plt.figure(figsize=(12, 6))
         x_values = sorted(map(int, data.keys()))
-        algorithms = list(data[str(x_values[0])].keys())
+        algorithms = list(dict.fromkeys(algorithm for x in x_values for algorithm in data[str(x)]))
         
         for algorithm in algorithms:
-            y_values = [
-                data[str(x)][algorithm].get(metric, 0) for x in x_values
-            ]
+            y_values = []
+            for x in x_values:
+                # sizes an algorithm was not run on or failed on are plotted as 0
+                entry = data[str(x)].get(algorithm)
+                y_values.append(entry.get(metric, 0) if isinstance(entry, dict) else 0)
             plt.plot(x_values, y_values, marker='o', label=algorithm)
         
         plt.title(f'Comparison of {metric.replace("_", " ").capitalize()}')
@@ -0,0 +1,203 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from service.server import ALGORITHMS, DEFAULT_HOST, DEFAULT_PORT, MAX_LINE_BYTES, VEHICLES, latency_summary
+
+
+class Connection:
+    """
+    Client connection to the routing server, matching the responses to the requests by id so many
+    requests can be in flight at once.
+
+    Attributes:
+        reader (asyncio.StreamReader): The incoming side of the connection.
+        writer (asyncio.StreamWriter): The outgoing side of the connection.
+        waiting (dict): The future of every request sent and not answered yet, by id.
+    """
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.waiting = {}
+        self.next_id = 0
+        self.receiver = asyncio.ensure_future(self.receive())
+
+    @classmethod
+    async def open(cls, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        reader, writer = await asyncio.open_connection(host, port, limit=MAX_LINE_BYTES)
+        return cls(reader, writer)
+
+    async def receive(self):
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                break
+            response = json.loads(line)
+            future = self.waiting.pop(response["id"], None)
+            if future is not None and not future.done():
+                future.set_result(response)
+        for future in self.waiting.values():
+            if not future.done():
+                future.set_exception(ConnectionError("The server closed the connection"))
+
+    def send(self, request):
+        """
+        Send a request without waiting for its response.
+
+        Args:
+            request (dict): The request, without its id.
+
+        Returns:
+            tuple: (id, future resolved with the response)
+        """
+        request_id = self.next_id
+        self.next_id += 1
+        future = asyncio.get_running_loop().create_future()
+        self.waiting[request_id] = future
+        self.writer.write(json.dumps({"id": request_id, **request}).encode("utf-8") + b"\n")
+        return request_id, future
+
+    async def request(self, request):
+        """
+        Send a request and wait for its response.
+
+        Args:
+            request (dict): The request, without its id.
+
+        Returns:
+            dict: The response.
+        """
+        _, future = self.send(request)
+        await self.writer.drain()
+        return await future
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+        self.receiver.cancel()
+
+
+def random_request(rng, zones, kind="route", algorithm="a_star", vehicle=None, goals=8):
+    """
+    Draw a request between random zones.
+
+    Args:
+        rng (random.Random): The random generator.
+        zones (list): The zone names of the server.
+        kind (str): "route", "multi_route" or "distance_matrix".
+        algorithm (str): The algorithm of the routes.
+        vehicle (str): Optional vehicle name.
+        goals (int): Goals of a multi-route, and sources and targets of a distance matrix.
+
+    Returns:
+        dict: The request, without its id.
+    """
+    request = {"type": kind}
+    if vehicle is not None:
+        request["vehicle"] = vehicle
+    if kind == "route":
+        request["start"], request["goal"] = rng.sample(zones, 2)
+        request["algorithm"] = algorithm
+    elif kind == "multi_route":
+        request["start"] = rng.choice(zones)
+        request["goals"] = rng.sample(zones, min(goals, len(zones)))
+    else:
+        request["sources"] = rng.sample(zones, min(goals, len(zones)))
+        request["targets"] = rng.sample(zones, min(goals, len(zones)))
+    return request
+
+
+async def run_load(host=DEFAULT_HOST, port=DEFAULT_PORT, requests=1000, concurrency=64, connections=4,
+                   kind="route", algorithm="a_star", vehicle=None, cancel_fraction=0.0, seed=0):
+    """
+    Drive the routing server with random requests and measure its throughput and latency.
+
+    The requests are spread over the connections and at most concurrency of them are in flight at
+    once. A fraction of them is cancelled right after being sent.
+
+    Args:
+        host (str): The address of the server.
+        port (int): The port of the server.
+        requests (int): The number of requests to send.
+        concurrency (int): Most requests in flight at once.
+        connections (int): The number of client connections.
+        kind (str): "route", "multi_route" or "distance_matrix".
+        algorithm (str): The algorithm of the routes.
+        vehicle (str): Optional vehicle name.
+        cancel_fraction (float): The fraction of the requests cancelled.
+        seed (int): The seed of the random requests.
+
+    Returns:
+        dict: Requests answered by status, the throughput in requests per second, the latency
+              summary seen by the client and the mean compute time in the server's workers.
+    """
+    rng = random.Random(seed)
+    clients = [await Connection.open(host, port) for _ in range(connections)]
+    zones = (await clients[0].request({"type": "zones"}))["result"]["zones"]
+    drawn = [random_request(rng, zones, kind, algorithm, vehicle) for _ in range(requests)]
+    cancelled = set(rng.sample(range(requests), round(cancel_fraction * requests)))
+
+    limit = asyncio.Semaphore(concurrency)
+    latencies = []
+    compute_times = []
+    statuses = {}
+
+    async def drive(i, request):
+        async with limit:
+            client = clients[i % connections]
+            sent = time.perf_counter()
+            request_id, future = client.send(request)
+            if i in cancelled:
+                client.send({"type": "cancel", "target": request_id})
+            await client.writer.drain()
+            response = await future
+            latencies.append((time.perf_counter() - sent) * 1000)
+            statuses[response["status"]] = statuses.get(response["status"], 0) + 1
+            if "compute_ms" in response:
+                compute_times.append(response["compute_ms"])
+
+    started = time.perf_counter()
+    await asyncio.gather(*(drive(i, request) for i, request in enumerate(drawn)))
+    duration = time.perf_counter() - started
+
+    server_stats = (await clients[0].request({"type": "stats"}))["result"]
+    for client in clients:
+        await client.close()
+
+    return {
+        "requests": requests,
+        **statuses,
+        "duration_s": duration,
+        "throughput_rps": requests / duration,
+        **latency_summary(latencies),
+        "mean_compute_ms": sum(compute_times) / len(compute_times) if compute_times else 0.0,
+        "server_mean_batch_size": server_stats["mean_batch_size"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load generator measuring the throughput and latency of the routing server.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--connections", type=int, default=4)
+    parser.add_argument("--type", dest="kind", choices=["route", "multi_route", "distance_matrix"], default="route")
+    parser.add_argument("--algorithm", choices=list(ALGORITHMS), default="a_star")
+    parser.add_argument("--vehicle", choices=list(VEHICLES), default=None)
+    parser.add_argument("--cancel-fraction", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    results = asyncio.run(run_load(args.host, args.port, args.requests, args.concurrency, args.connections,
+                                   args.kind, args.algorithm, args.vehicle, args.cancel_fraction, args.seed))
+    for key, value in results.items():
+        print(f"{key}: {value}")
+
+
+# Run from the repository root, with the server running, with: python3 -m service.load_generator [--requests N]
+if __name__ == "__main__":
+    main()
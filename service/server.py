@@ -0,0 +1,541 @@
+import argparse
+import asyncio
+import collections
+import json
+import logging
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from core.vehicle import Vehicle
+from enums.vehicle_type import VehicleType
+from graph.algorithms.a_star import a_star
+from graph.algorithms.alt import alt_a_star, bidirectional_alt_a_star
+from graph.algorithms.bfs import bfs, bidirectional_bfs
+from graph.algorithms.ch_query import ch_search
+from graph.algorithms.dfs import dfs
+from graph.algorithms.dijkstra import dijkstra_route, multi_target_dijkstra
+from graph.algorithms.greedy import greedy
+from graph.distance_matrix import distance_matrix
+from utils.coordinate import Coordinate
+from utils.graph_generator import apply_randomness_to_graph, generate_map_graph, generate_spatial_graph
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Requests sent to the process pool together: a batch is dispatched once it has BATCH_SIZE requests
+# or BATCH_WINDOW seconds after its first request arrived, whichever comes first
+BATCH_SIZE = 32
+BATCH_WINDOW = 0.002
+
+# Batches in flight per worker process, the rest of the requests wait (and can be cancelled) in the queue
+BATCHES_PER_WORKER = 2
+
+# Longest request or response line, distance matrices can be large
+MAX_LINE_BYTES = 64 * 1024 * 1024
+
+# Number of recent request latencies the stats request reports on
+LATENCY_WINDOW = 10000
+
+# Percentiles of the latency reported by the stats request and the load generator
+LATENCY_PERCENTILES = [50, 95, 99]
+
+# Algorithms of the route requests, by name
+ALGORITHMS = {
+    "a_star": a_star,
+    "greedy": greedy,
+    "bfs": bfs,
+    "bidirectional_bfs": bidirectional_bfs,
+    "dfs": dfs,
+    "alt_a_star": alt_a_star,
+    "bidirectional_alt_a_star": bidirectional_alt_a_star,
+    "contraction_hierarchy": ch_search,
+}
+
+# Vehicle of every vehicle name the requests accept: (type, autonomy, capacity), as in the menu
+VEHICLES = {
+    "drone": (VehicleType.DRONE, 40, 20),
+    "car": (VehicleType.CAR, 500, 200),
+    "truck": (VehicleType.TRUCK, 800, 800),
+}
+
+# Requests computed by the worker processes
+POOL_REQUESTS = ("route", "multi_route", "distance_matrix")
+
+# Graph searched by the worker processes, set once per worker by init_worker
+worker_graph = None
+
+
+def init_worker(graph):
+    """
+    Process pool initializer, keeps the pre-loaded graph so it is sent once per worker instead of once per request.
+
+    Args:
+        graph (Graph): The graph to search.
+    """
+    global worker_graph
+    worker_graph = graph
+
+
+def finite(value):
+    """
+    A cost as JSON allows it, None when it is infinite.
+    """
+    return None if value is None or math.isinf(value) else float(value)
+
+
+def resolve_zone(graph, reference):
+    """
+    Find the zone a request refers to, either by its name or as a [latitude, longitude] position
+    snapped to the nearest zone.
+
+    Args:
+        graph (Graph): The graph searched.
+        reference (str or list): The zone name or position.
+
+    Returns:
+        Zone: The zone.
+
+    Raises:
+        ValueError: If no zone has that name.
+    """
+    if isinstance(reference, (list, tuple)) and len(reference) == 2:
+        return graph.nearest_zone(Coordinate(float(reference[0]), float(reference[1])))
+    zone = graph.get_zone(reference)
+    if zone is None:
+        raise ValueError(f"Unknown zone: {reference}")
+    return zone
+
+
+def request_vehicle(request):
+    """
+    Build the vehicle a request asks for.
+
+    Args:
+        request (dict): The request, whose optional "vehicle" is a name of VEHICLES.
+
+    Returns:
+        Vehicle: A new vehicle, or None when the request has none.
+
+    Raises:
+        ValueError: If the vehicle name is unknown.
+    """
+    name = request.get("vehicle")
+    if name is None:
+        return None
+    if name not in VEHICLES:
+        raise ValueError(f"Unknown vehicle: {name}")
+    vehicle_type, autonomy, capacity = VEHICLES[name]
+    return Vehicle(vehicle_type, autonomy, capacity)
+
+
+def execute(graph, request):
+    """
+    Compute the result of a route, multi-route or distance-matrix request.
+
+    A route with a vehicle is the path of least weighted cost for the vehicle, found by a
+    Dijkstra search on the road state pinned when it starts. Unlike the dynamic A* search of the
+    menu it neither changes the roads nor leaves supplies at the zones, so the graph copies of the
+    worker processes stay alike. The other requests minimize the vehicle's weighted cost too when
+    one is given.
+
+    Args:
+        graph (Graph): The graph searched.
+        request (dict): The request.
+
+    Returns:
+        dict: The JSON result of the request.
+
+    Raises:
+        ValueError: If the request is malformed.
+    """
+    kind = request["type"]
+    vehicle = request_vehicle(request)
+    vehicle_type = None if vehicle is None else vehicle.type
+
+    if kind == "route":
+        start = resolve_zone(graph, request["start"])
+        goal = resolve_zone(graph, request["goal"])
+        name = request.get("algorithm", "a_star")
+        if vehicle is not None:
+            if name != "a_star":
+                raise ValueError("Routes with a vehicle use the a_star algorithm")
+            path, visited, cost = dijkstra_route(graph, start, goal, vehicle)
+        elif name in ALGORITHMS:
+            path, visited, cost = ALGORITHMS[name](graph, start, goal)
+        else:
+            raise ValueError(f"Unknown algorithm: {name}")
+
+        if path is None:
+            return {"path": None, "cost": None, "visited": 0}
+        return {"path": [zone.name for zone in path], "cost": finite(cost), "visited": len(visited)}
+
+    if kind == "multi_route":
+        start = resolve_zone(graph, request["start"])
+        goals = [resolve_zone(graph, goal) for goal in request["goals"]]
+        routes = multi_target_dijkstra(graph, start, goals, vehicle_type)
+        return {"routes": [
+            {"goal": goal.name, "path": None if path is None else [zone.name for zone in path], "cost": finite(cost)}
+            for goal, (path, cost) in routes.items()
+        ]}
+
+    if kind == "distance_matrix":
+        sources = [resolve_zone(graph, source) for source in request["sources"]]
+        targets = [resolve_zone(graph, target) for target in request["targets"]]
+        matrix = distance_matrix(graph, sources, targets, vehicle_type)
+        return {
+            "sources": [zone.name for zone in sources],
+            "targets": [zone.name for zone in targets],
+            "matrix": [[finite(value) for value in row] for row in matrix.tolist()],
+        }
+
+    raise ValueError(f"Unknown request type: {kind}")
+
+
+def run_batch(requests):
+    """
+    Compute a batch of requests in a worker process, the unit of work of the server's process pool.
+
+    Args:
+        requests (list): The requests.
+
+    Returns:
+        list: (result, error, compute time in milliseconds) of every request, error being None on success.
+    """
+    responses = []
+    for request in requests:
+        started = time.perf_counter()
+        try:
+            result, error = execute(worker_graph, request), None
+        except Exception as e:
+            result, error = None, f"{type(e).__name__}: {e}"
+        responses.append((result, error, (time.perf_counter() - started) * 1000))
+    return responses
+
+
+def latency_summary(latencies):
+    """
+    Percentiles and mean of request latencies.
+
+    Args:
+        latencies (list): The latencies in milliseconds.
+
+    Returns:
+        dict: "mean_ms", "max_ms" and "p<percentile>_ms" of every LATENCY_PERCENTILES, empty without latencies.
+    """
+    if not latencies:
+        return {}
+    values = np.array(latencies, dtype=np.float64)
+    summary = {"mean_ms": float(values.mean()), "max_ms": float(values.max())}
+    for percentile in LATENCY_PERCENTILES:
+        summary[f"p{percentile}_ms"] = float(np.percentile(values, percentile))
+    return summary
+
+
+class PendingRequest:
+    """
+    Class representing a request received by the server and not answered yet.
+
+    Attributes:
+        request (dict): The request.
+        received (float): When it was read, from time.perf_counter.
+        response (asyncio.Future): Resolved with the response once computed or cancelled.
+        dispatched (bool): Whether it was sent to the process pool already.
+    """
+
+    def __init__(self, request, response):
+        self.request = request
+        self.received = time.perf_counter()
+        self.response = response
+        self.dispatched = False
+
+    @property
+    def cancelled(self):
+        return self.response.done()
+
+    def finish(self, response):
+        """
+        Answer the request, unless it was cancelled meanwhile.
+
+        Args:
+            response (dict): The response, without its id and latency.
+        """
+        if not self.response.done():
+            self.response.set_result(response)
+
+
+class RoutingServer:
+    """
+    Asyncio routing service over line-delimited JSON, answering route, multi-route and
+    distance-matrix requests on a graph kept loaded in a process pool.
+
+    Every line a client sends is a JSON request with an "id" of its choice and a "type":
+    "route" (start, goal, optional algorithm and vehicle), "multi_route" (start, goals, optional
+    vehicle), "distance_matrix" (sources, targets, optional vehicle), "cancel" (target, the id of a
+    request of the same connection), "zones" or "stats". Zones are given by name or as a
+    [latitude, longitude] position. Every request gets one response line with the same id, a
+    "status" ("ok", "error" or "cancelled"), its "result" or "error", and its "latency_ms" from the
+    moment it was read; responses come as soon as they are ready, not in request order.
+
+    Searches run in worker processes that each received a copy of the graph when they started.
+    Requests are queued and sent to the pool in batches, and at most BATCHES_PER_WORKER batches
+    per worker are in flight, so a request cancelled while it waits is never computed. A request
+    cancelled while computed is answered as cancelled right away and its result dropped. Closing
+    the connection cancels every request of the client.
+
+    Attributes:
+        graph (Graph): The graph served.
+        processes (int): The number of worker processes.
+        batch_size (int): Most requests sent to the pool at once.
+        batch_window (float): Longest wait in seconds for a batch to fill up.
+        latencies (collections.deque): The latency in milliseconds of the LATENCY_WINDOW latest answered requests.
+        counters (dict): Requests answered by status, and batches dispatched.
+        running (set): The concurrent futures of the batches sent to the pool and not computed yet.
+    """
+
+    def __init__(self, graph, processes=None, batch_size=BATCH_SIZE, batch_window=BATCH_WINDOW):
+        self.graph = graph
+        self.processes = processes or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.latencies = collections.deque(maxlen=LATENCY_WINDOW)
+        self.counters = {"ok": 0, "error": 0, "cancelled": 0, "batches": 0, "batched_requests": 0}
+        self.zone_names = [zone.name for zone in graph.get_all_zones()]
+        self.executor = None
+        self.running = set()
+        self.queue = None
+        self.slots = None
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT, ready=None):
+        """
+        Start the process pool and answer clients until cancelled.
+
+        Args:
+            host (str): The address to listen on.
+            port (int): The port to listen on, 0 for any free port.
+            ready (asyncio.Future): Optional future resolved with the bound port once listening.
+        """
+        self.executor = ProcessPoolExecutor(max_workers=self.processes, initializer=init_worker, initargs=(self.graph,))
+        self.queue = asyncio.Queue()
+        self.slots = asyncio.Semaphore(self.processes * BATCHES_PER_WORKER)
+        dispatcher = asyncio.ensure_future(self.dispatch())
+        server = await asyncio.start_server(self.handle_connection, host, port, limit=MAX_LINE_BYTES)
+        port = server.sockets[0].getsockname()[1]
+        logger.info("Serving %d zones on %s:%d with %d worker processes", len(self.zone_names), host, port, self.processes)
+        if ready is not None:
+            ready.set_result(port)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            dispatcher.cancel()
+            # the batches still waiting in the pool are cancelled by hand, shutdown only does it from Python 3.9
+            for future in list(self.running):
+                future.cancel()
+            self.executor.shutdown(wait=False)
+
+    async def handle_connection(self, reader, writer):
+        """
+        Read the requests of a client, one JSON object per line, until it disconnects.
+        """
+        pending = {}
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("A request is a JSON object")
+                except ValueError as e:
+                    await self.send(writer, {"id": None, "status": "error", "error": f"Invalid request: {e}"})
+                    continue
+                self.receive(request, writer, pending)
+        except (ConnectionError, ValueError) as e:
+            # ValueError when a line exceeds MAX_LINE_BYTES
+            logger.info("Connection dropped: %s", e)
+        finally:
+            for entry in list(pending.values()):
+                entry.finish({"status": "cancelled"})
+            writer.close()
+
+    def receive(self, request, writer, pending):
+        """
+        Answer a request right away, or queue it for the process pool.
+
+        Args:
+            request (dict): The request.
+            writer (asyncio.StreamWriter): The connection of the client.
+            pending (dict): The unanswered requests of the connection, by id.
+        """
+        request_id = request.get("id")
+        kind = request.get("type")
+        loop = asyncio.get_running_loop()
+
+        if kind in POOL_REQUESTS and request_id in pending:
+            entry = PendingRequest(request, loop.create_future())
+            entry.finish({"status": "error", "error": f"Request {request_id} is already pending"})
+        elif kind in POOL_REQUESTS:
+            entry = pending[request_id] = PendingRequest(request, loop.create_future())
+            self.queue.put_nowait(entry)
+        else:
+            entry = PendingRequest(request, loop.create_future())
+            if kind == "cancel":
+                target = pending.get(request.get("target"))
+                if target is not None:
+                    target.finish({"status": "cancelled"})
+                entry.finish({"status": "ok", "result": {"cancelled": target is not None}})
+            elif kind == "zones":
+                entry.finish({"status": "ok", "result": {"zones": self.zone_names}})
+            elif kind == "stats":
+                entry.finish({"status": "ok", "result": self.stats()})
+            else:
+                entry.finish({"status": "error", "error": f"Unknown request type: {kind}"})
+
+        asyncio.ensure_future(self.respond(writer, entry, pending))
+
+    async def respond(self, writer, entry, pending):
+        """
+        Send the response of a request once it is ready.
+        """
+        response = await entry.response
+        request_id = entry.request.get("id")
+        if pending.get(request_id) is entry:
+            del pending[request_id]
+
+        latency = (time.perf_counter() - entry.received) * 1000
+        self.latencies.append(latency)
+        self.counters[response["status"]] += 1
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("%s %s: %s in %.2f ms", entry.request.get("type"), request_id, response["status"], latency)
+        await self.send(writer, {"id": request_id, **response, "latency_ms": latency})
+
+    async def send(self, writer, message):
+        if writer.is_closing():
+            return
+        writer.write(json.dumps(message).encode("utf-8") + b"\n")
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+    async def next_batch(self):
+        """
+        Wait for the next requests to send to the pool, skipping the cancelled ones.
+
+        Returns:
+            list: Up to batch_size PendingRequest, possibly none when all were cancelled.
+        """
+        batch = [await self.queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.batch_window
+        while len(batch) < self.batch_size:
+            try:
+                entry = self.queue.get_nowait()
+            except asyncio.QueueEmpty:
+                remaining = deadline - asyncio.get_running_loop().time()
+                if remaining <= 0:
+                    break
+                try:
+                    entry = await asyncio.wait_for(self.queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+            batch.append(entry)
+        return [entry for entry in batch if not entry.cancelled]
+
+    async def dispatch(self):
+        """
+        Send the queued requests to the process pool in batches, while a slot is free.
+        """
+        while True:
+            await self.slots.acquire()
+            batch = await self.next_batch()
+            if not batch:
+                self.slots.release()
+                continue
+            for entry in batch:
+                entry.dispatched = True
+            self.counters["batches"] += 1
+            self.counters["batched_requests"] += len(batch)
+            asyncio.ensure_future(self.compute(batch))
+
+    async def compute(self, batch):
+        """
+        Compute a batch in the process pool and answer its requests.
+        """
+        future = self.executor.submit(run_batch, [entry.request for entry in batch])
+        self.running.add(future)
+        try:
+            responses = await asyncio.wrap_future(future)
+        except Exception as e:
+            responses = [(None, f"{type(e).__name__}: {e}", 0.0)] * len(batch)
+        finally:
+            self.running.discard(future)
+            self.slots.release()
+
+        for entry, (result, error, compute_ms) in zip(batch, responses):
+            if error is None:
+                entry.finish({"status": "ok", "result": result, "compute_ms": compute_ms})
+            else:
+                entry.finish({"status": "error", "error": error, "compute_ms": compute_ms})
+
+    def stats(self):
+        """
+        Requests answered so far and the latency of the latest ones.
+
+        Returns:
+            dict: The counters, the mean batch size, the queued requests and the latency summary.
+        """
+        batches = self.counters["batches"]
+        return {
+            **self.counters,
+            "mean_batch_size": self.counters["batched_requests"] / batches if batches else 0.0,
+            "queued": self.queue.qsize(),
+            **latency_summary(list(self.latencies)),
+        }
+
+
+def load_graph(zones=None):
+    """
+    Load the graph the server answers on, with random road conditions like the menu.
+
+    Args:
+        zones (int): Number of zones of a generated road-like graph, or None for the map of Portugal.
+
+    Returns:
+        Graph: The graph.
+    """
+    graph = generate_map_graph() if zones is None else generate_spatial_graph(zones)
+    apply_randomness_to_graph(graph)
+    return graph
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Routing service answering line-delimited JSON requests.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--processes", type=int, default=None, help="worker processes, one per CPU by default")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--batch-window", type=float, default=BATCH_WINDOW, help="seconds")
+    parser.add_argument("--zones", type=int, default=None, help="serve a generated graph of this many zones instead of the map")
+    parser.add_argument("--debug", action="store_true", help="log every request")
+    args = parser.parse_args()
+
+    # the other modules only log warnings, and the service every request with --debug
+    logging.basicConfig(level=logging.DEBUG if args.debug else logging.WARNING, format="%(message)s")
+    logger.setLevel(logging.DEBUG if args.debug else logging.INFO)
+    server = RoutingServer(load_graph(args.zones), args.processes, args.batch_size, args.batch_window)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+# Run from the repository root with: python3 -m service.server [--port PORT] [--processes N] [--zones N]
+if __name__ == "__main__":
+    main()
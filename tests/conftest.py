@@ -0,0 +1,39 @@
+import random
+
+import pytest
+
+from graph.algorithms.dijkstra import road_cost
+from utils.graph_generator import apply_randomness_to_graph, generate_random_graph, generate_spatial_graph
+
+# Seed of the shared graphs, so every run of the tests searches the same ones
+GRAPH_SEED = 10
+
+# Generators of the shared graphs, by name: roads between zones anywhere, and road-like roads between near zones
+GRAPH_BUILDERS = {
+    "random": lambda: generate_random_graph(300),
+    "spatial": lambda: generate_spatial_graph(1500),
+}
+
+
+@pytest.fixture(params=list(GRAPH_BUILDERS))
+def graph(request):
+    """
+    A seeded graph of every kind of GRAPH_BUILDERS with random road conditions, new for every
+    test since searches and road updates change it.
+    """
+    random.seed(GRAPH_SEED)
+    graph = GRAPH_BUILDERS[request.param]()
+    apply_randomness_to_graph(graph)
+    return graph
+
+
+@pytest.fixture(scope="session")
+def path_cost():
+    """
+    Cost of a path, function of the graph, the path and the road weight (road cost by default),
+    taking the cheapest road between every two consecutive zones.
+    """
+    def cost(graph, path, weight=road_cost):
+        return sum(min(weight(road) for neighbor, road in graph.graph[zone] if neighbor is next_zone)
+                   for zone, next_zone in zip(path, path[1:]))
+    return cost
@@ -0,0 +1,46 @@
+import random
+
+import numpy as np
+import pytest
+
+from graph.algorithms.alt import alt_a_star, bidirectional_alt_a_star, lower_bounds_to
+from graph.algorithms.dijkstra import dijkstra
+from graph.landmarks import Landmarks
+from utils.graph_generator import generate_random_graph
+
+
+@pytest.mark.parametrize("search", [alt_a_star, bidirectional_alt_a_star])
+def test_alt_paths_are_shortest(graph, path_cost, search):
+    rng = random.Random(search.__name__)
+    zones = graph.get_all_zones()
+    for _ in range(30):
+        start, goal = rng.sample(zones, 2)
+        distances, _ = dijkstra(graph, start, targets=[goal])
+        path, _, _ = search(graph, start, goal)
+        if goal not in distances:
+            assert path is None
+            continue
+        assert path[0] is start and path[-1] is goal
+        assert path_cost(graph, path) == pytest.approx(distances[goal])
+
+
+def test_lower_bounds_are_admissible(graph):
+    graph.preprocess_landmarks()
+    zones = graph.get_all_zones()
+    for goal in random.Random(1).sample(zones, 5):
+        # roads go both ways, so the distances from the goal are the distances to it
+        distances, _ = dijkstra(graph, goal)
+        bounds = lower_bounds_to(graph, goal)
+        columns = graph.landmarks.columns
+        for zone, distance in distances.items():
+            assert bounds[columns[zone]] <= distance + 1e-6
+
+
+def test_every_zone_can_be_a_landmark():
+    random.seed(9)
+    graph = generate_random_graph(40)
+    landmarks = Landmarks.build(graph, count=100)
+    assert len(landmarks.landmarks) == 40
+    assert len(set(landmarks.landmarks)) == 40
+    assert landmarks.distances.shape == (40, 40)
+    assert np.all(np.diag(landmarks.distances[:, [landmarks.columns[zone] for zone in landmarks.landmarks]]) == 0)
@@ -0,0 +1,57 @@
+import math
+import random
+
+import pytest
+
+from enums.conditions import Conditions
+from graph.algorithms.ch_query import ch_search
+from graph.algorithms.dijkstra import dijkstra
+from graph.contraction_hierarchy import ContractionHierarchy, road_weight
+from graph.road_updates import RoadUpdate, sample_road_updates
+
+
+def assert_matches_dijkstra(graph, hierarchy, queries, path_cost):
+    for start, goal in queries:
+        distances, _ = dijkstra(graph, start, road_weight, [goal])
+        expected = distances.get(goal, math.inf)
+        path, _, cost = hierarchy.query(start, goal)
+        if math.isinf(expected):
+            assert path is None and math.isinf(cost)
+            assert ch_search(graph, start, goal) == (None, None, None)
+            continue
+        assert cost == pytest.approx(expected)
+        assert path[0] is start and path[-1] is goal
+        assert path_cost(graph, path, road_weight) == pytest.approx(expected)
+        assert list(ch_search(graph, start, goal)[0]) == path
+
+
+def test_queries_match_dijkstra_before_and_after_road_updates(graph, path_cost):
+    rng = random.Random(10)
+    zones = graph.get_all_zones()
+    queries = [rng.sample(zones, 2) for _ in range(25)]
+    hierarchy = graph.preprocess_contraction_hierarchy()
+    assert_matches_dijkstra(graph, hierarchy, queries, path_cost)
+
+    for _ in range(4):
+        updates = sample_road_updates(graph, 30)
+        # close a road of a current path too, so that shortcuts through it get more expensive
+        path, _, _ = hierarchy.query(*queries[0])
+        if path is not None and len(path) > 1:
+            road = next(road for neighbor, road in graph.graph[path[0]] if neighbor is path[1])
+            updates.append(RoadUpdate(road, Conditions.VERY_BAD, False))
+        graph.updates.publish(updates)
+        assert hierarchy.dirty
+        assert_matches_dijkstra(graph, hierarchy, queries, path_cost)
+        assert not hierarchy.dirty
+
+
+def test_recustomize_gives_the_weights_of_a_fresh_customization(graph):
+    hierarchy = ContractionHierarchy(graph)
+    for _ in range(3):
+        graph.updates.publish(sample_road_updates(graph, 50))
+        hierarchy.recustomize()
+        fresh = ContractionHierarchy(graph)
+        fresh.close()
+        graph.updates.unsubscribe(fresh.on_road_updates)
+        assert hierarchy.weights == pytest.approx(fresh.weights)
+    graph.updates.unsubscribe(hierarchy.on_road_updates)
@@ -0,0 +1,91 @@
+import math
+import random
+
+import pytest
+
+from core.vehicle import Vehicle
+from enums.vehicle_type import VehicleType
+from graph.distance_matrix import distance_matrix
+from graph.fleet_planner import FleetPlanner
+from utils.graph_generator import generate_spatial_graph
+
+
+def make_fleet(trucks, cars, drones):
+    fleet = [Vehicle(VehicleType.TRUCK, autonomy=800, capacity=800) for _ in range(trucks)]
+    fleet += [Vehicle(VehicleType.CAR, autonomy=500, capacity=200) for _ in range(cars)]
+    fleet += [Vehicle(VehicleType.DRONE, autonomy=40, capacity=20) for _ in range(drones)]
+    return fleet
+
+
+@pytest.fixture(scope="module")
+def graph():
+    random.seed(22)
+    graph = generate_spatial_graph(800)
+    for zone in graph.get_all_zones():
+        zone.population = random.randint(500, 100000)
+        zone.severity = random.randint(1, 5)
+    return graph
+
+
+@pytest.fixture(scope="module")
+def demand(graph):
+    zones = graph.get_all_zones()
+    return zones[0], random.Random(22).sample(zones[1:], 60)
+
+
+def assert_valid_plan(planner, plan):
+    served = [zone for route in plan.routes for zone in route.zones]
+    assert len(served) == len(set(served))
+    assert set(served) | set(plan.unserved) == set(planner.zones)
+    assert not set(served) & set(plan.unserved)
+
+    position = {zone: i + 1 for i, zone in enumerate(planner.zones)}
+    for route in plan.routes:
+        positions = [position[zone] for zone in route.zones]
+        assert route.load <= route.vehicle.capacity + 1e-6
+        assert route.autonomy_used <= route.vehicle.autonomy + 1e-6
+        assert math.isfinite(route.distance)
+        assert route.distance == pytest.approx(planner.route_distance(positions, route.vehicle))
+
+
+def test_legs_are_measured_for_the_vehicle_type(graph, demand):
+    depot, zones = demand
+    fleet = make_fleet(4, 3, 3)
+    planner = FleetPlanner(graph, depot, zones, fleet)
+    plan = planner.plan()
+    assert_valid_plan(planner, plan)
+
+    positions = [planner.depot] + planner.zones
+    for vehicle_type in (VehicleType.TRUCK, VehicleType.CAR, VehicleType.DRONE):
+        expected = distance_matrix(graph, positions, positions, vehicle_type)
+        assert planner.matrices[vehicle_type] == expected.tolist()
+
+    position = {zone: i + 1 for i, zone in enumerate(planner.zones)}
+    for route in plan.routes:
+        matrix = planner.matrices[route.vehicle.type]
+        tour = [0] + [position[zone] for zone in route.zones] + [0]
+        assert all(math.isfinite(matrix[a][b]) for a, b in zip(tour, tour[1:]))
+
+
+def test_zones_a_vehicle_type_cannot_reach_are_unserved(graph, demand):
+    depot, zones = demand
+    planner = FleetPlanner(graph, depot, zones, make_fleet(20, 0, 0))
+    plan = planner.plan()
+    assert_valid_plan(planner, plan)
+
+    matrix = planner.matrices[VehicleType.TRUCK]
+    unreachable = {zone for i, zone in enumerate(planner.zones, 1) if not math.isfinite(matrix[0][i] + matrix[i][0])}
+    assert unreachable <= set(plan.unserved)
+    assert not unreachable & {zone for route in plan.routes for zone in route.zones}
+
+
+def test_plan_is_deterministic_and_read_only(graph, demand):
+    depot, zones = demand
+    fleet = make_fleet(3, 3, 2)
+    autonomy = [vehicle.autonomy for vehicle in fleet]
+    first = FleetPlanner(graph, depot, zones, fleet).plan()
+    second = FleetPlanner(graph, depot, zones, fleet).plan()
+
+    assert [route.zones for route in first.routes] == [route.zones for route in second.routes]
+    assert first.distance == pytest.approx(second.distance)
+    assert [vehicle.autonomy for vehicle in fleet] == autonomy
@@ -0,0 +1,64 @@
+import math
+import random
+
+import pytest
+
+from enums.conditions import Conditions
+from enums.vehicle_type import VehicleType
+from graph.algorithms.dijkstra import dijkstra, vehicle_weight
+from graph.algorithms.lpa_star import LPAStar
+from graph.road_updates import RoadUpdate, sample_road_updates
+
+
+def assert_matches_fresh_search(graph, planner, path_cost):
+    weight = vehicle_weight(planner.vehicle_type)
+    distances, _ = dijkstra(graph, planner.start, weight, [planner.goal])
+    expected = distances.get(planner.goal, math.inf)
+    cost = planner.g.get(planner.goal, math.inf)
+    if math.isinf(expected):
+        assert math.isinf(cost) and planner.path() is None
+        return
+
+    assert cost == pytest.approx(expected)
+    path = planner.path()
+    assert path[0] is planner.start and path[-1] is planner.goal
+    assert path_cost(graph, path, weight) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("vehicle_type", [VehicleType.CAR, VehicleType.TRUCK, VehicleType.DRONE])
+def test_replans_match_a_fresh_search_after_every_publish(graph, path_cost, vehicle_type):
+    rng = random.Random(vehicle_type.name)
+    zones = graph.get_all_zones()
+    for _ in range(3):
+        start, goal = rng.sample(zones, 2)
+        planner = LPAStar(graph, start, goal, vehicle_type)
+        planner.replan()
+        assert_matches_fresh_search(graph, planner, path_cost)
+
+        for _ in range(6):
+            updates = sample_road_updates(graph, 40)
+            path = planner.path()
+            if path is not None:
+                # close a road of the current path too, so the replan has to route around it
+                zone, next_zone = path[len(path) // 2 - 1:len(path) // 2 + 1]
+                road = next(road for neighbor, road in graph.graph[zone] if neighbor is next_zone)
+                updates.append(RoadUpdate(road, Conditions.VERY_BAD, False))
+            graph.updates.publish(updates)
+            planner.replan()
+            assert_matches_fresh_search(graph, planner, path_cost)
+        planner.close()
+
+
+def test_replans_without_a_vehicle_follow_road_costs(graph, path_cost):
+    start, goal = random.Random(0).sample(graph.get_all_zones(), 2)
+    planner = LPAStar(graph, start, goal)
+    planner.replan()
+    expanded = len(planner.expanded)
+    assert_matches_fresh_search(graph, planner, path_cost)
+
+    # conditions and availability do not change road costs, so nothing is left to repair
+    graph.updates.publish(sample_road_updates(graph, 40))
+    planner.replan()
+    assert_matches_fresh_search(graph, planner, path_cost)
+    assert len(planner.expanded) == expanded
+    planner.close()
@@ -0,0 +1,125 @@
+import random
+
+import pytest
+
+from core.vehicle import Vehicle
+from enums.conditions import Conditions
+from enums.vehicle_type import VehicleType
+from graph.algorithms.a_star import a_star
+from graph.algorithms.bfs import bfs
+from graph.algorithms.dijkstra import dijkstra_route, vehicle_weight
+from graph.road_updates import RoadUpdate
+from graph.route_cache import RouteCache, path_roads
+from utils.graph_generator import apply_randomness_to_graph, apply_sampled_randomness_to_graph, generate_spatial_graph
+
+
+@pytest.fixture
+def graph():
+    random.seed(25)
+    graph = generate_spatial_graph(500)
+    apply_randomness_to_graph(graph)
+    return graph
+
+
+def query(graph, seed):
+    return random.Random(seed).sample(graph.get_all_zones(), 2)
+
+
+def close_road(graph, road):
+    graph.updates.publish([RoadUpdate(road, Conditions.VERY_BAD if road.conditions is not Conditions.VERY_BAD else Conditions.VERY_GOOD, False)])
+
+
+def test_hits_are_frozen_copies_of_the_search(graph):
+    cache = RouteCache(graph)
+    start, goal = query(graph, 1)
+    path, visited, cost = a_star(graph, start, goal)
+
+    first = cache.search(a_star, start, goal)
+    second = cache.search(a_star, start, goal)
+    assert second == first
+    assert first == (tuple(path), frozenset(visited), cost)
+    assert isinstance(first[0], tuple) and isinstance(first[1], frozenset)
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+    cache.close()
+
+
+def test_vehicle_routes_are_keyed_by_vehicle_type(graph):
+    cache = RouteCache(graph)
+    start, goal = query(graph, 2)
+
+    car = cache.search(dijkstra_route, start, goal, Vehicle(VehicleType.CAR, 500, 200))
+    # another vehicle of the same type is answered from the cache, a vehicle of another type is not
+    assert cache.search(dijkstra_route, start, goal, Vehicle(VehicleType.CAR, 100, 50)) == car
+    cache.search(dijkstra_route, start, goal, Vehicle(VehicleType.DRONE, 40, 20))
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+    assert car[2] == pytest.approx(dijkstra_route(graph, start, goal, Vehicle(VehicleType.CAR, 500, 200))[2])
+    cache.close()
+
+
+def test_searches_that_change_the_vehicle_are_refused(graph):
+    cache = RouteCache(graph)
+    start, goal = query(graph, 3)
+    vehicle = Vehicle(VehicleType.TRUCK, 800, 800)
+    with pytest.raises(ValueError):
+        cache.search(a_star, start, goal, vehicle)
+    assert vehicle.trip is None and cache.stats()["cached_routes"] == 0
+    cache.close()
+
+
+def test_updates_only_drop_the_routes_through_changed_roads(graph):
+    cache = RouteCache(graph)
+    start, goal = query(graph, 4)
+    path, _, _ = cache.search(bfs, start, goal)
+
+    # a road away from the path keeps the route, a road of the path drops it
+    on_path = set(path_roads(graph, path))
+    away = next(road for connections in graph.graph.values() for _, road in connections if road not in on_path)
+    close_road(graph, away)
+    cache.search(bfs, start, goal)
+    assert cache.stats()["hits"] == 1 and cache.invalidations == 0
+
+    close_road(graph, next(iter(on_path)))
+    assert cache.invalidations == 1
+    assert cache.search(bfs, start, goal) == cache.search(bfs, start, goal)
+    assert cache.search(bfs, start, goal)[0] == tuple(bfs(graph, start, goal)[0])
+    cache.close()
+
+
+def test_cached_weighted_routes_follow_the_road_updates(graph, path_cost):
+    cache = RouteCache(graph)
+    rng = random.Random(5)
+    zones = graph.get_all_zones()
+    queries = [rng.sample(zones, 2) for _ in range(10)]
+    vehicle = Vehicle(VehicleType.CAR, 500, 200)
+
+    for _ in range(5):
+        weight = vehicle_weight(vehicle.type, graph)
+        for start, goal in queries:
+            path, _, cost = cache.search(dijkstra_route, start, goal, vehicle)
+            fresh_path, _, fresh_cost = dijkstra_route(graph, start, goal, vehicle)
+            if fresh_path is None:
+                assert path is None
+                continue
+            # a cached route costs what its roads cost now, and at least what the best route costs
+            assert cost == pytest.approx(path_cost(graph, path, weight))
+            assert cost >= fresh_cost - 1e-9
+        apply_sampled_randomness_to_graph(graph)
+    assert cache.hits > 0 and cache.invalidations > 0
+    cache.close()
+
+
+def test_eviction_and_expiry(graph):
+    cache = RouteCache(graph, max_entries=2)
+    queries = [query(graph, seed) for seed in range(3)]
+    for start, goal in queries:
+        cache.search(bfs, start, goal)
+    assert cache.evictions == 1 and len(cache.routes) == 2
+    cache.search(bfs, *queries[0])
+    assert cache.misses == 4
+    cache.close()
+
+    expiring = RouteCache(graph, ttl=0.0)
+    expiring.search(bfs, *queries[0])
+    expiring.search(bfs, *queries[0])
+    assert expiring.expirations == 1 and expiring.hits == 0
+    expiring.close()
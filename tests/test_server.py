@@ -0,0 +1,92 @@
+import asyncio
+import random
+
+import pytest
+
+from graph.algorithms.dijkstra import multi_target_dijkstra
+from service.load_generator import Connection, random_request, run_load
+from service import server as routing_server
+from service.server import VEHICLES, RoutingServer, execute
+from utils.graph_generator import apply_randomness_to_graph, generate_spatial_graph
+
+
+@pytest.fixture(scope="module")
+def graph():
+    random.seed(24)
+    graph = generate_spatial_graph(600)
+    apply_randomness_to_graph(graph)
+    return graph
+
+
+def road_state(graph):
+    roads = {road for connections in graph.graph.values() for _, road in connections}
+    return sorted((road.cost, str(road.conditions), road.availability) for road in roads)
+
+
+@pytest.mark.parametrize("vehicle", list(VEHICLES))
+def test_vehicle_routes_leave_the_graph_untouched(graph, vehicle):
+    rng = random.Random(vehicle)
+    names = [zone.name for zone in graph.get_all_zones()]
+    zones_before = [zone.supplies for zone in graph.get_all_zones()]
+    roads_before = road_state(graph)
+    version = graph.snapshot().version
+    vehicle_type = VEHICLES[vehicle][0]
+
+    for _ in range(20):
+        start, goal = rng.sample(names, 2)
+        result = execute(graph, {"type": "route", "start": start, "goal": goal, "vehicle": vehicle})
+        path, cost = multi_target_dijkstra(graph, graph.get_zone(start), [graph.get_zone(goal)], vehicle_type)[graph.get_zone(goal)]
+        if path is None:
+            assert result["path"] is None
+            continue
+        assert result["cost"] == pytest.approx(cost)
+        assert result["path"][0] == start and result["path"][-1] == goal
+        assert "trip" not in result
+
+    assert graph.snapshot().version == version
+    assert road_state(graph) == roads_before
+    assert [zone.supplies for zone in graph.get_all_zones()] == zones_before
+
+
+def test_vehicle_routes_only_take_a_star(graph):
+    start, goal = [zone.name for zone in graph.get_all_zones()[:2]]
+    with pytest.raises(ValueError):
+        execute(graph, {"type": "route", "start": start, "goal": goal, "vehicle": "car", "algorithm": "bfs"})
+
+
+def test_serve_load_and_shut_down(graph, monkeypatch):
+    # more batches in flight than the pool takes at once, so some of them wait in it
+    monkeypatch.setattr(routing_server, "BATCHES_PER_WORKER", 4)
+
+    async def scenario():
+        server = RoutingServer(graph, processes=1, batch_size=4)
+        ready = asyncio.get_running_loop().create_future()
+        serving = asyncio.ensure_future(server.serve("127.0.0.1", 0, ready))
+        port = await ready
+        results = await run_load("127.0.0.1", port, requests=60, concurrency=8, connections=2,
+                                 vehicle="car", cancel_fraction=0.25, seed=24)
+
+        # shut down with batches computed and waiting in the pool
+        client = await Connection.open("127.0.0.1", port)
+        zones = [zone.name for zone in graph.get_all_zones()]
+        rng = random.Random(24)
+        for _ in range(40):
+            client.send(random_request(rng, zones, "distance_matrix", goals=40))
+        await client.writer.drain()
+        while len(server.running) < 4:
+            await asyncio.sleep(0.01)
+        in_pool = list(server.running)
+        serving.cancel()
+        try:
+            await serving
+        except asyncio.CancelledError:
+            pass
+        client.writer.close()
+        return results, in_pool
+
+    results, in_pool = asyncio.run(scenario())
+    assert results.get("ok", 0) + results.get("cancelled", 0) == 60
+    assert "error" not in results
+    # every batch the pool had not started is cancelled
+    assert any(future.cancelled() for future in in_pool)
+    assert all(future.cancelled() or future.running() or future.done() for future in in_pool)
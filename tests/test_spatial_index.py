@@ -0,0 +1,51 @@
+import random
+
+import numpy as np
+import pytest
+
+from graph.spatial_index import SpatialIndex
+from utils.coordinate import Coordinate
+from utils.graph_generator import generate_spatial_graph
+from utils.haversine import one_to_many
+
+
+@pytest.fixture(scope="module")
+def graph():
+    random.seed(16)
+    return generate_spatial_graph(20000, as_csr=True)
+
+
+@pytest.mark.parametrize("latitude, longitude", [(30.0, 30.0), (-40.0, 0.1), (0.2, -60.0), (0.0, 170.0)])
+def test_nearest_outside_the_grid(graph, latitude, longitude):
+    index = graph.get_spatial_index()
+    coordinate = Coordinate(latitude, longitude)
+    distances = one_to_many(latitude, longitude, graph.latitude, graph.longitude)
+
+    visited_rings = []
+    ring = index.ring
+    index.ring = lambda row, column, radius: visited_rings.append(radius) or ring(row, column, radius)
+    try:
+        nearest = index.nearest(coordinate, k=3)
+    finally:
+        del index.ring
+
+    assert [zone for zone, _ in nearest] == np.argsort(distances, kind="stable")[:3].tolist()
+    assert nearest[0][1] == pytest.approx(distances.min())
+    # only the rings reaching the grid are visited, not the empty ones between it and the position
+    assert len(visited_rings) <= max(index.shape) + 1
+
+
+def test_nearest_inside_the_grid(graph):
+    index = graph.get_spatial_index()
+    rng = random.Random(0)
+    for _ in range(50):
+        latitude, longitude = rng.uniform(-0.5, 0.5), rng.uniform(-0.5, 0.5)
+        distances = one_to_many(latitude, longitude, graph.latitude, graph.longitude)
+        zone, distance = index.nearest(Coordinate(latitude, longitude))[0]
+        assert distance == pytest.approx(distances.min())
+        assert distances[zone] == pytest.approx(distances.min())
+
+
+def test_empty_index():
+    index = SpatialIndex([], [], [])
+    assert index.nearest_one(Coordinate(1.0, 1.0)) is None
@@ -1,9 +1,48 @@
 import math
 
 class Coordinate:
+    """
+    Immutable geographical coordinate, in degrees.
+
+    Coordinates are values shared by any number of zones, so they cannot be changed once made:
+    a zone that moves gets a new Coordinate. The position in radians is kept to spare
+    the conversion on every distance computation.
+
+    Attributes:
+        latitude (float): The latitude in degrees.
+        longitude (float): The longitude in degrees.
+        latitude_radians (float): The latitude in radians.
+        longitude_radians (float): The longitude in radians.
+    """
+
+    __slots__ = ("latitude", "longitude", "latitude_radians", "longitude_radians")
+
     def __init__(self, latitude: float=0, longitude: float=0):
-        self.latitude = latitude
-        self.longitude = longitude
+        object.__setattr__(self, "latitude", latitude)
+        object.__setattr__(self, "longitude", longitude)
+        object.__setattr__(self, "latitude_radians", math.radians(latitude))
+        object.__setattr__(self, "longitude_radians", math.radians(longitude))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Coordinate is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("Coordinate is immutable")
+
+    def __reduce__(self):
+        # rebuilt from the degrees, pickle would otherwise restore the slots through __setattr__
+        return (Coordinate, (self.latitude, self.longitude))
+
+    def __eq__(self, other):
+        if not isinstance(other, Coordinate):
+            return NotImplemented
+        return self.latitude == other.latitude and self.longitude == other.longitude
+
+    def __hash__(self):
+        return hash((self.latitude, self.longitude))
+
+    def __repr__(self):
+        return f"Coordinate({self.latitude}, {self.longitude})"
 
     def calculate_distance(self, other):
         """
@@ -17,10 +56,10 @@ class Coordinate:
         """
         # Haversine formula to calculate distance between two points on Earth
         R = 6371
-        lat1 = math.radians(self.latitude)
-        lon1 = math.radians(self.longitude)
-        lat2 = math.radians(other.latitude)
-        lon2 = math.radians(other.longitude)
+        lat1 = self.latitude_radians
+        lon1 = self.longitude_radians
+        lat2 = other.latitude_radians
+        lon2 = other.longitude_radians
 
         dlat = lat2 - lat1
         dlon = lon2 - lon1
@@ -29,3 +68,7 @@ class Coordinate:
         c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
 
         return R * c
+
+
+# Position of the zones created without a coordinate, safe to share since coordinates are immutable
+ORIGIN = Coordinate()
@@ -1,4 +1,6 @@
 import random
+import numpy as np
+from graph.csr_graph import CSRGraph, GEOGRAPHY_BY_CODE, INFRASTRUCTURE_BY_CODE
 from graph.graph_builder import Graph
 from core.zone import Zone
 from enums.geography import Geography
@@ -8,12 +10,22 @@ from enums.infrastructure import Infrastructure
 from utils.name_generator import NameGenerator
 from utils.coordinate import Coordinate
 from core.road import Road
-from map.src.plot_portugal_graph import load_municipalities_from_json
-from map.src.plot_portugal_graph import load_roads_from_json
+from graph.road_updates import random_road_update, sample_road_updates
+from utils.haversine import haversine
+from map.src.plot_portugal_graph import load_compiled_map_into_graph
 
 
 data_path = "map/data/after/final_output.json"
 
+# Fraction of the roads changed at every step of a dynamic search
+DYNAMIC_UPDATE_FRACTION = 0.01
+
+# Number of nearest zones every zone is connected to by generate_spatial_graph
+SPATIAL_NEIGHBORS = 4
+
+# Zones whose nearest neighbors are searched at once, bounds the memory of the candidate matrices
+NEIGHBOR_SEARCH_CHUNK = 32768
+
 def generate_random_graph(num_nodes: int) -> Graph:
     """
     Generates a random graph with a specified number of nodes and random edge properties, ensuring each zone has at least one connection.
@@ -38,23 +50,18 @@ def generate_random_graph(num_nodes: int) -> Graph:
         zones.append(zone)
         graph.add_zone(zone)
 
-    # Step 2: Ensure graph connectivity using a spanning tree
-    unvisited = set(zones)
-    visited = set()
-    current_zone = unvisited.pop()
-    visited.add(current_zone)
+    # Step 2: Ensure graph connectivity using a spanning tree, a path through the zones in random order.
+    # The order is drawn from the zone list, not a set, so the same seed always gives the same graph
+    order = zones[:]
+    random.shuffle(order)
 
-    while unvisited:
-        target_zone = random.choice(list(unvisited))
+    for current_zone, target_zone in zip(order, order[1:]):
         road = Road()
         road.cost = current_zone.calculate_distance_between_zones(target_zone)
         road.geography = random.choice(list(Geography))
         road.infrastructure = random.choice(list(Infrastructure))
 
         graph.add_connection(current_zone, target_zone, road)
-        visited.add(target_zone)
-        unvisited.remove(target_zone)
-        current_zone = target_zone
 
     # Step 3: Add random connections for realism
     for _ in range(num_nodes):  # Limit number of random connections
@@ -70,27 +77,230 @@ def generate_random_graph(num_nodes: int) -> Graph:
     return graph
 
 
+def generate_spatial_graph(num_nodes: int, neighbors: int = SPATIAL_NEIGHBORS, as_csr: bool = False):
+    """
+    Generates a random road-like graph in time close to linear, fit for graphs of millions of zones.
+
+    Zones are sampled in the same square as generate_random_graph, but each one is connected to
+    its nearest zones instead of to random zones anywhere, which gives the local, mostly planar
+    topology of a road network. Disconnected parts are then chained together. Coordinates, the
+    neighbor search and the road attributes are all computed on whole arrays.
+
+    Args:
+        num_nodes (int): Number of nodes to include in the graph.
+        neighbors (int): Number of nearest zones every zone is connected to.
+        as_csr (bool): Whether to return the CSR form directly, without building Zone and Road objects.
+
+    Returns:
+        Graph or CSRGraph: The generated graph, with zones named Z0, Z1, ...
+    """
+    # Seed numpy from the random module so random.seed keeps runs reproducible
+    rng = np.random.default_rng(random.getrandbits(64))
+
+    latitude = rng.uniform(-0.5, 0.5, num_nodes)
+    longitude = rng.uniform(-0.5, 0.5, num_nodes)
+    population = rng.integers(1000, 100000, num_nodes, endpoint=True)
+
+    sources, targets = nearest_neighbor_pairs(latitude, longitude, neighbors)
+    sources, targets = connect_components(latitude, longitude, sources, targets)
+
+    cost = haversine(latitude[sources], longitude[sources], latitude[targets], longitude[targets])
+    geography = rng.integers(1, len(GEOGRAPHY_BY_CODE), len(sources), dtype=np.int8)
+    infrastructure = rng.integers(1, len(INFRASTRUCTURE_BY_CODE), len(sources), dtype=np.int8)
+
+    if as_csr:
+        return CSRGraph.from_edges(latitude, longitude, sources, targets, cost, geography=geography,
+                                   infrastructure=infrastructure, population=population)
+
+    graph = Graph()
+    zones = []
+    for i, (lat, lon, zone_population) in enumerate(zip(latitude.tolist(), longitude.tolist(), population.tolist())):
+        zone = Zone(f"Z{i}", Coordinate(lat, lon), population=zone_population)
+        zones.append(zone)
+        graph.add_zone(zone)
+
+    for source, target, road_cost, geography_code, infrastructure_code in zip(
+            sources.tolist(), targets.tolist(), cost.tolist(), geography.tolist(), infrastructure.tolist()):
+        road = Road(road_cost, geography=GEOGRAPHY_BY_CODE[geography_code], infrastructure=INFRASTRUCTURE_BY_CODE[infrastructure_code])
+        graph.add_connection(zones[source], zones[target], road)
+
+    return graph
+
+
+def nearest_neighbor_pairs(latitude, longitude, k):
+    """
+    Undirected pairs joining every point to its (approximately) k nearest points.
+
+    Points are bucketed in a uniform grid of about k / 2 points per cell and the neighbors of a
+    point are searched in its cell and the 8 around it, which finds the exact nearest points except
+    where the density is very uneven.
+
+    Args:
+        latitude (np.ndarray): Latitude of every point.
+        longitude (np.ndarray): Longitude of every point.
+        k (int): Number of neighbors of every point.
+
+    Returns:
+        tuple: (sources, targets) int64 arrays of the pairs, each pair once with sources < targets.
+    """
+    count = len(latitude)
+    if count < 2 or k < 1:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    # Planar approximation, good enough to rank neighbors at this scale
+    x = longitude * np.cos(np.radians(latitude.mean()))
+    y = latitude
+
+    side = max(1, int(np.sqrt(2 * count / k)))
+    width = max(x.max() - x.min(), y.max() - y.min()) / side or 1.0
+    cell_x = np.minimum(((x - x.min()) / width).astype(np.int64), side - 1)
+    cell_y = np.minimum(((y - y.min()) / width).astype(np.int64), side - 1)
+    cells = cell_x * side + cell_y
+
+    # Work on the points sorted by cell, so that the points gathered for neighboring cells are
+    # close in memory, and map them back to their ids at the end
+    order = np.argsort(cells, kind="stable")
+    x, y = x[order].astype(np.float32), y[order].astype(np.float32)
+    cell_x, cell_y, cells = cell_x[order], cell_y[order], cells[order]
+
+    # members[c] lists the points of cell c, padded with -1
+    counts = np.bincount(cells, minlength=side * side)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    members = np.full((side * side, counts.max()), -1, dtype=np.int32)
+    members[cells, np.arange(count) - starts[cells]] = np.arange(count, dtype=np.int32)
+
+    offsets = [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)]
+    columns = min(k, count - 1)
+    nearest = np.empty((count, columns), dtype=np.int64)
+    for start in range(0, count, NEIGHBOR_SEARCH_CHUNK):
+        points = np.arange(start, min(start + NEIGHBOR_SEARCH_CHUNK, count))
+        candidates = []
+        for dx, dy in offsets:
+            around_x = cell_x[points] + dx
+            around_y = cell_y[points] + dy
+            inside = (around_x >= 0) & (around_x < side) & (around_y >= 0) & (around_y < side)
+            around = members[np.where(inside, around_x * side + around_y, 0)]
+            around[~inside] = -1
+            candidates.append(around)
+        candidates = np.concatenate(candidates, axis=1)
+
+        distances = (x[candidates] - x[points, None]) ** 2 + (y[candidates] - y[points, None]) ** 2
+        distances[(candidates < 0) | (candidates == points[:, None])] = np.inf
+        if candidates.shape[1] > columns:
+            closest = np.argpartition(distances, columns - 1, axis=1)[:, :columns]
+        else:
+            closest = np.argsort(distances, axis=1)[:, :columns]
+        found = np.take_along_axis(candidates, closest, axis=1).astype(np.int64)
+        found[np.isinf(np.take_along_axis(distances, closest, axis=1))] = -1
+        nearest[points] = found
+
+    sources = np.repeat(order, columns)
+    targets = nearest.ravel()
+    valid = targets >= 0
+    sources, targets = sources[valid], order[targets[valid]]
+    sources, targets = np.minimum(sources, targets), np.maximum(sources, targets)
+    pairs = np.sort(sources * count + targets)
+    pairs = pairs[np.concatenate(([True], pairs[1:] != pairs[:-1]))]
+    return pairs // count, pairs % count
+
+
+def connect_components(latitude, longitude, sources, targets):
+    """
+    Add the pairs needed to make a graph connected, chaining one zone of every connected component
+    to one of the next component in spatial order.
+
+    Args:
+        latitude (np.ndarray): Latitude of every zone.
+        longitude (np.ndarray): Longitude of every zone.
+        sources (np.ndarray): First zone of every road.
+        targets (np.ndarray): Second zone of every road.
+
+    Returns:
+        tuple: (sources, targets) with the chaining pairs appended.
+    """
+    count = len(latitude)
+    labels = np.arange(count)
+    # Hook the larger root of every road onto the smaller one, then compress the paths, until no road joins two trees
+    while True:
+        roots_a, roots_b = labels[sources], labels[targets]
+        joining = roots_a != roots_b
+        if not joining.any():
+            break
+        np.minimum.at(labels, np.maximum(roots_a, roots_b)[joining], np.minimum(roots_a, roots_b)[joining])
+        while True:
+            compressed = labels[labels]
+            if np.array_equal(compressed, labels):
+                break
+            labels = compressed
+
+    representatives = np.flatnonzero(labels == np.arange(count))
+    if len(representatives) < 2:
+        return sources, targets
+
+    # Consecutive representatives along the longitude are close to each other, which keeps the chain roads short
+    chain = representatives[np.argsort(longitude[representatives] + 1e-3 * latitude[representatives], kind="stable")]
+    return np.concatenate((sources, chain[:-1])), np.concatenate((targets, chain[1:]))
+
+
 def generate_map_graph() -> Graph:
     """
     Generates a map graph with predefined nodes and edges.
 
+    The map is read from its compiled binary form, which is built from the JSON file the first
+    time and again whenever the JSON file changes.
+
     Returns:
         Graph: A map graph with predefined nodes and edges.
     """
     graph = Graph()
 
-    load_municipalities_from_json(graph, data_path)
-
-    load_roads_from_json(graph, data_path)
+    load_compiled_map_into_graph(graph, data_path)
 
     return graph
 
 
 def apply_randomness_to_graph(graph):
+    """
+    Randomizes the conditions and availability of every road, publishing the changes on the graph's update feed.
+
+    Args:
+        graph (Graph): The graph to randomize.
+    """
     for zone in graph.graph:
         apply_randomness_to_zone(zone)
-        for _,road in graph.graph[zone]:
-            apply_randomness_to_road(road)
+    graph.updates.publish([random_road_update(road) for road in graph.roads])
+
+
+def apply_sampled_randomness_to_graph(graph, fraction=DYNAMIC_UPDATE_FRACTION):
+    """
+    Randomizes a sample of the roads, publishing only those changes on the graph's update feed.
+
+    Args:
+        graph (Graph): The graph to perturb.
+        fraction (float): The fraction of the roads to change, at least one road changes.
+
+    Returns:
+        list: The applied RoadUpdate objects.
+    """
+    return graph.updates.publish(sample_road_updates(graph, max(1, round(fraction * len(graph.roads)))))
+
+
+def apply_sampled_randomness_to_csr(graph, fraction=DYNAMIC_UPDATE_FRACTION):
+    """
+    Randomizes the conditions and availability of a sample of the roads of a CSR graph, publishing
+    them as a new version of its road state.
+
+    Args:
+        graph (CSRGraph): The CSR graph to perturb.
+        fraction (float): The fraction of the roads to change, at least one road changes.
+
+    Returns:
+        np.ndarray: The ids of the sampled roads.
+    """
+    rng = np.random.default_rng(random.getrandbits(64))
+    roads = rng.choice(graph.num_roads, size=min(graph.num_roads, max(1, round(fraction * graph.num_roads))), replace=False)
+    graph.road_state.publish(roads, rng.integers(1, len(Conditions) + 1, size=len(roads)), rng.random(len(roads)) < 0.7)
+    return roads
 
 
 def apply_randomness_to_road(road):
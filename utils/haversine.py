@@ -0,0 +1,93 @@
+import numpy as np
+
+EARTH_RADIUS = 6371  # km
+
+
+def haversine(latitude1, longitude1, latitude2, longitude2):
+    """
+    Vectorized haversine distance, with the same formula as Coordinate.calculate_distance.
+
+    All arguments are in degrees and are broadcast against each other, so scalars,
+    arrays of equal shape or row/column vectors can be mixed freely.
+
+    Args:
+        latitude1 (array_like): Latitudes of the first points.
+        longitude1 (array_like): Longitudes of the first points.
+        latitude2 (array_like): Latitudes of the second points.
+        longitude2 (array_like): Longitudes of the second points.
+
+    Returns:
+        np.ndarray: The distances in kilometers.
+    """
+    lat1 = np.radians(latitude1)
+    lon1 = np.radians(longitude1)
+    lat2 = np.radians(latitude2)
+    lon2 = np.radians(longitude2)
+
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return EARTH_RADIUS * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+def one_to_many(latitude, longitude, latitudes, longitudes):
+    """
+    Distances from one point to many points.
+
+    Args:
+        latitude (float): Latitude of the origin.
+        longitude (float): Longitude of the origin.
+        latitudes (array_like): Latitudes of the destinations.
+        longitudes (array_like): Longitudes of the destinations.
+
+    Returns:
+        np.ndarray: 1D array with the distance to every destination.
+    """
+    return haversine(latitude, longitude, np.asarray(latitudes, dtype=np.float64), np.asarray(longitudes, dtype=np.float64))
+
+
+def many_to_many(latitudes1, longitudes1, latitudes2, longitudes2):
+    """
+    Distance matrix between two sets of points.
+
+    Args:
+        latitudes1 (array_like): Latitudes of the origins.
+        longitudes1 (array_like): Longitudes of the origins.
+        latitudes2 (array_like): Latitudes of the destinations.
+        longitudes2 (array_like): Longitudes of the destinations.
+
+    Returns:
+        np.ndarray: Matrix where entry [i, j] is the distance from origin i to destination j.
+    """
+    latitudes1 = np.asarray(latitudes1, dtype=np.float64)[:, None]
+    longitudes1 = np.asarray(longitudes1, dtype=np.float64)[:, None]
+    return haversine(latitudes1, longitudes1, np.asarray(latitudes2, dtype=np.float64), np.asarray(longitudes2, dtype=np.float64))
+
+
+def path_length(latitudes, longitudes):
+    """
+    Total length of a path going through the given points in order.
+
+    Args:
+        latitudes (array_like): Latitudes of the path points.
+        longitudes (array_like): Longitudes of the path points.
+
+    Returns:
+        float: The length of the path in kilometers.
+    """
+    latitudes = np.asarray(latitudes, dtype=np.float64)
+    longitudes = np.asarray(longitudes, dtype=np.float64)
+    if len(latitudes) < 2:
+        return 0.0
+    return float(haversine(latitudes[:-1], longitudes[:-1], latitudes[1:], longitudes[1:]).sum())
+
+
+def zone_path_length(path):
+    """
+    Total length of a path of zones, as the sum of calculate_distance_between_zones over its steps.
+
+    Args:
+        path (list): The zones of the path.
+
+    Returns:
+        float: The length of the path in kilometers.
+    """
+    return path_length([zone.coordinate.latitude for zone in path], [zone.coordinate.longitude for zone in path])
@@ -1,22 +1,67 @@
 from core.vehicle import Vehicle
-from graph.algorithms.bfs import bfs
-from graph.algorithms.dfs import dfs
+from graph.algorithms.bfs import bfs, bidirectional_bfs
+from graph.algorithms.ch_query import ch_search
+from graph.algorithms.dijkstra import multi_target_dijkstra
+from graph.fleet_planner import plan_fleet
+from graph.route_cache import RouteCache
+from graph.algorithms.dfs import dfs, iddfs
 from graph.algorithms.a_star import a_star
+from graph.algorithms.alt import alt_a_star, bidirectional_alt_a_star
 from graph.algorithms.greedy import greedy
+from graph.algorithms.lpa_star import lpa_star
 from enums.vehicle_type import VehicleType
+from utils.coordinate import Coordinate
 from utils.graph_generator import generate_random_graph, apply_randomness_to_graph, generate_map_graph
 from utils.graph_visualizer import print_graph, visualize_graph
 from map.src.plot_portugal_graph import visualize_generated_graph
-from metrics.metrics import benchmark_algorithm, bulk_benchmarking, visualize_comparisons
+from metrics.metrics import GRAPH_SIZE_PRESETS, benchmark_algorithm, bulk_benchmarking, memory_footprint, route_cache_benchmark, visualize_comparisons
 import json
 
 class Menu:
     def __init__(self):
         self.vehicle = Vehicle(VehicleType.DRONE, autonomy=500, capacity=200)
         self.graph = None
+        # Results of the repeated DFS, BFS, A* and greedy queries on the current graph
+        self.route_cache = None
         self.is_portugal_map = False
         self.has_benchmark_run = False
 
+    def read_zone(self, text):
+        """
+        Find the zone a user entered, either by its name or as a "latitude,longitude" position
+        snapped to the nearest zone.
+
+        Args:
+            text (str): The user input.
+
+        Returns:
+            Zone: The zone, or None if no zone has that name.
+        """
+        text = text.strip()
+        parts = text.split(",")
+        if len(parts) == 2:
+            try:
+                coordinate = Coordinate(float(parts[0]), float(parts[1]))
+            except ValueError:
+                return self.graph.get_zone(text)
+            zone = self.graph.nearest_zone(coordinate)
+            if zone is not None:
+                print(f"Nearest zone to {text}: {zone.name}")
+            return zone
+        return self.graph.get_zone(text)
+
+    def set_graph(self, graph):
+        """
+        Make a graph the current one, with a new route cache.
+
+        Args:
+            graph (Graph): The new graph.
+        """
+        if self.route_cache is not None:
+            self.route_cache.close()
+        self.graph = graph
+        self.route_cache = RouteCache(graph)
+
     def display_main_menu(self):
         print("\nMain Menu:")
         print("1. Generate a new random graph")
@@ -36,6 +81,14 @@ class Menu:
         print("6. Traverse the graph using A* Search")
         print("7. Traverse the graph using Greedy Search")
         print("8. Traverse the graph using Weighted A* Search on a dynamic map")
+        print("9. Traverse the graph using Weighted LPA* replanning on a dynamic map")
+        print("10. Traverse the graph using Iterative Deepening DFS")
+        print("11. Traverse the graph using Bidirectional BFS")
+        print("12. Traverse the graph using ALT A* Search")
+        print("13. Traverse the graph using Bidirectional ALT A* Search")
+        print("14. Traverse the graph using the Contraction Hierarchy")
+        print("15. Find the shortest paths from a zone to several zones")
+        print("16. Plan the routes of a fleet from a depot")
         print("0. Back to Main Menu")
 
     def run(self):
@@ -45,12 +98,12 @@ class Menu:
 
             if choice == '1':
                 input_nodes = input("Enter the number of nodes for the graph: ")
-                self.graph = generate_random_graph(int(input_nodes))
+                self.set_graph(generate_random_graph(int(input_nodes)))
                 apply_randomness_to_graph(self.graph)
                 self.is_portugal_map = False
                 print("New random graph generated.")
             elif choice == '2':
-                self.graph = generate_map_graph()
+                self.set_graph(generate_map_graph())
                 apply_randomness_to_graph(self.graph)
                 self.is_portugal_map = True
                 print("Map of Portugal graph generated.")
@@ -95,33 +148,101 @@ class Menu:
                     print("Vehicle autonomy after carrying 5kg:", self.vehicle.calculate_autonomy_loss(5.0))
                 else:
                     print("Please generate a graph first.")
-            elif choice in ['4', '5', '6', '7', '8']:
+            elif choice == '15':
+                if self.graph is not None:
+                    start_zone = self.read_zone(input("Enter the start zone (name or latitude,longitude): "))
+                    if start_zone is None:
+                        print("Invalid start zone.")
+                        continue
+
+                    goal_zone_names = input("Enter the goal zones (names or latitude,longitude), separated by semicolons: ")
+                    goal_zones = [self.read_zone(name) for name in goal_zone_names.split(";") if name.strip()]
+                    if not goal_zones or None in goal_zones:
+                        print("Invalid goal zones.")
+                        continue
+
+                    print("Algorithm: Multi-target Dijkstra")
+                    for goal_zone, (path, cost) in multi_target_dijkstra(self.graph, start_zone, goal_zones).items():
+                        if path is None:
+                            print(f"{goal_zone.name}: No path found.")
+                        else:
+                            print(f"{goal_zone.name}: cost {cost}, path {[zone.name for zone in path]}")
+                else:
+                    print("Please generate a graph first.")
+            elif choice == '16':
                 if self.graph is not None:
-                    start_zone_name = input("Enter the start zone: ")
-                    start_zone = self.graph.get_zone(start_zone_name)
+                    depot = self.read_zone(input("Enter the depot zone (name or latitude,longitude): "))
+                    if depot is None:
+                        print("Invalid depot zone.")
+                        continue
+
+                    zone_names = input("Enter the zones to supply (names or latitude,longitude), separated by semicolons, or 'all': ")
+                    if zone_names.strip().lower() == 'all':
+                        zones = self.graph.get_all_zones()
+                    else:
+                        zones = [self.read_zone(name) for name in zone_names.split(";") if name.strip()]
+                    if not zones or None in zones:
+                        print("Invalid zones.")
+                        continue
+
+                    try:
+                        trucks, cars, drones = (int(count) for count in input("Enter the number of trucks, cars and drones, separated by commas: ").split(","))
+                    except ValueError:
+                        print("Invalid fleet.")
+                        continue
+                    fleet = [Vehicle(VehicleType.TRUCK, autonomy=800, capacity=800) for _ in range(trucks)]
+                    fleet += [Vehicle(VehicleType.CAR, autonomy=500, capacity=200) for _ in range(cars)]
+                    fleet += [Vehicle(VehicleType.DRONE, autonomy=40, capacity=20) for _ in range(drones)]
+
+                    plan = plan_fleet(self.graph, depot, zones, fleet)
+                    for route in plan.routes:
+                        print(f"{route.vehicle.type.name}: load {route.load:.2f}, distance {route.distance:.2f}, autonomy used {route.autonomy_used:.2f}")
+                        print("  Route:", [depot.name] + [zone.name for zone in route.zones] + [depot.name])
+                    print("Total distance:", plan.distance)
+                    if plan.unserved:
+                        print("Unserved zones:", [zone.name for zone in plan.unserved])
+                else:
+                    print("Please generate a graph first.")
+            elif choice in ['4', '5', '6', '7', '8', '9', '10', '11', '12', '13', '14']:
+                if self.graph is not None:
+                    start_zone = self.read_zone(input("Enter the start zone (name or latitude,longitude): "))
                     if start_zone is None:
                         print("Invalid start zone.")
                         continue
 
-                    goal_zone_name = input("Enter the goal zone: ")
-                    goal_zone = self.graph.get_zone(goal_zone_name)
+                    goal_zone = self.read_zone(input("Enter the goal zone (name or latitude,longitude): "))
                     if goal_zone is None:
                         print("Invalid goal zone.")
                         continue
 
                     if choice == '4':
-                        best_path, visited, best_cost = dfs(self.graph, start_zone, goal_zone)
+                        best_path, visited, best_cost = self.route_cache.search(dfs, start_zone, goal_zone)
                         print("Algorithm: DFS")
                     elif choice == '5':
-                        best_path, visited, best_cost = bfs(self.graph, start_zone, goal_zone)
+                        best_path, visited, best_cost = self.route_cache.search(bfs, start_zone, goal_zone)
                         print("Algorithm: BFS")
                     elif choice == '6':
-                        best_path, visited, best_cost = a_star(self.graph, start_zone, goal_zone, True)
+                        best_path, visited, best_cost = self.route_cache.search(a_star, start_zone, goal_zone)
                         print("Algorithm: A* Search")
                     elif choice == '7':
-                        best_path, visited, best_cost = greedy(self.graph, start_zone, goal_zone)
+                        best_path, visited, best_cost = self.route_cache.search(greedy, start_zone, goal_zone)
                         print("Algorithm: Greedy Search")
-                    elif choice == '8':
+                    elif choice == '10':
+                        best_path, visited, best_cost = iddfs(self.graph, start_zone, goal_zone)
+                        print("Algorithm: Iterative Deepening DFS")
+                    elif choice == '11':
+                        best_path, visited, best_cost = bidirectional_bfs(self.graph, start_zone, goal_zone)
+                        print("Algorithm: Bidirectional BFS")
+                    elif choice == '12':
+                        best_path, visited, best_cost = alt_a_star(self.graph, start_zone, goal_zone)
+                        print("Algorithm: ALT A* Search")
+                    elif choice == '13':
+                        best_path, visited, best_cost = bidirectional_alt_a_star(self.graph, start_zone, goal_zone)
+                        print("Algorithm: Bidirectional ALT A* Search")
+                    elif choice == '14':
+                        best_path, visited, best_cost = ch_search(self.graph, start_zone, goal_zone)
+                        print("Algorithm: Contraction Hierarchy")
+                    elif choice in ['8', '9']:
                         vehicle_type = input("Enter the vehicle type (drone, car, truck): ").lower()
                         if vehicle_type == 'drone':
                             self.vehicle = Vehicle(VehicleType.DRONE, autonomy=40, capacity=20)
@@ -133,8 +254,12 @@ class Menu:
                             print("Invalid vehicle type.")
                             continue
 
-                        best_path, visited, best_cost = a_star(self.graph, start_zone, goal_zone, False, self.vehicle)
-                        print("Algorithm: A* Search (Weighted)")
+                        if choice == '8':
+                            best_path, visited, best_cost = a_star(self.graph, start_zone, goal_zone, False, self.vehicle)
+                            print("Algorithm: A* Search (Weighted)")
+                        else:
+                            best_path, visited, best_cost = lpa_star(self.graph, start_zone, goal_zone, False, self.vehicle)
+                            print("Algorithm: LPA* Search (Weighted)")
 
                     if best_path is None:
                         print("No path found.")
@@ -144,6 +269,10 @@ class Menu:
                         print("Best path:", [zone.name for zone in best_path])
                         print("Visited zones:", [zone.name for zone in visited])
                         print("Best cost:", best_cost)
+                        if choice in ['8', '9'] and self.vehicle.trip is not None:
+                            for leg in self.vehicle.trip.legs:
+                                print(f"{leg.origin.name} -> {leg.destination.name}: autonomy {leg.autonomy:.2f}, load {leg.load:.2f}, supplies left {leg.supplies_left:.2f}")
+                            print("Trip:", self.vehicle.trip.outcome)
                 else:
                     print("Please generate a graph first.")
             elif choice == '0':
@@ -157,6 +286,8 @@ class Menu:
         print("2. Execute bulk benchmarking")
         if self.has_benchmark_run:
             print("3. Show benchmarking results")
+        print("4. Measure the memory footprint of zones and roads")
+        print("5. Show the route cache counters and measure the cache")
         print("0. Back to Main Menu")
 
     def run_metrics_menu(self):
@@ -167,14 +298,12 @@ class Menu:
             if choice == '1':
                 print("Executing metrics on the algorithms...")
                 if self.graph is not None:
-                    start_zone_name = input("Enter the start zone: ")
-                    start_zone = self.graph.get_zone(start_zone_name)
+                    start_zone = self.read_zone(input("Enter the start zone (name or latitude,longitude): "))
                     if start_zone is None:
                         print("Invalid start zone.")
                         continue
 
-                    goal_zone_name = input("Enter the goal zone: ")
-                    goal_zone = self.graph.get_zone(goal_zone_name)
+                    goal_zone = self.read_zone(input("Enter the goal zone (name or latitude,longitude): "))
                     if goal_zone is None:
                         print("Invalid goal zone.")
                         continue
@@ -182,24 +311,29 @@ class Menu:
                     algorithms = {
                         "DFS": dfs,
                         "BFS": bfs,
+                        "Bidirectional BFS": bidirectional_bfs,
                         "A* Search": a_star,
+                        "ALT A* Search": alt_a_star,
+                        "Bidirectional ALT A* Search": bidirectional_alt_a_star,
+                        "Contraction Hierarchy": ch_search,
                         "Dynamic A* Search": a_star,
+                        "Dynamic LPA* Search": lpa_star,
                     }
 
+                    vehicle_type = input("Enter the vehicle type for the dynamic searches (drone, car, truck): ").lower()
+                    if vehicle_type == 'drone':
+                        self.vehicle = Vehicle(VehicleType.DRONE, autonomy=40, capacity=20)
+                    elif vehicle_type == 'car':
+                        self.vehicle = Vehicle(VehicleType.CAR, autonomy=500, capacity=200)
+                    elif vehicle_type == 'truck':
+                        self.vehicle = Vehicle(VehicleType.TRUCK, autonomy=800, capacity=800)
+                    else:
+                        print("Invalid vehicle type.")
+                        continue
+
                     metrics = {}
                     for name, algorithm in algorithms.items():
-                        if name == "Dynamic A* Search":
-                            vehicle_type = input("Enter the vehicle type (drone, car, truck): ").lower()
-                            if vehicle_type == 'drone':
-                                self.vehicle = Vehicle(VehicleType.DRONE, autonomy=40, capacity=20)
-                            elif vehicle_type == 'car':
-                                self.vehicle = Vehicle(VehicleType.CAR, autonomy=500, capacity=200)
-                            elif vehicle_type == 'truck':
-                                self.vehicle = Vehicle(VehicleType.TRUCK, autonomy=800, capacity=800)
-                            else:
-                                print("Invalid vehicle type.")
-                                continue
-
+                        if name.startswith("Dynamic"):
                             metrics[name] = benchmark_algorithm(algorithm, self.graph, start_zone, goal_zone, False, self.vehicle)
                         else:
                             metrics[name] = benchmark_algorithm(algorithm, self.graph, start_zone, goal_zone)
@@ -211,8 +345,13 @@ class Menu:
                 else:
                     print("Please generate a graph first.")
             elif choice == '2':
+                options = ", ".join(f"{name} (up to {max(sizes)} zones)" for name, sizes in GRAPH_SIZE_PRESETS.items())
+                preset = input(f"Enter the graph sizes, {options}: ").strip().lower() or "small"
+                if preset not in GRAPH_SIZE_PRESETS:
+                    print("Invalid graph sizes.")
+                    continue
                 print("Executing bulk benchmarking...")
-                bulk_benchmarking()
+                bulk_benchmarking(GRAPH_SIZE_PRESETS[preset])
                 self.has_benchmark_run = True
             elif choice == '3' and self.has_benchmark_run:
                 intention = input("Do you want to use the file \"bulk_benchmarking_results.json\" see the results? (y/n): ").lower()
@@ -225,6 +364,18 @@ class Menu:
                     with open(filePath, "r") as file:
                         results = json.load(file)
                         visualize_comparisons(results)
+            elif choice == '4':
+                print("Measuring the memory footprint...")
+                for key, value in memory_footprint().items():
+                    print(f"{key}: {value}")
+            elif choice == '5':
+                if self.route_cache is not None:
+                    print("Route cache of the current graph:")
+                    for key, value in self.route_cache.stats().items():
+                        print(f"{key}: {value}")
+                print("Measuring the route cache on repeated depot-to-zone queries...")
+                for key, value in route_cache_benchmark().items():
+                    print(f"{key}: {value}")
             elif choice == '0':
                 break
             else: